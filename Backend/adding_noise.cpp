@@ -1,106 +1,160 @@
+#pragma once
 #include "binding_utils.h"
+#include "philox.h"
 #include <string>
-#include <random>
+#include <vector>
+#include <cstring>
+#include <algorithm>
 
 namespace py = pybind11;
 
 class NoiseGenerator {
+private:
+    // Philox counter layout: (block of 4 samples along the row, row, stream, 0).
+    // Each noise type draws from its own stream so equal seeds do not correlate across types.
+    enum Stream : uint32_t { kUniformStream = 1, kGaussianStream = 2, kSaltAndPepperStream = 3 };
+
+    // Fill `rnd` with `count` 32-bit random numbers for row `y` (count rounded up to a multiple of 4)
+    static void rowRandom(uint64_t seed, Stream stream, int y, int count, std::vector<uint32_t>& rnd) {
+        int blocks = (count + 3) / 4;
+        rnd.resize(static_cast<size_t>(blocks) * 4);
+        for (int b = 0; b < blocks; ++b) {
+            Philox4x32::generate(seed, static_cast<uint32_t>(b), static_cast<uint32_t>(y), stream, 0, &rnd[b * 4]);
+        }
+    }
+
+    // Run `body(y, src_row, dst_row, rnd)` over all rows in parallel. `dst` may alias `image` (in-place):
+    // every sample is read before the same sample is written.
+    template <typename RowFn>
+    static cv::Mat forEachRow(const cv::Mat& image, cv::Mat& dst, RowFn body) {
+        dst.create(image.size(), image.type());
+        cv::parallel_for_(cv::Range(0, image.rows), [&](const cv::Range& r) {
+            std::vector<uint32_t> rnd;
+            for (int y = r.start; y < r.end; ++y) {
+                body(y, image.ptr<uchar>(y), dst.ptr<uchar>(y), rnd);
+            }
+        });
+        return dst;
+    }
+
 public:
-    static cv::Mat applyUniformNoise(const cv::Mat& image, double intensity_pct) {
+    // All generators are reproducible from `seed` and independent of the thread count.
+    // `dst` may wrap a preallocated output buffer, including the input itself for in-place noise.
+    static cv::Mat applyUniformNoise(const cv::Mat& image, double intensity_pct, uint64_t seed, cv::Mat dst = cv::Mat()) {
         // Map 0-100% to a reasonable range for uniform noise (e.g., 0 to 255)
-        double range = intensity_pct * 2.55; 
-        
-        cv::Mat result = image.clone();
-        cv::Mat random_vals = cv::Mat(image.size(), CV_MAKETYPE(CV_32F, image.channels()));
-        
-        // Generate uniform noise between -range and +range
-        cv::randu(random_vals, -range, range);
-        
-        // Add noise additively using 32-bit float to prevent overflow wrapping before saturation
-        cv::Mat image_float;
-        image.convertTo(image_float, CV_32F);
-        image_float += random_vals;
-        
-        // Convert back to 8-bit unsigned char with saturation
-        image_float.convertTo(result, image.type());
-        return result;
+        float range = static_cast<float>(intensity_pct * 2.55);
+        int samples = image.cols * image.channels();
+
+        // Integer noise in [-range, +range] added with saturation (no float image temporaries)
+        return forEachRow(image, dst, [&](int y, const uchar* src, uchar* out, std::vector<uint32_t>& rnd) {
+            rowRandom(seed, kUniformStream, y, samples, rnd);
+            for (int i = 0; i < samples; ++i) {
+                int noise = cvRound(range * (2.0f * Philox4x32::toUnitFloat(rnd[i]) - 1.0f));
+                out[i] = cv::saturate_cast<uchar>(src[i] + noise);
+            }
+        });
     }
 
-    static cv::Mat applyGaussianNoise(const cv::Mat& image, double intensity_pct) {
+    static cv::Mat applyGaussianNoise(const cv::Mat& image, double intensity_pct, uint64_t seed, cv::Mat dst = cv::Mat()) {
         // Standard deviation mapping
-        double stddev = intensity_pct * 2.55 / 2.0; 
-        double mean = 0.0;
-        
-        cv::Mat noise = cv::Mat(image.size(), CV_MAKETYPE(CV_32F, image.channels()));
-        cv::randn(noise, mean, stddev);
-        
-        cv::Mat image_float;
-        image.convertTo(image_float, CV_32F);
-        image_float += noise;
-        
-        cv::Mat result;
-        image_float.convertTo(result, image.type());
-        return result;
+        float stddev = static_cast<float>(intensity_pct * 2.55 / 2.0);
+        int samples = image.cols * image.channels();
+        const float two_pi = static_cast<float>(2.0 * CV_PI);
+
+        // Box-Muller turns each pair of uniforms into two normal samples
+        return forEachRow(image, dst, [&](int y, const uchar* src, uchar* out, std::vector<uint32_t>& rnd) {
+            rowRandom(seed, kGaussianStream, y, samples, rnd);
+            for (int i = 0; i < samples; i += 2) {
+                float u1 = 1.0f - Philox4x32::toUnitFloat(rnd[i]); // (0, 1], keeps log() finite
+                float theta = two_pi * Philox4x32::toUnitFloat(rnd[i + 1]);
+                float radius = stddev * std::sqrt(-2.0f * std::log(u1));
+                out[i] = cv::saturate_cast<uchar>(src[i] + cvRound(radius * std::cos(theta)));
+                if (i + 1 < samples) {
+                    out[i + 1] = cv::saturate_cast<uchar>(src[i + 1] + cvRound(radius * std::sin(theta)));
+                }
+            }
+        });
     }
 
-    static cv::Mat applySaltAndPepperNoise(const cv::Mat& image, double intensity_pct) {
-        cv::Mat result = image.clone();
-        
-        // Probability of a pixel being salt OR pepper
-        double prob = intensity_pct / 100.0;
-        
-        std::random_device rd;
-        std::mt19937 gen(rd());
-        std::uniform_real_distribution<double> dist(0.0, 1.0);
-        
+    static cv::Mat applySaltAndPepperNoise(const cv::Mat& image, double intensity_pct, uint64_t seed, cv::Mat dst = cv::Mat()) {
+        // Probability of a pixel being salt OR pepper, split equally between the two,
+        // as thresholds on the raw 32-bit draw
+        double prob = std::min(std::max(intensity_pct / 100.0, 0.0), 1.0);
+        uint64_t pepper_below = static_cast<uint64_t>(prob / 2.0 * 4294967296.0);
+        uint64_t salt_below = static_cast<uint64_t>(prob * 4294967296.0);
+
         int channels = image.channels();
-        
-        for (int y = 0; y < result.rows; ++y) {
-            uchar* ptr = result.ptr<uchar>(y);
-            for (int x = 0; x < result.cols; ++x) {
-                double rand_val = dist(gen);
-                
-                // We split the probability equally between salt and pepper
-                if (rand_val < prob / 2.0) {
+        int row_bytes = image.cols * channels;
+
+        return forEachRow(image, dst, [&](int y, const uchar* src, uchar* out, std::vector<uint32_t>& rnd) {
+            if (out != src) {
+                std::memcpy(out, src, row_bytes);
+            }
+            rowRandom(seed, kSaltAndPepperStream, y, image.cols, rnd);
+            for (int x = 0; x < image.cols; ++x) {
+                uint32_t r = rnd[x];
+                if (r < pepper_below) {
                     // Pepper (0)
-                    for (int c = 0; c < channels; ++c) {
-                        ptr[x * channels + c] = 0;
-                    }
-                } else if (rand_val < prob) {
+                    std::memset(out + x * channels, 0, channels);
+                } else if (r < salt_below) {
                     // Salt (255)
-                    for (int c = 0; c < channels; ++c) {
-                        ptr[x * channels + c] = 255;
-                    }
+                    std::memset(out + x * channels, 255, channels);
                 }
             }
+        });
+    }
+
+    // Dispatch based on noise type parameter (unknown types return an unchanged copy)
+    static cv::Mat apply(const cv::Mat& image, const std::string& noise_type, double intensity, uint64_t seed,
+                         cv::Mat dst = cv::Mat()) {
+        if (noise_type == "Uniform" || noise_type == "Uniform Noise") {
+            return applyUniformNoise(image, intensity, seed, dst);
+        } else if (noise_type == "Gaussian" || noise_type == "Gaussian Noise") {
+            return applyGaussianNoise(image, intensity, seed, dst);
+        } else if (noise_type == "Salt & Pepper" || noise_type == "Salt and Pepper") {
+            return applySaltAndPepperNoise(image, intensity, seed, dst);
         }
-        return result;
+        // Fallback to original if invalid type
+        image.copyTo(dst);
+        return dst;
     }
 };
 
-py::array_t<unsigned char> add_noise_wrapper(py::array_t<unsigned char> img, const std::string& noise_type, double intensity) {
+// `seed` is None (fresh random noise on every call) or a non-negative integer for reproducible noise.
+// Python and NumPy integers are accepted; anything else, or a value outside [0, 2**64), raises ValueError.
+static uint64_t resolve_seed(const py::object& seed) {
+    if (seed.is_none()) {
+        return Philox4x32::randomSeed();
+    }
+    PyObject* index = PyNumber_Index(seed.ptr());
+    unsigned long long value = index ? PyLong_AsUnsignedLongLong(index) : 0;
+    Py_XDECREF(index);
+    if (PyErr_Occurred()) {
+        PyErr_Clear();
+        throw py::value_error("`seed` must be None or an integer from 0 to 2**64 - 1, got " +
+                              py::repr(seed).cast<std::string>());
+    }
+    return value;
+}
+
+py::array_t<unsigned char> add_noise_wrapper(py::array_t<unsigned char> img, const std::string& noise_type, double intensity,
+                                             py::object out, py::object seed) {
     auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    uint64_t key = resolve_seed(seed);
     cv::Mat res;
-    
-    // Dispatch based on noise type parameter
-    if (noise_type == "Uniform" || noise_type == "Uniform Noise") {
-        res = NoiseGenerator::applyUniformNoise(mat, intensity);
-    } else if (noise_type == "Gaussian" || noise_type == "Gaussian Noise") {
-        res = NoiseGenerator::applyGaussianNoise(mat, intensity);
-    } else if (noise_type == "Salt & Pepper" || noise_type == "Salt and Pepper") {
-        res = NoiseGenerator::applySaltAndPepperNoise(mat, intensity);
-    } else {
-        // Fallback to original if invalid type
-        res = mat.clone(); 
+    {
+        py::gil_scoped_release release;
+        res = NoiseGenerator::apply(mat, noise_type, intensity, key, out_mat);
     }
-    
-    return mat_to_numpy(res);
+    return result_to_numpy(res, out, out_mat);
 }
 
 #ifndef MAIN_BIND
 PYBIND11_MODULE(noise_backend, m) {
     m.doc() = "Noise generation C++ backend";
     m.def("add_noise", &add_noise_wrapper, "Add noise to an image dynamically based on type and intensity",
-          py::arg("image"), py::arg("noise_type"), py::arg("intensity"));
+          py::arg("image"), py::arg("noise_type"), py::arg("intensity"), py::arg("out") = py::none(),
+          py::arg("seed") = py::none());
 }
 #endif
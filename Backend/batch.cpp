@@ -0,0 +1,353 @@
+#pragma once
+#include "binding_utils.h"
+#include "intensity_data_info.h"
+#include "adding_noise.cpp"
+#include "filter_noise.cpp"
+#include "edge_detection.cpp"
+#include "enhance_image.cpp"
+#include "frequency_filters.cpp"
+#include <algorithm>
+#include <atomic>
+#include <exception>
+#include <mutex>
+#include <string>
+#include <vector>
+
+namespace py = pybind11;
+
+// Holds py::object fields, so it gets the hidden visibility of pybind11's own types (an anonymous namespace;
+// the backend is a single translation unit)
+namespace {
+
+// The images of one batch call: the frames of an (N, H, W, C) or (N, H, W) array, or the arrays of a list.
+// Frames are cv::Mat views into the caller's memory (gathered only when their layout is not packed);
+// `owners` keeps the arrays referenced for as long as the views are used.
+struct ImageBatch {
+    std::vector<cv::Mat> images;
+    std::vector<py::object> owners;
+
+    size_t size() const { return images.size(); }
+
+    // Pixels of the largest image, used to choose between per-image and intra-image parallelism
+    double maxPixels() const {
+        double pixels = 0;
+        for (const cv::Mat& image : images) pixels = std::max(pixels, static_cast<double>(image.total()));
+        return pixels;
+    }
+};
+
+}  // namespace
+
+// Shape of one result: rows x cols x channels (a single channel is returned without the channel axis)
+struct BatchShape {
+    int rows;
+    int cols;
+    int channels;
+
+    bool operator==(const BatchShape& other) const {
+        return rows == other.rows && cols == other.cols && channels == other.channels;
+    }
+};
+
+// A 4-D array is (N, H, W, C) and a 3-D array is a stack of N grayscale (H, W) images; anything else is
+// iterated as a sequence of 2-D/3-D arrays, which may differ in size.
+static ImageBatch batch_from_python(const py::object& images) {
+    ImageBatch batch;
+    ProfileStage stage("numpy_to_mat");
+    if (py::isinstance<py::array>(images)) {
+        auto arr = images.cast<py::array_t<unsigned char>>();
+        py::buffer_info buf = arr.request();
+        if (buf.ndim != 3 && buf.ndim != 4) {
+            throw py::value_error("Expected a 4-D (N, H, W, C) or 3-D (N, H, W) uint8 array, or a list of images");
+        }
+        int rows = static_cast<int>(buf.shape[1]);
+        int cols = static_cast<int>(buf.shape[2]);
+        int channels = buf.ndim == 4 ? static_cast<int>(buf.shape[3]) : 1;
+        py::ssize_t ch_stride = buf.ndim == 4 ? buf.strides[3] : 1;
+        const unsigned char* base = static_cast<const unsigned char*>(buf.ptr);
+        for (py::ssize_t i = 0; i < buf.shape[0]; ++i) {
+            batch.images.push_back(strided_to_mat(base + i * buf.strides[0], rows, cols, channels,
+                                                  buf.strides[1], buf.strides[2], ch_stride));
+        }
+        batch.owners.push_back(std::move(arr));
+    } else {
+        for (py::handle item : images) {
+            auto arr = py::reinterpret_borrow<py::object>(item).cast<py::array_t<unsigned char>>();
+            batch.images.push_back(numpy_to_mat(arr));
+            batch.owners.push_back(std::move(arr));
+        }
+    }
+    if (batch.images.empty()) {
+        throw py::value_error("The batch contains no images");
+    }
+    return batch;
+}
+
+// Runs one body per image on OpenCV's native thread pool.
+// Images are handed out one at a time from a shared counter, so workers that get cheap images take more of
+// them. While images are processed concurrently, the parallel loops inside the ops run serially on their
+// worker (OpenCV does not nest parallel regions); when there are fewer images than threads and they are
+// large, the images are instead processed one after another, each using the whole pool.
+class BatchRunner {
+public:
+    // Below this many pixels per image, images are always processed concurrently
+    static constexpr double kIntraImageMinPixels = 1 << 20;
+
+    // Number of images processed at once: `threads` (0 = the whole pool), capped by the pool size
+    static int workers(int threads) {
+        int pool = std::max(1, cv::getNumThreads());
+        return threads > 0 ? std::min(threads, pool) : pool;
+    }
+
+    template <typename Body>
+    static void forEach(size_t count, int threads, double pixels, Body body) {
+        int n_workers = static_cast<int>(std::min<size_t>(workers(threads), count));
+        if (n_workers <= 1 || (count < static_cast<size_t>(workers(threads)) && pixels >= kIntraImageMinPixels)) {
+            for (size_t i = 0; i < count; ++i) body(i);
+            return;
+        }
+
+        std::atomic<size_t> next{0};
+        std::mutex error_mutex;
+        std::exception_ptr error;
+        cv::parallel_for_(cv::Range(0, n_workers), [&](const cv::Range& range) {
+            for (int w = range.start; w < range.end; ++w) {
+                for (size_t i = next++; i < count; i = next++) {
+                    try {
+                        body(i);
+                    } catch (...) {
+                        std::lock_guard<std::mutex> lock(error_mutex);
+                        if (!error) error = std::current_exception();
+                        next = count;  // Stop handing out images
+                    }
+                }
+            }
+        }, n_workers);
+        if (error) {
+            std::rethrow_exception(error);
+        }
+    }
+};
+
+// Runs `op(i, image, dst)` on every image of a batch and returns the results stacked as an
+// (N, rows, cols[, channels]) array when they all share one shape, or as a list of arrays otherwise.
+// `result_shape(image)` gives the shape of each result, so stacked results are written straight into
+// their frame of the output (or of the caller's `out` array). `op` runs without the GIL.
+template <typename T = unsigned char, typename ShapeFn, typename OpFn>
+py::object run_batch(const py::object& images, const py::object& out, int threads, ShapeFn result_shape, OpFn op) {
+    if (threads < 0) {
+        throw py::value_error("threads must be >= 0 (0 uses every thread of the pool)");
+    }
+    ImageBatch batch = batch_from_python(images);
+    size_t count = batch.size();
+
+    std::vector<BatchShape> shapes;
+    for (const cv::Mat& image : batch.images) shapes.push_back(result_shape(image));
+    bool stacked = std::all_of(shapes.begin(), shapes.end(), [&](const BatchShape& s) { return s == shapes[0]; });
+    int depth = cv::DataType<T>::depth;
+
+    if (!stacked) {
+        if (!out.is_none()) {
+            throw py::value_error("`out` needs every result to have the same shape");
+        }
+        std::vector<cv::Mat> results(count);
+        {
+            py::gil_scoped_release release;
+            BatchRunner::forEach(count, threads, batch.maxPixels(), [&](size_t i) {
+                results[i] = op(i, batch.images[i], cv::Mat());
+            });
+        }
+        py::list list;
+        for (cv::Mat& res : results) list.append(mat_to_numpy<T>(std::move(res)));
+        return list;
+    }
+
+    const BatchShape& shape = shapes[0];
+    std::vector<py::ssize_t> dims = { static_cast<py::ssize_t>(count), shape.rows, shape.cols };
+    if (shape.channels > 1) {
+        dims.push_back(shape.channels);
+    }
+
+    py::array_t<T> result;
+    if (out.is_none()) {
+        result = py::array_t<T>(dims);
+    } else {
+        if (!py::isinstance<py::array_t<T>>(out)) {
+            throw py::type_error("`out` must be a numpy array with the same dtype as the result");
+        }
+        result = py::reinterpret_borrow<py::array_t<T>>(out);
+        if (!result.writeable()) {
+            throw py::value_error("`out` must be writeable");
+        }
+        if (result.ndim() != static_cast<py::ssize_t>(dims.size()) ||
+            !std::equal(dims.begin(), dims.end(), result.shape())) {
+            throw py::value_error("`out` has a shape incompatible with the stacked result");
+        }
+    }
+
+    // Frame headers: packed pixels are required, the frame and row strides may be padded
+    py::ssize_t elem = static_cast<py::ssize_t>(sizeof(T));
+    bool packed_pixels = (shape.channels == 1 || result.strides(3) == elem) &&
+                         (shape.cols == 1 || result.strides(2) == elem * shape.channels);
+    if (!packed_pixels || (shape.rows > 1 && result.strides(1) < elem * shape.channels * shape.cols)) {
+        throw py::value_error("`out` must have packed pixels (only the image and row strides may be padded)");
+    }
+    std::vector<cv::Mat> frames;
+    unsigned char* base = reinterpret_cast<unsigned char*>(result.mutable_data());
+    size_t step = shape.rows == 1 ? cv::Mat::AUTO_STEP : static_cast<size_t>(result.strides(1));
+    for (size_t i = 0; i < count; ++i) {
+        frames.emplace_back(shape.rows, shape.cols, CV_MAKETYPE(depth, shape.channels), base + i * result.strides(0), step);
+    }
+
+    {
+        py::gil_scoped_release release;
+        BatchRunner::forEach(count, threads, batch.maxPixels(), [&](size_t i) {
+            cv::Mat res = op(i, batch.images[i], frames[i]);
+            if (res.data != frames[i].data) {
+                CV_Assert(res.size() == frames[i].size() && res.type() == frames[i].type());
+                res.copyTo(frames[i]);
+            }
+        });
+    }
+    return result;
+}
+
+// Result shape of ops that keep the input's channels
+static BatchShape same_shape(const cv::Mat& image) {
+    return { image.rows, image.cols, image.channels() };
+}
+
+// Result shape of grayscale-producing ops: one plane, or BGR with three identical planes
+static auto gray_op_shape(bool single) {
+    return [single](const cv::Mat& image) { return BatchShape{ image.rows, image.cols, single ? 1 : 3 }; };
+}
+
+// Batch wrappers: same parameters as the single-image functions, plus `threads`
+
+// Image i gets the noise of add_noise(images[i], seed=seed + i), so a seeded batch is reproducible
+py::object add_noise_batch_wrapper(py::object images, const std::string& noise_type, double intensity, py::object out,
+                                   py::object seed, int threads) {
+    uint64_t key = resolve_seed(seed);
+    return run_batch(images, out, threads, same_shape, [&](size_t i, const cv::Mat& image, cv::Mat dst) {
+        return NoiseGenerator::apply(image, noise_type, intensity, key + i, dst);
+    });
+}
+
+py::object apply_filter_batch_wrapper(py::object images, const std::string& filter_type, int kernel_size, py::object out,
+                                      const std::string& method, int threads) {
+    return run_batch(images, out, threads, same_shape, [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return SpatialFilter::apply(image, filter_type, kernel_size, dst, method);
+    });
+}
+
+py::object canny_batch_wrapper(py::object images, double t1, double t2, py::object out, py::object single_channel,
+                               int threads) {
+    bool single = resolve_single_channel(single_channel);
+    return run_batch(images, out, threads, gray_op_shape(single), [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return single ? detectEdgesCannyGray(IntensityDataInfo::grayView(image), t1, t2, dst)
+                      : detectEdgesCanny(image, t1, t2, dst);
+    });
+}
+
+py::object sobel_batch_wrapper(py::object images, int ksize, py::object out, py::object single_channel, int threads) {
+    check_sobel_ksize(ksize);
+    bool single = resolve_single_channel(single_channel);
+    return run_batch(images, out, threads, gray_op_shape(single), [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return single ? detectEdgesSobelGray(IntensityDataInfo::grayView(image), ksize, dst)
+                      : detectEdgesSobel(image, ksize, dst);
+    });
+}
+
+py::object prewitt_batch_wrapper(py::object images, py::object out, py::object single_channel, int threads) {
+    bool single = resolve_single_channel(single_channel);
+    return run_batch(images, out, threads, gray_op_shape(single), [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return single ? detectEdgesPrewittGray(IntensityDataInfo::grayView(image), dst)
+                      : detectEdgesPrewitt(image, dst);
+    });
+}
+
+py::object roberts_batch_wrapper(py::object images, py::object out, py::object single_channel, int threads) {
+    bool single = resolve_single_channel(single_channel);
+    return run_batch(images, out, threads, gray_op_shape(single), [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return single ? detectEdgesRobertsGray(IntensityDataInfo::grayView(image), dst)
+                      : detectEdgesRoberts(image, dst);
+    });
+}
+
+py::object equalize_batch_wrapper(py::object images, py::object out, py::object single_channel, int threads) {
+    bool single = resolve_single_channel(single_channel);
+    return run_batch(images, out, threads, gray_op_shape(single), [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return single ? ImageEnhancer::equalizeGray(IntensityDataInfo::grayView(image), dst)
+                      : ImageEnhancer::equalizeHistogram(image, dst);
+    });
+}
+
+py::object normalize_batch_wrapper(py::object images, py::object out, py::object single_channel, int threads) {
+    bool single = resolve_single_channel(single_channel);
+    return run_batch(images, out, threads, gray_op_shape(single), [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return single ? ImageEnhancer::normalizeGray(IntensityDataInfo::grayView(image), dst)
+                      : ImageEnhancer::normalizeImage(image, dst);
+    });
+}
+
+py::object apply_fft_batch_wrapper(py::object images, const std::string& filter_type, int radius, py::object out,
+                                   py::object single_channel, int threads) {
+    bool single = resolve_single_channel(single_channel);
+    return run_batch(images, out, threads, gray_op_shape(single), [&](size_t, const cv::Mat& image, cv::Mat dst) {
+        return single ? FrequencyFilters::applyFFTFilterGray(IntensityDataInfo::grayView(image), filter_type, radius, dst)
+                      : FrequencyFilters::applyFFTFilter(image, filter_type, radius, dst);
+    });
+}
+
+// Histograms stacked as (N, channels, 256) int32
+py::object histogram_batch_wrapper(py::object images, py::object out, int threads) {
+    auto hist_shape = [](const cv::Mat& image) { return BatchShape{ image.channels(), 256, 1 }; };
+    return run_batch<int>(images, out, threads, hist_shape, [](size_t, const cv::Mat& image, cv::Mat dst) {
+        IntensityDataInfo::computeHistogram(image, dst);
+        return dst;
+    });
+}
+
+// Registers the batched ops and the thread pool controls on the given module
+inline void bind_batch(py::module_& m) {
+    m.def("set_num_threads", [](int threads) { cv::setNumThreads(threads); },
+          "Set the size of the native thread pool used by every op (0 runs everything on the calling thread, "
+          "a negative value restores the default)", py::arg("threads"));
+    m.def("get_num_threads", []() { return cv::getNumThreads(); }, "Size of the native thread pool");
+
+    m.def("add_noise_batch", profiled("add_noise_batch", &add_noise_batch_wrapper),
+          "add_noise on every image of a batch; image i uses seed + i",
+          py::arg("images"), py::arg("noise_type"), py::arg("intensity"), py::arg("out") = py::none(),
+          py::arg("seed") = py::none(), py::arg("threads") = 0);
+    m.def("apply_filter_batch", profiled("apply_filter_batch", &apply_filter_batch_wrapper),
+          "apply_filter on every image of a batch",
+          py::arg("images"), py::arg("filter_type"), py::arg("kernel_size"), py::arg("out") = py::none(),
+          py::arg("method") = "auto", py::arg("threads") = 0);
+    m.def("canny_batch", profiled("canny_batch", &canny_batch_wrapper), "canny on every image of a batch",
+          py::arg("images"), py::arg("threshold1") = 100.0, py::arg("threshold2") = 200.0, py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none(), py::arg("threads") = 0);
+    m.def("sobel_batch", profiled("sobel_batch", &sobel_batch_wrapper), "sobel on every image of a batch",
+          py::arg("images"), py::arg("ksize") = 3, py::arg("out") = py::none(), py::arg("single_channel") = py::none(),
+          py::arg("threads") = 0);
+    m.def("prewitt_batch", profiled("prewitt_batch", &prewitt_batch_wrapper), "prewitt on every image of a batch",
+          py::arg("images"), py::arg("out") = py::none(), py::arg("single_channel") = py::none(), py::arg("threads") = 0);
+    m.def("roberts_batch", profiled("roberts_batch", &roberts_batch_wrapper), "roberts on every image of a batch",
+          py::arg("images"), py::arg("out") = py::none(), py::arg("single_channel") = py::none(), py::arg("threads") = 0);
+    m.def("equalize_batch", profiled("equalize_batch", &equalize_batch_wrapper), "equalize on every image of a batch",
+          py::arg("images"), py::arg("out") = py::none(), py::arg("single_channel") = py::none(), py::arg("threads") = 0);
+    m.def("normalize_batch", profiled("normalize_batch", &normalize_batch_wrapper), "normalize on every image of a batch",
+          py::arg("images"), py::arg("out") = py::none(), py::arg("single_channel") = py::none(), py::arg("threads") = 0);
+    m.def("apply_fft_batch", profiled("apply_fft_batch", &apply_fft_batch_wrapper), "apply_fft on every image of a batch",
+          py::arg("images"), py::arg("filter_type"), py::arg("radius"), py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none(), py::arg("threads") = 0);
+    m.def("calculate_histogram_batch", profiled("calculate_histogram_batch", &histogram_batch_wrapper),
+          "calculate_histogram on every image of a batch, stacked as (N, channels, 256)",
+          py::arg("images"), py::arg("out") = py::none(), py::arg("threads") = 0);
+}
+
+#ifndef MAIN_BIND
+PYBIND11_MODULE(batch_backend, m) {
+    m.doc() = "Batched image ops C++ backend";
+    bind_batch(m);
+}
+#endif
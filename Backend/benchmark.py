@@ -0,0 +1,591 @@
+"""Benchmark suite for the C++ backend.
+
+Runs every image op of the `backend` module over the pictures in `test_cases/` and over synthetic
+gray/BGR images of 1 to 100 megapixels, sweeping the parameters that change the cost (kernel sizes,
+Sobel ksize, FFT radii, ...). Batched ops run over the 256x256 tiles of each image, next to a loop of
+single-image calls on the same tiles. Each case reports latency percentiles, megapixels per second and the
+peak resident memory while it ran, and the whole run can be written as JSON.
+
+    python benchmark.py --json results.json                       # full run
+    python benchmark.py --quick --ops "apply_filter*" --json new.json
+    python benchmark.py --quick --baseline results.json           # run and compare
+    python benchmark.py --compare new.json results.json           # compare two stored runs
+
+In comparison mode a case regresses when its median latency grows by more than `--tolerance`
+(and by more than `--min-delta-ms`); the exit status is 1 if any case regressed, so the script can
+gate backend upgrades.
+"""
+import argparse
+import datetime
+import fnmatch
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import cv2
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEST_CASES_DIR = os.path.join(HERE, "test_cases")
+
+DEFAULT_SIZES = (1, 4, 16, 100)
+QUICK_SIZES = (1,)
+PERCENTILES = (50, 90, 99)
+
+# Typical 4-5 step chains: (label, Pipeline steps)
+PIPELINE_CHAINS = (
+    ("noise>median5>normalize>sobel3", [
+        ("add_noise", {"noise_type": "Gaussian", "intensity": 10, "seed": 1}),
+        ("apply_filter", {"filter_type": "Median", "kernel_size": 5}),
+        "normalize",
+        ("sobel", {"ksize": 3}),
+    ]),
+    ("gauss5>normalize>gamma>sobel3>threshold", [
+        ("apply_filter", {"filter_type": "Gaussian", "kernel_size": 5}),
+        "normalize",
+        ("gamma", {"gamma": 0.8}),
+        ("sobel", {"ksize": 3}),
+        ("threshold", {"threshold": 60}),
+    ]),
+    ("median5>equalize>prewitt>invert", [
+        ("apply_filter", {"filter_type": "Median", "kernel_size": 5}),
+        "equalize",
+        "prewitt",
+        "invert",
+    ]),
+)
+
+backend = None  # imported in main() so --backend-path can pick the build to measure
+
+
+# ==========================================
+# --- INPUTS ---
+# ==========================================
+
+class BenchInput:
+    """One benchmark image, created on first use and released after its cases have run."""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self.image = None
+
+    def load(self):
+        if self.image is None:
+            self.image = self._loader()
+        return self.image
+
+    def release(self):
+        self.image = None
+
+
+def synthetic_image(megapixels, channels, seed=0):
+    """4:3 test pattern (smooth gradients, edges and mild noise) of about `megapixels` MP."""
+    height = int(round(np.sqrt(megapixels * 1e6 * 3 / 4)))
+    width = int(round(height * 4 / 3))
+    y = np.linspace(0, 6 * np.pi, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 8 * np.pi, width, dtype=np.float32)[None, :]
+    base = 96 + 64 * np.sin(x) * np.cos(y)
+    base += np.where((np.floor(x) + np.floor(y)) % 2 == 0, 32, -32).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    planes = []
+    for c in range(channels):
+        plane = base + 24 * c + rng.normal(0, 8, size=(height, width)).astype(np.float32)
+        planes.append(np.clip(plane, 0, 255).astype(np.uint8))
+        del plane
+    return planes[0] if channels == 1 else np.dstack(planes)
+
+
+def collect_inputs(sizes, include_test_cases=True, include_synthetic=True, quick=False):
+    inputs = []
+    if include_test_cases:
+        for category in sorted(os.listdir(TEST_CASES_DIR)):
+            paths = sorted(glob.glob(os.path.join(TEST_CASES_DIR, category, "*")))
+            if quick:
+                paths = paths[:1]
+            for path in paths:
+                name = "%s/%s" % (category, os.path.splitext(os.path.basename(path))[0])
+                inputs.append(BenchInput(name, lambda path=path: cv2.imread(path, cv2.IMREAD_COLOR)))
+    if include_synthetic:
+        for megapixels in sizes:
+            for channels, kind in ((1, "gray"), (3, "bgr")):
+                name = "synthetic/%gMP_%s" % (megapixels, kind)
+                inputs.append(BenchInput(name, lambda mp=megapixels, cn=channels: synthetic_image(mp, cn)))
+    return inputs
+
+
+# ==========================================
+# --- CASES ---
+# ==========================================
+
+class BenchCase:
+    """One op with fixed parameters. `prepare(image)` does the untimed setup and returns the timed callable."""
+
+    def __init__(self, op, params, prepare, color_only=False):
+        self.op = op
+        self.params = params
+        self.prepare = prepare
+        self.color_only = color_only
+
+    @property
+    def label(self):
+        if not self.params:
+            return self.op
+        return "%s[%s]" % (self.op, ",".join("%s=%s" % item for item in self.params.items()))
+
+
+def _call(name, *args, **kwargs):
+    # Looked up when the case runs, so a baseline build that lacks the op reports an error for it instead of failing
+    def prepare(image):
+        fn = getattr(backend, name)
+        return lambda: fn(image, *args, **kwargs)
+    return prepare
+
+
+def _image_stats(stride):
+    def prepare(image):
+        def run():
+            backend.clear_stats_cache()  # results are cached per array; measure the computation
+            return backend.image_stats(image, stride=stride)
+        return run
+    return prepare
+
+
+def _spectrum_apply(filter_type, radius):
+    def prepare(image):
+        spectrum = backend.Spectrum(image)
+        return lambda: spectrum.apply(filter_type, radius)
+    return prepare
+
+
+def _canny_state_apply(threshold1, threshold2):
+    def prepare(image):
+        state = backend.CannyState(image)
+        return lambda: state.apply(threshold1, threshold2)
+    return prepare
+
+
+def _second_image(image):
+    return np.ascontiguousarray(image[::-1, ::-1])
+
+
+def _create_hybrid(radius_a, radius_b):
+    def prepare(image):
+        other = _second_image(image)
+        return lambda: backend.create_hybrid(image, other, radius_a, radius_b)
+    return prepare
+
+
+def _hybrid_engine():
+    def prepare(image):
+        other = _second_image(image)
+        return lambda: backend.HybridEngine(image, other)
+    return prepare
+
+
+def _hybrid_render(radius_a, radius_b):
+    def prepare(image):
+        engine = backend.HybridEngine(image, _second_image(image))
+        radii = [(radius_a, radius_b), (radius_a + 1, radius_b + 1)]
+        state = {"i": 0}
+
+        def run():
+            # Alternate cutoffs so every call recomputes both halves instead of hitting the engine's cache
+            state["i"] ^= 1
+            return engine.render(*radii[state["i"]])
+        return run
+    return prepare
+
+
+def _pipeline(steps):
+    def prepare(image):
+        pipeline = backend.Pipeline(steps)
+        return lambda: pipeline.run(image)
+    return prepare
+
+
+def _stepwise(steps):
+    """The same chain as _pipeline(steps), one module function call per step."""
+    def prepare(image):
+        calls = [(getattr(backend, step), {}) if isinstance(step, str) else (getattr(backend, step[0]), step[1])
+                 for step in steps]
+
+        def run():
+            result = image
+            for fn, kwargs in calls:
+                result = fn(result, **kwargs)
+            return result
+        return run
+    return prepare
+
+
+def _patches(image, side):
+    """Stack of the whole side x side tiles of `image` (the tile shrinks to fit smaller images)."""
+    side = min(side, image.shape[0], image.shape[1])
+    rows, cols = image.shape[0] // side, image.shape[1] // side
+    tiles = image[:rows * side, :cols * side].reshape(rows, side, cols, side, *image.shape[2:])
+    return np.ascontiguousarray(tiles.swapaxes(1, 2).reshape(rows * cols, side, side, *image.shape[2:]))
+
+
+def _per_patch(name, side, batched, *args, **kwargs):
+    # The same tiles either go through one <name>_batch call or through a Python loop of <name> calls
+    def prepare(image):
+        patches = _patches(image, side)
+        if batched:
+            fn = getattr(backend, name + "_batch")
+            return lambda: fn(patches, *args, **kwargs)
+        fn = getattr(backend, name)
+        return lambda: [fn(patch, *args, **kwargs) for patch in patches]
+    return prepare
+
+
+def build_cases(quick=False):
+    """Every benchmarked op and parameter combination. `quick` keeps one or two points per sweep."""
+    kernel_sizes = (3, 9, 31) if quick else (3, 5, 9, 15, 31, 61, 101)
+    median_sizes = (3, 9, 31) if quick else (3, 5, 9, 15, 31, 61)
+    sobel_sizes = (3, 7) if quick else (3, 5, 7)
+    radii = (10, 60) if quick else (5, 10, 30, 60, 120)
+    noise_types = ("Gaussian",) if quick else ("Uniform", "Gaussian", "Salt & Pepper")
+
+    cases = [
+        BenchCase("to_grayscale", {}, _call("to_grayscale"), color_only=True),
+        BenchCase("calculate_histogram", {}, _call("calculate_histogram")),
+        BenchCase("calculate_cdf", {}, _call("calculate_cdf")),
+    ]
+    for stride in ((1,) if quick else (1, 4)):
+        cases.append(BenchCase("image_stats", {"stride": stride}, _image_stats(stride)))
+    for noise_type in noise_types:
+        cases.append(BenchCase("add_noise", {"noise_type": noise_type},
+                               _call("add_noise", noise_type, 20, seed=1)))
+    for filter_type, sizes in (("Average", kernel_sizes), ("Gaussian", kernel_sizes), ("Median", median_sizes)):
+        for ksize in sizes:
+            cases.append(BenchCase("apply_filter", {"filter_type": filter_type, "kernel_size": ksize},
+                                   _call("apply_filter", filter_type, ksize)))
+    for t1, t2 in (((100, 200),) if quick else ((100, 200), (30, 90))):
+        cases.append(BenchCase("canny", {"threshold1": t1, "threshold2": t2}, _call("canny", t1, t2)))
+    cases.append(BenchCase("CannyState", {}, _call("CannyState")))
+    for t1, t2 in (((100, 200),) if quick else ((100, 200), (30, 90))):
+        cases.append(BenchCase("CannyState.apply", {"threshold1": t1, "threshold2": t2}, _canny_state_apply(t1, t2)))
+    for ksize in sobel_sizes:
+        cases.append(BenchCase("sobel", {"ksize": ksize}, _call("sobel", ksize)))
+    cases += [
+        BenchCase("gradients", {"outputs": "all"}, _call("gradients")),
+        BenchCase("gradients", {"outputs": "magnitude+orientation", "l1": True},
+                  _call("gradients", outputs=("magnitude", "orientation"), l1=True)),
+        BenchCase("prewitt", {}, _call("prewitt")),
+        BenchCase("roberts", {}, _call("roberts")),
+        BenchCase("equalize", {}, _call("equalize")),
+        BenchCase("normalize", {}, _call("normalize")),
+        BenchCase("clahe", {"preserve_color": False}, _call("clahe", 2.0, (8, 8), False)),
+        BenchCase("clahe", {"preserve_color": True}, _call("clahe", 2.0, (8, 8), True), color_only=True),
+        BenchCase("gamma", {"gamma": 0.8}, _call("gamma", 0.8)),
+        BenchCase("brightness_contrast", {"brightness": 10, "contrast": 1.2}, _call("brightness_contrast", 10, 1.2)),
+        BenchCase("threshold", {"threshold": 127}, _call("threshold", 127)),
+        BenchCase("invert", {}, _call("invert")),
+        BenchCase("plan_filter", {"filter_type": "Gaussian", "kernel_size": 31}, _call("plan_filter", "Gaussian", 31)),
+    ]
+    for filter_type in ("low_pass", "high_pass"):
+        for radius in radii:
+            cases.append(BenchCase("apply_fft", {"filter_type": filter_type, "radius": radius},
+                                   _call("apply_fft", filter_type, radius)))
+    cases.append(BenchCase("Spectrum", {}, _call("Spectrum")))
+    for radius in radii:
+        cases.append(BenchCase("Spectrum.apply", {"filter_type": "low_pass", "radius": radius},
+                               _spectrum_apply("low_pass", radius)))
+    # Many small images: batched calls against a loop of single-image calls over the same 256x256 tiles
+    for name, args in (("sobel", (3,)), ("equalize", ()), ("apply_filter", ("Gaussian", 5)), ("calculate_histogram", ())):
+        for batched in (False, True):
+            op = name + "_batch" if batched else name
+            cases.append(BenchCase(op, {"patch": 256}, _per_patch(name, 256, batched, *args)))
+    cases += [
+        BenchCase("create_hybrid", {"radius_a": 15, "radius_b": 10}, _create_hybrid(15, 10)),
+        BenchCase("HybridEngine", {}, _hybrid_engine()),
+        BenchCase("HybridEngine.render", {"radius_a": 15, "radius_b": 10}, _hybrid_render(15, 10)),
+    ]
+    # Each chain runs as a Pipeline and as the equivalent step-by-step calls
+    for label, steps in PIPELINE_CHAINS:
+        cases += [
+            BenchCase("Pipeline", {"steps": label}, _pipeline(steps)),
+            BenchCase("Pipeline", {"steps": label, "stepwise": True}, _stepwise(steps)),
+        ]
+    return cases
+
+
+# ==========================================
+# --- MEASUREMENT ---
+# ==========================================
+
+class PeakRSS:
+    """Peak resident set size in bytes. On Linux the kernel's high-water mark is reset before every case,
+    elsewhere the figure is the peak of the whole process so far (`scope` tells which one was measured)."""
+
+    def __init__(self):
+        self.scope = "case" if self._reset() else ("process" if resource is not None else None)
+
+    @staticmethod
+    def _reset():
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _status_kb(field):
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith(field + ":"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return None
+
+    def current(self):
+        kb = self._status_kb("VmRSS")
+        return kb * 1024 if kb is not None else None
+
+    def start(self):
+        if self.scope == "case":
+            self._reset()
+
+    def peak(self):
+        if self.scope == "case":
+            kb = self._status_kb("VmHWM")
+            return kb * 1024 if kb is not None else None
+        if self.scope == "process":
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB elsewhere
+        return None
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile of an already sorted list."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure(fn, warmup, repeat, max_time, min_runs=3):
+    """Run `fn` `warmup` times untimed, then up to `repeat` timed runs (fewer once `max_time` seconds
+    have been spent, but never fewer than `min_runs`). Returns the per-run latencies in seconds."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    budget_start = time.perf_counter()
+    while len(times) < repeat:
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        if len(times) >= min_runs and time.perf_counter() - budget_start > max_time:
+            break
+    return times
+
+
+def run_case(case, bench_input, image, args, rss):
+    megapixels = image.shape[0] * image.shape[1] / 1e6
+    result = {
+        "id": "%s@%s" % (case.label, bench_input.name),
+        "op": case.op,
+        "params": case.params,
+        "input": bench_input.name,
+        "shape": list(image.shape),
+        "megapixels": round(megapixels, 4),
+    }
+    try:
+        fn = case.prepare(image)
+        rss_before = rss.current()
+        rss.start()
+        times = measure(fn, args.warmup, args.repeat, args.max_time)
+        peak = rss.peak()
+    except Exception as e:  # report and keep going; one broken op should not hide the rest
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+        return result
+
+    times_ms = sorted(t * 1e3 for t in times)
+    result["runs"] = len(times_ms)
+    result["ms"] = {"min": times_ms[0], "mean": sum(times_ms) / len(times_ms)}
+    for q in PERCENTILES:
+        result["ms"]["p%d" % q] = percentile(times_ms, q)
+    result["mp_per_s"] = megapixels / (result["ms"]["p50"] / 1e3) if result["ms"]["p50"] > 0 else None
+    if peak is not None:
+        result["peak_rss_mb"] = peak / 2**20
+        if rss_before is not None and rss.scope == "case":
+            result["extra_rss_mb"] = max(0, peak - rss_before) / 2**20
+    return result
+
+
+def environment(rss_scope):
+    info = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv_python": cv2.__version__,
+        "backend": getattr(backend, "__file__", None),
+        "rss_scope": rss_scope,
+    }
+    try:
+        info["filter_planner"] = backend.get_filter_planner()
+    except Exception:
+        pass
+    return info
+
+
+# ==========================================
+# --- COMPARISON ---
+# ==========================================
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Match cases by id and classify the change of their median latency.
+    Returns (rows, regressions) where rows are (id, base_ms, new_ms, ratio, verdict)."""
+    base_by_id = {r["id"]: r for r in baseline["results"] if "ms" in r}
+    rows, regressions = [], []
+    for r in current["results"]:
+        if "ms" not in r or r["id"] not in base_by_id:
+            continue
+        base_ms = base_by_id[r["id"]]["ms"]["p50"]
+        new_ms = r["ms"]["p50"]
+        ratio = new_ms / base_ms if base_ms > 0 else float("inf")
+        delta = new_ms - base_ms
+        verdict = "ok"
+        if ratio > 1 + tolerance and delta > min_delta_ms:
+            verdict = "REGRESSION"
+            regressions.append(r["id"])
+        elif ratio < 1 / (1 + tolerance) and -delta > min_delta_ms:
+            verdict = "faster"
+        rows.append((r["id"], base_ms, new_ms, ratio, verdict))
+    return rows, regressions
+
+
+def print_comparison(rows, regressions, current, baseline):
+    width = max([len(row[0]) for row in rows] + [4])
+    print("\n%-*s %12s %12s %8s" % (width, "case", "base p50 ms", "new p50 ms", "ratio"))
+    for case_id, base_ms, new_ms, ratio, verdict in rows:
+        mark = "" if verdict == "ok" else "  " + verdict
+        print("%-*s %12.3f %12.3f %7.2fx%s" % (width, case_id, base_ms, new_ms, ratio, mark))
+    current_ids = {r["id"] for r in current["results"]}
+    base_ids = {r["id"] for r in baseline["results"]}
+    missing = sorted(base_ids - current_ids)
+    if missing:
+        print("\n%d baseline case(s) were not run: %s" % (len(missing), ", ".join(missing[:10]) + (" ..." if len(missing) > 10 else "")))
+    errors = [r["id"] for r in current["results"] if "error" in r]
+    if errors:
+        print("%d case(s) failed: %s" % (len(errors), ", ".join(errors)))
+    print("\n%d compared, %d regression(s)" % (len(rows), len(regressions)))
+
+
+# ==========================================
+# --- CLI ---
+# ==========================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true",
+                        help="one image per test_cases category, 1 MP synthetic inputs and short parameter sweeps")
+    parser.add_argument("--sizes", type=lambda s: [float(v) for v in s.split(",") if v],
+                        help="synthetic image sizes in megapixels (default: %s)" % ",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--inputs", choices=("all", "test_cases", "synthetic"), default="all")
+    parser.add_argument("--ops", default="*",
+                        help="comma-separated glob patterns matched against the case label, e.g. 'apply_filter*,sobel*'")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20, help="maximum timed runs per case")
+    parser.add_argument("--max-time", type=float, default=2.0,
+                        help="stop timing a case after this many seconds (at least 3 runs are always made)")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the run against a stored JSON result")
+    parser.add_argument("--compare", nargs=2, metavar=("CURRENT", "BASELINE"),
+                        help="compare two stored JSON results without running anything")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="relative slowdown of the median latency that counts as a regression (default 0.10)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="ignore slowdowns smaller than this many milliseconds (timer noise)")
+    parser.add_argument("--backend-path", metavar="DIR", help="directory holding the backend module to measure")
+    return parser.parse_args(argv)
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    global backend
+    args = parse_args(argv)
+
+    if args.compare:
+        current, baseline = load_json(args.compare[0]), load_json(args.compare[1])
+        rows, regressions = compare(current, baseline, args.tolerance, args.min_delta_ms)
+        print_comparison(rows, regressions, current, baseline)
+        return 1 if regressions else 0
+
+    if args.backend_path:
+        sys.path.insert(0, os.path.abspath(args.backend_path))
+    try:
+        os.add_dll_directory("C:/msys64/mingw64/bin")
+    except Exception:
+        pass
+    import backend as backend_module
+    backend = backend_module
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    inputs = collect_inputs(sizes, args.inputs in ("all", "test_cases"), args.inputs in ("all", "synthetic"), args.quick)
+    patterns = [p.strip() for p in args.ops.split(",") if p.strip()]
+    cases = [c for c in build_cases(args.quick) if any(fnmatch.fnmatchcase(c.label, p) for p in patterns)]
+    if not cases:
+        print("No case matches --ops %r" % args.ops)
+        return 2
+
+    rss = PeakRSS()
+    report = {"environment": environment(rss.scope), "results": []}
+    print("%d case(s) x %d input(s)" % (len(cases), len(inputs)))
+    for bench_input in inputs:
+        image = bench_input.load()
+        if image is None:
+            print("  skipped %s (could not be read)" % bench_input.name)
+            continue
+        for case in cases:
+            if case.color_only and image.ndim != 3:
+                continue
+            result = run_case(case, bench_input, image, args, rss)
+            report["results"].append(result)
+            if "error" in result:
+                print("  %-72s ERROR %s" % (result["id"], result["error"]))
+            else:
+                ms = result["ms"]
+                rss_text = " %8.1f MB" % result["peak_rss_mb"] if "peak_rss_mb" in result else ""
+                print("  %-72s p50 %9.3f ms  p90 %9.3f ms  %8.1f MP/s%s" %
+                      (result["id"], ms["p50"], ms["p90"], result["mp_per_s"] or 0, rss_text))
+        image = None
+        bench_input.release()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote %s" % args.json)
+
+    if args.baseline:
+        baseline = load_json(args.baseline)
+        rows, regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        print_comparison(rows, regressions, report, baseline)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,29 +4,147 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
 #include <cstring>
+#include <vector>
+#include <atomic>
+#include "profiler.h"
 
 namespace py = pybind11;
 
+// Helper to wrap a strided uint8 buffer (rows x cols x channels, strides in bytes) as a cv::Mat.
+// cv::Mat can only describe a custom row stride, so layouts whose pixels/channels are not packed
+// (img[:, ::2], img[..., 0], negative strides) are gathered into a compact Mat instead.
+inline cv::Mat strided_to_mat(const unsigned char* src, int rows, int cols, int channels,
+                              py::ssize_t row_stride, py::ssize_t col_stride, py::ssize_t ch_stride) {
+    int type = CV_8UC(channels);
+    bool packed_pixels = (channels == 1 || ch_stride == 1) && (cols == 1 || col_stride == channels);
+    size_t min_step = static_cast<size_t>(cols) * channels;
+    if (packed_pixels && (rows == 1 || (row_stride > 0 && static_cast<size_t>(row_stride) >= min_step))) {
+        // Zero-copy view, honouring the row stride of slices such as img[::2] or img[y0:y1, x0:x1]
+        size_t step = rows == 1 ? cv::Mat::AUTO_STEP : static_cast<size_t>(row_stride);
+        return cv::Mat(rows, cols, type, const_cast<unsigned char*>(src), step);
+    }
+
+    // Strided gather for everything cv::Mat cannot describe directly
+    cv::Mat mat(rows, cols, type);
+    Profiler::addCopied(mat.total() * mat.elemSize());
+    for (int y = 0; y < rows; ++y) {
+        const unsigned char* src_row = src + y * row_stride;
+        uchar* dst_row = mat.ptr<uchar>(y);
+        for (int x = 0; x < cols; ++x) {
+            const unsigned char* src_px = src_row + x * col_stride;
+            for (int c = 0; c < channels; ++c) {
+                dst_row[x * channels + c] = src_px[c * ch_stride];
+            }
+        }
+    }
+    return mat;
+}
+
 // Helper to convert pybind11 numpy array to cv::Mat
+// The returned Mat borrows the array's memory (no copy) unless strided_to_mat has to gather it. Wrappers
+// take the py::array by value, which holds a reference for the whole call, so the buffer stays pinned
+// while the GIL is released.
 inline cv::Mat numpy_to_mat(py::array_t<unsigned char>& input) {
+    ProfileStage stage("numpy_to_mat");
     py::buffer_info buf = input.request();
-    int channels = buf.ndim == 3 ? buf.shape[2] : 1;
-    int type = channels == 3 ? CV_8UC3 : CV_8UC1;
-    cv::Mat mat(buf.shape[0], buf.shape[1], type, (unsigned char*)buf.ptr);
-    return mat;
+    if (buf.ndim != 2 && buf.ndim != 3) {
+        throw py::value_error("Expected a 2-D (H, W) or 3-D (H, W, C) uint8 image array");
+    }
+
+    int rows = static_cast<int>(buf.shape[0]);
+    int cols = static_cast<int>(buf.shape[1]);
+    int channels = buf.ndim == 3 ? static_cast<int>(buf.shape[2]) : 1;
+    py::ssize_t ch_stride = buf.ndim == 3 ? buf.strides[2] : 1;
+    return strided_to_mat(static_cast<const unsigned char*>(buf.ptr), rows, cols, channels,
+                          buf.strides[0], buf.strides[1], ch_stride);
 }
 
 // Helper to convert cv::Mat to pybind11 numpy array
-inline py::array_t<unsigned char> mat_to_numpy(const cv::Mat& input) {
-    if (input.channels() == 3) {
-        py::array_t<unsigned char> dst({ input.rows, input.cols, 3 });
-        py::buffer_info buf = dst.request();
-        std::memcpy(buf.ptr, input.data, input.total() * 3);
-        return dst;
-    } else {
-        py::array_t<unsigned char> dst({ input.rows, input.cols });
-        py::buffer_info buf = dst.request();
-        std::memcpy(buf.ptr, input.data, input.total());
-        return dst;
+// The Mat's buffer is handed to NumPy without a copy: a heap-allocated Mat header keeps the
+// reference count alive and is released by the capsule when the array is garbage collected.
+template <typename T = unsigned char>
+inline py::array_t<T> mat_to_numpy(cv::Mat input) {
+    ProfileStage stage("mat_to_numpy");
+    if (!input.u) {
+        // Mat wraps foreign memory (e.g. another numpy buffer) that it does not own, so take a copy
+        input = input.clone();
+        Profiler::addCopied(input.total() * input.elemSize());
+    }
+
+    int channels = input.channels();
+    std::vector<py::ssize_t> shape = { input.rows, input.cols };
+    std::vector<py::ssize_t> strides = { static_cast<py::ssize_t>(input.step[0]),
+                                         static_cast<py::ssize_t>(input.elemSize()) };
+    if (channels > 1) {
+        shape.push_back(channels);
+        strides.push_back(static_cast<py::ssize_t>(input.elemSize1()));
+    }
+
+    cv::Mat* owner = new cv::Mat(std::move(input));
+    py::capsule base(owner, [](void* p) { delete static_cast<cv::Mat*>(p); });
+    return py::array_t<T>(shape, strides, reinterpret_cast<T*>(owner->data), base);
+}
+
+// Helper to wrap an optional caller-provided `out` array as a writable cv::Mat header.
+// Returns an empty Mat when `out` is None so ops fall back to allocating their own result.
+template <typename T = unsigned char>
+inline cv::Mat out_to_mat(const py::object& out) {
+    if (out.is_none()) {
+        return cv::Mat();
     }
+    if (!py::isinstance<py::array_t<T>>(out)) {
+        throw py::type_error("`out` must be a numpy array with the same dtype as the result");
+    }
+    py::array arr = py::reinterpret_borrow<py::array>(out);
+    if (!arr.writeable()) {
+        throw py::value_error("`out` must be writeable");
+    }
+    if (arr.ndim() != 2 && arr.ndim() != 3) {
+        throw py::value_error("`out` must be a 2-D (H, W) or 3-D (H, W, C) array");
+    }
+
+    int rows = static_cast<int>(arr.shape(0));
+    int cols = static_cast<int>(arr.shape(1));
+    int channels = arr.ndim() == 3 ? static_cast<int>(arr.shape(2)) : 1;
+    py::ssize_t elem = static_cast<py::ssize_t>(sizeof(T));
+    bool packed_pixels = (channels == 1 || arr.strides(2) == elem) &&
+                         (cols == 1 || arr.strides(1) == elem * channels);
+    if (!packed_pixels || (rows > 1 && arr.strides(0) < elem * channels * cols)) {
+        throw py::value_error("`out` must have packed pixels (only the row stride may be padded)");
+    }
+
+    size_t step = rows == 1 ? cv::Mat::AUTO_STEP : static_cast<size_t>(arr.strides(0));
+    return cv::Mat(rows, cols, CV_MAKETYPE(cv::DataType<T>::depth, channels), arr.mutable_data(), step);
+}
+
+// Helper to return an op result, either into the caller's `out` array or as a new zero-copy array.
+// Ops write straight into `out_mat` when its shape/type match, in which case nothing is copied;
+// otherwise the result is copied over if compatible, and a mismatch raises ValueError.
+template <typename T = unsigned char>
+inline py::array_t<T> result_to_numpy(const cv::Mat& res, const py::object& out, cv::Mat out_mat) {
+    if (out.is_none()) {
+        return mat_to_numpy<T>(res);
+    }
+    if (res.data != out_mat.data) {
+        if (res.size() != out_mat.size() || res.type() != out_mat.type()) {
+            throw py::value_error("`out` has shape/channels incompatible with the result");
+        }
+        ProfileStage stage("mat_to_numpy");
+        py::gil_scoped_release release;
+        res.copyTo(out_mat);
+        Profiler::addCopied(res.total() * res.elemSize());
+    }
+    return py::reinterpret_borrow<py::array_t<T>>(out);
+}
+
+// Module-wide default for the `single_channel` option of grayscale-producing ops.
+// When off, those ops expand their result to 3 identical BGR planes for display consistency.
+inline std::atomic<bool>& single_channel_default() {
+    static std::atomic<bool> enabled{false};
+    return enabled;
+}
+
+// Resolve a per-call `single_channel` argument (None means "use the module-wide default")
+inline bool resolve_single_channel(const py::object& single_channel) {
+    return single_channel.is_none() ? single_channel_default().load() : single_channel.cast<bool>();
 }
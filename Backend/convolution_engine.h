@@ -0,0 +1,292 @@
+#pragma once
+#include <opencv2/opencv.hpp>
+#include <vector>
+#include <cstdlib>
+#include <climits>
+#include <algorithm>
+
+class ConvolutionEngine {
+private:
+    static int gcd(int a, int b) {
+        while (b != 0) {
+            int t = a % b;
+            a = b;
+            b = t;
+        }
+        return a;
+    }
+
+    static double absSum(const std::vector<int>& v) {
+        double s = 0;
+        for (int k : v) s += std::abs(k);
+        return s;
+    }
+
+    // Row pass over every padded row, then column pass. Loops run tap-major over contiguous rows
+    // (dst[x] += k * src[x]) so the compiler can vectorize the integer multiply-accumulate.
+    template <typename Acc>
+    static cv::Mat separablePass(const cv::Mat& padded, cv::Size size, const std::vector<int>& col, const std::vector<int>& row) {
+        cv::Mat tmp(padded.rows, size.width, cv::DataType<Acc>::type);
+        for (int y = 0; y < padded.rows; ++y) {
+            const uchar* src = padded.ptr<uchar>(y);
+            Acc* dst = tmp.ptr<Acc>(y);
+            std::fill(dst, dst + size.width, Acc(0));
+            for (size_t j = 0; j < row.size(); ++j) {
+                const Acc k = row[j];
+                if (k == 0) continue;
+                const uchar* s = src + j;
+                for (int x = 0; x < size.width; ++x) {
+                    dst[x] += k * s[x];
+                }
+            }
+        }
+
+        cv::Mat out(size, cv::DataType<Acc>::type);
+        for (int y = 0; y < size.height; ++y) {
+            Acc* dst = out.ptr<Acc>(y);
+            std::fill(dst, dst + size.width, Acc(0));
+            for (size_t i = 0; i < col.size(); ++i) {
+                const Acc k = col[i];
+                if (k == 0) continue;
+                const Acc* s = tmp.ptr<Acc>(y + static_cast<int>(i));
+                for (int x = 0; x < size.width; ++x) {
+                    dst[x] += k * s[x];
+                }
+            }
+        }
+        return out;
+    }
+
+    // Dense fallback for kernels that are not rank-1 (e.g. Roberts cross); zero taps are skipped
+    template <typename Acc>
+    static cv::Mat densePass(const cv::Mat& padded, cv::Size size, const cv::Mat& kernel) {
+        cv::Mat out(size, cv::DataType<Acc>::type);
+        for (int y = 0; y < size.height; ++y) {
+            Acc* dst = out.ptr<Acc>(y);
+            std::fill(dst, dst + size.width, Acc(0));
+            for (int i = 0; i < kernel.rows; ++i) {
+                const uchar* src = padded.ptr<uchar>(y + i);
+                const int* krow = kernel.ptr<int>(i);
+                for (int j = 0; j < kernel.cols; ++j) {
+                    const Acc k = krow[j];
+                    if (k == 0) continue;
+                    const uchar* s = src + j;
+                    for (int x = 0; x < size.width; ++x) {
+                        dst[x] += k * s[x];
+                    }
+                }
+            }
+        }
+        return out;
+    }
+
+    // Rounded, saturated sqrt(q) for every squared magnitude q below the first that saturates (255.5^2)
+    static const std::vector<uchar>& magnitudeTable() {
+        static const std::vector<uchar> table = [] {
+            std::vector<uchar> t(65281);
+            for (size_t q = 0; q < t.size(); ++q) t[q] = cv::saturate_cast<uchar>(std::sqrt(static_cast<double>(q)));
+            return t;
+        }();
+        return table;
+    }
+
+public:
+    // Split an integer kernel into col * row (outer product) when it is rank-1 with integer factors.
+    static bool decompose(const cv::Mat& kernel, std::vector<int>& col, std::vector<int>& row) {
+        int i0 = -1;
+        for (int i = 0; i < kernel.rows && i0 < 0; ++i) {
+            if (cv::countNonZero(kernel.row(i)) > 0) i0 = i;
+        }
+        if (i0 < 0) return false;
+
+        // Reduce the pivot row to its smallest integer form; the column then carries the common factor
+        const int* pivot = kernel.ptr<int>(i0);
+        int g = 0;
+        for (int j = 0; j < kernel.cols; ++j) g = gcd(g, std::abs(pivot[j]));
+        row.resize(kernel.cols);
+        int j0 = -1;
+        for (int j = 0; j < kernel.cols; ++j) {
+            row[j] = pivot[j] / g;
+            if (j0 < 0 && row[j] != 0) j0 = j;
+        }
+
+        col.resize(kernel.rows);
+        for (int i = 0; i < kernel.rows; ++i) {
+            const int* krow = kernel.ptr<int>(i);
+            if (krow[j0] % row[j0] != 0) return false;
+            col[i] = krow[j0] / row[j0];
+            for (int j = 0; j < kernel.cols; ++j) {
+                if (static_cast<long long>(col[i]) * row[j] != krow[j]) return false;
+            }
+        }
+        return true;
+    }
+
+    // Correlate an 8-bit single-channel image with the rank-1 kernel col * row (outer product), using replicated
+    // borders, as a row pass followed by a column pass in O(k) per pixel. The anchor defaults to the kernel centre.
+    // Returns exact CV_32S responses when they are guaranteed to fit, otherwise CV_64F: exact while the bound
+    // 255 * sum|col| * sum|row| stays within 2^53, and beyond that within a relative error of about k * 2^-53.
+    static cv::Mat correlateSeparable(const cv::Mat& gray, const std::vector<int>& col, const std::vector<int>& row,
+                                      cv::Point anchor = cv::Point(-1, -1)) {
+        CV_Assert(gray.type() == CV_8UC1 && !col.empty() && !row.empty());
+        int krows = static_cast<int>(col.size());
+        int kcols = static_cast<int>(row.size());
+        if (anchor.x < 0 || anchor.y < 0) {
+            anchor = cv::Point(kcols / 2, krows / 2);
+        }
+
+        cv::Mat padded;
+        cv::copyMakeBorder(gray, padded, anchor.y, krows - 1 - anchor.y,
+                           anchor.x, kcols - 1 - anchor.x, cv::BORDER_REPLICATE);
+        if (255.0 * absSum(row) * absSum(col) <= INT_MAX) {
+            return separablePass<int>(padded, gray.size(), col, row);
+        }
+        return separablePass<double>(padded, gray.size(), col, row);
+    }
+
+    // Correlate an 8-bit single-channel image with an integer (CV_32S) kernel using replicated borders.
+    // The anchor defaults to the kernel centre. Rank-1 kernels go through correlateSeparable; other kernels run
+    // a dense pass that returns exact CV_32S responses when they fit, otherwise CV_64F (exact up to 2^53).
+    static cv::Mat correlate(const cv::Mat& gray, const cv::Mat& kernel, cv::Point anchor = cv::Point(-1, -1)) {
+        CV_Assert(gray.type() == CV_8UC1 && kernel.type() == CV_32SC1);
+        if (anchor.x < 0 || anchor.y < 0) {
+            anchor = cv::Point(kernel.cols / 2, kernel.rows / 2);
+        }
+
+        std::vector<int> col, row;
+        if (decompose(kernel, col, row)) {
+            return correlateSeparable(gray, col, row, anchor);
+        }
+
+        cv::Mat padded;
+        cv::copyMakeBorder(gray, padded, anchor.y, kernel.rows - 1 - anchor.y,
+                           anchor.x, kernel.cols - 1 - anchor.x, cv::BORDER_REPLICATE);
+        double bound = 255.0 * cv::norm(kernel, cv::NORM_L1);
+        if (bound <= INT_MAX) {
+            return densePass<int>(padded, gray.size(), kernel);
+        }
+        return densePass<double>(padded, gray.size(), kernel);
+    }
+
+    // Whether streamMagnitude3x3 can run the kernel pair colx * rowx, coly * rowy: 3-tap factors whose
+    // responses (and column sums) fit in 16 bits
+    static bool canStreamMagnitude3x3(const std::vector<int>& colx, const std::vector<int>& rowx,
+                                      const std::vector<int>& coly, const std::vector<int>& rowy) {
+        if (colx.size() != 3 || rowx.size() != 3 || coly.size() != 3 || rowy.size() != 3) return false;
+        return 255.0 * absSum(colx) * absSum(rowx) <= SHRT_MAX && 255.0 * absSum(coly) * absSum(rowy) <= SHRT_MAX;
+    }
+
+    // Unit-scale 8-bit gradient magnitude of the 3x3 rank-1 kernels colx * rowx and coly * rowy with replicated
+    // borders, bit-identical to correlateSeparable() on each kernel followed by gradientMagnitude(scale 1).
+    // Rows stream through 16-bit column sums, so no padded copy or full-size gradient planes are made, and
+    // gx^2 + gy^2 is rounded through a table instead of a square root per pixel. `in_lut` maps the input
+    // pixels as they are read and `out_lut` the magnitudes as they are written, so point ops on either side
+    // of the edge operator cost no pass of their own.
+    static void streamMagnitude3x3(const cv::Mat& gray, const std::vector<int>& colx, const std::vector<int>& rowx,
+                                   const std::vector<int>& coly, const std::vector<int>& rowy, cv::Mat& dst,
+                                   const uchar* in_lut = nullptr, const uchar* out_lut = nullptr) {
+        CV_Assert(gray.type() == CV_8UC1 && canStreamMagnitude3x3(colx, rowx, coly, rowy));
+        dst.create(gray.size(), CV_8UC1);
+        const std::vector<uchar>& rounded = magnitudeTable();
+        std::vector<uchar> mapped;
+        const uchar* table = rounded.data();
+        if (out_lut) {
+            mapped.resize(rounded.size());
+            for (size_t q = 0; q < rounded.size(); ++q) mapped[q] = out_lut[rounded[q]];
+            table = mapped.data();
+        }
+        const int size[3] = { gray.rows, gray.cols, static_cast<int>(rounded.size()) - 1 };
+        const short taps[12] = { static_cast<short>(colx[0]), static_cast<short>(colx[1]), static_cast<short>(colx[2]),
+                                 static_cast<short>(rowx[0]), static_cast<short>(rowx[1]), static_cast<short>(rowx[2]),
+                                 static_cast<short>(coly[0]), static_cast<short>(coly[1]), static_cast<short>(coly[2]),
+                                 static_cast<short>(rowy[0]), static_cast<short>(rowy[1]), static_cast<short>(rowy[2]) };
+
+        cv::parallel_for_(cv::Range(0, gray.rows), [&](const cv::Range& range) {
+            // Local copies: sizes and taps read through the capture would be reloaded after every store to the
+            // (int and short) row buffers below, which keeps the loops from vectorizing
+            const int rows = size[0], width = size[1], qmax = size[2];
+            const short cx0 = taps[0], cx1 = taps[1], cx2 = taps[2], rx0 = taps[3], rx1 = taps[4], rx2 = taps[5];
+            const short cy0 = taps[6], cy1 = taps[7], cy2 = taps[8], ry0 = taps[9], ry1 = taps[10], ry2 = taps[11];
+            // Column sums with one replicated column on each side, and the squared magnitudes of a row
+            std::vector<short> vx(width + 2), vy(width + 2);
+            std::vector<int> sq(width);
+            // Input rows mapped through in_lut, kept for the three rows in flight
+            std::vector<uchar> lut_rows(in_lut ? 3 * static_cast<size_t>(width) : 0);
+            int lut_row_index[3] = { -1, -1, -1 };
+            auto input_row = [&](int y) -> const uchar* {
+                y = std::min(std::max(y, 0), rows - 1);
+                const uchar* src = gray.ptr<uchar>(y);
+                if (!in_lut) return src;
+                uchar* buf = &lut_rows[static_cast<size_t>(y % 3) * width];
+                if (lut_row_index[y % 3] != y) {
+                    for (int x = 0; x < width; ++x) buf[x] = in_lut[src[x]];
+                    lut_row_index[y % 3] = y;
+                }
+                return buf;
+            };
+
+            for (int y = range.start; y < range.end; ++y) {
+                const uchar* p0 = input_row(y - 1);
+                const uchar* p1 = input_row(y);
+                const uchar* p2 = input_row(y + 1);
+                short* sx = vx.data() + 1;
+                short* sy = vy.data() + 1;
+                // Separate, branch-free loops over contiguous rows so the compiler can vectorize them;
+                // only the final table lookup stays scalar
+                for (int x = 0; x < width; ++x) {
+                    sx[x] = static_cast<short>(cx0 * p0[x] + cx1 * p1[x] + cx2 * p2[x]);
+                }
+                for (int x = 0; x < width; ++x) {
+                    sy[x] = static_cast<short>(cy0 * p0[x] + cy1 * p1[x] + cy2 * p2[x]);
+                }
+                sx[-1] = sx[0];
+                sx[width] = sx[width - 1];
+                sy[-1] = sy[0];
+                sy[width] = sy[width - 1];
+
+                int* q = sq.data();
+                for (int x = 0; x < width; ++x) {
+                    int gx = rx0 * sx[x - 1] + rx1 * sx[x] + rx2 * sx[x + 1];
+                    int gy = ry0 * sy[x - 1] + ry1 * sy[x] + ry2 * sy[x + 1];
+                    q[x] = std::min(gx * gx + gy * gy, qmax);
+                }
+                uchar* out = dst.ptr<uchar>(y);
+                for (int x = 0; x < width; ++x) {
+                    out[x] = table[q[x]];
+                }
+            }
+        });
+    }
+
+    // Saturated 8-bit gradient magnitude: sqrt((gx * scale)^2 + (gy * scale)^2)
+    static void gradientMagnitude(const cv::Mat& gx, const cv::Mat& gy, double scale, cv::Mat& dst) {
+        dst.create(gx.size(), CV_8UC1);
+        if (gx.depth() == CV_32S && gy.depth() == CV_32S) {
+            for (int y = 0; y < gx.rows; ++y) {
+                const int* px_ptr = gx.ptr<int>(y);
+                const int* py_ptr = gy.ptr<int>(y);
+                uchar* res_ptr = dst.ptr<uchar>(y);
+                for (int x = 0; x < gx.cols; ++x) {
+                    double px = px_ptr[x] * scale;
+                    double py = py_ptr[x] * scale;
+                    res_ptr[x] = cv::saturate_cast<uchar>(std::sqrt(px * px + py * py));
+                }
+            }
+            return;
+        }
+
+        cv::Mat gx64, gy64;
+        gx.convertTo(gx64, CV_64F);
+        gy.convertTo(gy64, CV_64F);
+        for (int y = 0; y < gx64.rows; ++y) {
+            const double* px_ptr = gx64.ptr<double>(y);
+            const double* py_ptr = gy64.ptr<double>(y);
+            uchar* res_ptr = dst.ptr<uchar>(y);
+            for (int x = 0; x < gx64.cols; ++x) {
+                double px = px_ptr[x] * scale;
+                double py = py_ptr[x] * scale;
+                res_ptr[x] = cv::saturate_cast<uchar>(std::sqrt(px * px + py * py));
+            }
+        }
+    }
+};
@@ -1,87 +1,88 @@
+#pragma once
 #include "binding_utils.h"
 #include "intensity_data_info.h"
+#include "convolution_engine.h"
+#include <algorithm>
+#include <cstdint>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <vector>
 
-// Detect Edge using Canny mask
-    static cv::Mat detectEdgesCanny(const cv::Mat& image, double threshold1 = 100, double threshold2 = 200) {
-        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
-        cv::Mat edges;
+// Each detector has a single-channel core (`...Gray`) that takes an 8-bit grayscale image and writes the
+// 8-bit edge map, plus the original entry point that converts to gray and expands the result to BGR.
 
+// Detect Edge using Canny mask
+    static cv::Mat detectEdgesCannyGray(const cv::Mat& gray, double threshold1 = 100, double threshold2 = 200, cv::Mat dst = cv::Mat()) {
         // Apply Canny Edge Detection
-        cv::Canny(gray, edges, threshold1, threshold2);
+        cv::Canny(gray, dst, threshold1, threshold2);
+        return dst;
+    }
+
+// `dst` may wrap a preallocated output buffer; it is written in place when its size/type match.
+    static cv::Mat detectEdgesCanny(const cv::Mat& image, double threshold1 = 100, double threshold2 = 200, cv::Mat dst = cv::Mat()) {
+        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        cv::Mat edges = detectEdgesCannyGray(gray, threshold1, threshold2);
 
         // Convert back to BGR to match original Python return signature
-        cv::Mat result;
-        cv::cvtColor(edges, result, cv::COLOR_GRAY2BGR);
-        return result;
+        return IntensityDataInfo::grayToBGR(edges, dst);
     }
 
     // General Helper for edge filter convolutions using cv::Mat kernels (Assumes odd symmetric kernels)
-    static cv::Mat applyEdgeFilter(const cv::Mat& image, const cv::Mat& Kx, const cv::Mat& Ky, double scale = 1.0) {
-        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+    // Runs on ConvolutionEngine: rank-1 kernels (Sobel, Prewitt) become O(k) row + column passes with exact
+    // integer accumulation, so the output is bit-identical to the dense double-precision convolution.
+    // Unit-scale 3x3 rank-1 pairs (Prewitt) stream through a single pass without gradient planes.
+    static cv::Mat applyEdgeFilterGray(const cv::Mat& gray, const cv::Mat& Kx, const cv::Mat& Ky, double scale = 1.0, cv::Mat dst = cv::Mat()) {
+        std::vector<int> colx, rowx, coly, rowy;
+        if (scale == 1.0 && ConvolutionEngine::decompose(Kx, colx, rowx) && ConvolutionEngine::decompose(Ky, coly, rowy) &&
+            ConvolutionEngine::canStreamMagnitude3x3(colx, rowx, coly, rowy)) {
+            ConvolutionEngine::streamMagnitude3x3(gray, colx, rowx, coly, rowy, dst);
+            return dst;
+        }
 
-        cv::Mat result = cv::Mat::zeros(gray.size(), CV_8UC1);
-        cv::Mat padded;
+        cv::Mat gx = ConvolutionEngine::correlate(gray, Kx);
+        cv::Mat gy = ConvolutionEngine::correlate(gray, Ky);
 
-        // Assumes Kx and Ky are odd and square
-        int ksize = Kx.rows;
-        int pad = ksize / 2;
+        ConvolutionEngine::gradientMagnitude(gx, gy, scale, dst);
+        return dst;
+    }
 
-        std::vector<std::vector<int>> kx_vec(ksize, std::vector<int>(ksize));
-        std::vector<std::vector<int>> ky_vec(ksize, std::vector<int>(ksize));
-        for (int i = 0; i < ksize; ++i) {
-            for (int j = 0; j < ksize; ++j) {
-                kx_vec[i][j] = Kx.at<int>(i, j);
-                ky_vec[i][j] = Ky.at<int>(i, j);
-            }
-        }
+    static cv::Mat applyEdgeFilter(const cv::Mat& image, const cv::Mat& Kx, const cv::Mat& Ky, double scale = 1.0, cv::Mat dst = cv::Mat()) {
+        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        cv::Mat result = applyEdgeFilterGray(gray, Kx, Ky, scale);
 
-        cv::copyMakeBorder(gray, padded, pad, pad, pad, pad, cv::BORDER_REPLICATE);
-
-        for (int y = 0; y < gray.rows; ++y) {
-            uchar* res_ptr = result.ptr<uchar>(y);
-            for (int x = 0; x < gray.cols; ++x) {
-                double px = 0.0, py = 0.0;
-                for (int i = 0; i < ksize; ++i) {
-                    const uchar* pad_ptr = padded.ptr<uchar>(y + i);
-                    for (int j = 0; j < ksize; ++j) {
-                        int val = pad_ptr[x + j];
-                        px += val * kx_vec[i][j];
-                        py += val * ky_vec[i][j];
-                    }
-                }
-                px *= scale;
-                py *= scale;
-                double mag = std::sqrt(px * px + py * py);
-                res_ptr[x] = cv::saturate_cast<uchar>(mag);
-            }
-        }
-        cv::Mat result_bgr;
-        cv::cvtColor(result, result_bgr, cv::COLOR_GRAY2BGR);
-        return result_bgr;
+        return IntensityDataInfo::grayToBGR(result, dst);
     }
 
-    // Detect Edge using Sobel masks dynamically generated
-    static cv::Mat detectEdgesSobel(const cv::Mat& image, int ksize = 3) {
-        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+    // Sobel sizes the backend supports, as cv::Sobel: 1 (3x3 central difference) or an odd size from 3 to 31
+    static bool isValidSobelKsize(int ksize) {
+        return ksize == 1 || (ksize >= 3 && ksize <= 31 && ksize % 2 == 1);
+    }
 
+    // Separable Sobel masks of the given size: Kx = smooth (column) * deriv (row) and Ky = deriv * smooth.
+    // The 1-D factors are built in 64-bit integers; the 2-D masks would overflow int32 from ksize 21 on, so they
+    // are never formed. Returns the scale that normalizes the response.
+    static double buildSobelFactors(int ksize, std::vector<int>& smooth, std::vector<int>& deriv) {
+        if (!isValidSobelKsize(ksize)) {
+            CV_Error(cv::Error::StsBadArg, "Sobel ksize must be 1 or an odd number from 3 to 31, got " + std::to_string(ksize));
+        }
         int grid_size = (ksize == 1) ? 3 : ksize;
-        std::vector<int> smooth;
-        std::vector<int> deriv;
 
         if (ksize == 1) {
             smooth = {0, 1, 0};
             deriv = {-1, 0, 1};
         } else {
-            smooth.assign(grid_size, 0);
-            smooth[0] = 1;
+            // Binomial rows: C(grid_size - 1, i) smooths, the difference of two shifted C(grid_size - 3, i) derives
+            std::vector<int64_t> smooth64(grid_size, 0);
+            smooth64[0] = 1;
             for (int i = 1; i < grid_size; ++i) {
-                smooth[i] = 1;
+                smooth64[i] = 1;
                 for (int j = i - 1; j > 0; --j) {
-                    smooth[j] = smooth[j] + smooth[j - 1];
+                    smooth64[j] = smooth64[j] + smooth64[j - 1];
                 }
             }
 
-            std::vector<int> base_smooth(grid_size - 2, 0);
+            std::vector<int64_t> base_smooth(grid_size - 2, 0);
             base_smooth[0] = 1;
             for (int i = 1; i < grid_size - 2; ++i) {
                 base_smooth[i] = 1;
@@ -90,102 +91,577 @@
                 }
             }
 
-            deriv.assign(grid_size, 0);
+            std::vector<int64_t> deriv64(grid_size, 0);
             for (int i = 0; i < grid_size; ++i) {
-                if (i < base_smooth.size()) deriv[i] -= base_smooth[i];
-                if (i >= 2) deriv[i] += base_smooth[i - 2];
+                if (i < static_cast<int>(base_smooth.size())) deriv64[i] -= base_smooth[i];
+                if (i >= 2) deriv64[i] += base_smooth[i - 2];
             }
+
+            // The largest tap at ksize 31, C(30, 15), fits in int
+            smooth.assign(smooth64.begin(), smooth64.end());
+            deriv.assign(deriv64.begin(), deriv64.end());
         }
 
-        cv::Mat Kx_mat(grid_size, grid_size, CV_32S);
-        cv::Mat Ky_mat(grid_size, grid_size, CV_32S);
-
-        double sum_pos = 0;
-        for (int y = 0; y < grid_size; ++y) {
-            for (int x = 0; x < grid_size; ++x) {
-                int vx = smooth[y] * deriv[x];
-                int vy = deriv[y] * smooth[x];
-                Kx_mat.at<int>(y, x) = vx;
-                Ky_mat.at<int>(y, x) = vy;
-                if (vx > 0) sum_pos += vx;
-            }
+        // Sum of the positive taps of Kx: the smoothing taps are non-negative, so it factors as well
+        double smooth_sum = 0, deriv_pos = 0;
+        for (int v : smooth) smooth_sum += v;
+        for (int v : deriv) {
+            if (v > 0) deriv_pos += v;
+        }
+        double sum_pos = smooth_sum * deriv_pos;
+        return (sum_pos > 0) ? (4.0 / sum_pos) : 1.0;
+    }
+
+    // Detect Edge using Sobel masks dynamically generated
+    static cv::Mat detectEdgesSobelGray(const cv::Mat& gray, int ksize = 3, cv::Mat dst = cv::Mat()) {
+        std::vector<int> smooth, deriv;
+        double scale = buildSobelFactors(ksize, smooth, deriv);
+        if (scale == 1.0 && ConvolutionEngine::canStreamMagnitude3x3(smooth, deriv, deriv, smooth)) {
+            // ksize 3: one streamed pass without gradient planes
+            ConvolutionEngine::streamMagnitude3x3(gray, smooth, deriv, deriv, smooth, dst);
+            return dst;
         }
+        cv::Mat gx = ConvolutionEngine::correlateSeparable(gray, smooth, deriv);
+        cv::Mat gy = ConvolutionEngine::correlateSeparable(gray, deriv, smooth);
 
-        double scale = (sum_pos > 0) ? (4.0 / sum_pos) : 1.0;
-        return applyEdgeFilter(image, Kx_mat, Ky_mat, scale);
+        ConvolutionEngine::gradientMagnitude(gx, gy, scale, dst);
+        return dst;
+    }
+
+    static cv::Mat detectEdgesSobel(const cv::Mat& image, int ksize = 3, cv::Mat dst = cv::Mat()) {
+        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        cv::Mat result = detectEdgesSobelGray(gray, ksize);
+
+        return IntensityDataInfo::grayToBGR(result, dst);
     }
 
     // Detect Edge using Prewitt masks
-    static cv::Mat detectEdgesPrewitt(const cv::Mat& image) {
-        cv::Mat kx = (cv::Mat_<int>(3, 3) << -1, 0, 1, -1, 0, 1, -1, 0, 1);
-        cv::Mat ky = (cv::Mat_<int>(3, 3) << 1, 1, 1, 0, 0, 0, -1, -1, -1);
-        return applyEdgeFilter(image, kx, ky);
+    static void buildPrewittKernels(cv::Mat& kx, cv::Mat& ky) {
+        kx = (cv::Mat_<int>(3, 3) << -1, 0, 1, -1, 0, 1, -1, 0, 1);
+        ky = (cv::Mat_<int>(3, 3) << 1, 1, 1, 0, 0, 0, -1, -1, -1);
+    }
+
+    // Kx = colx * rowx and Ky = coly * rowy of the operators ("sobel", "prewitt" or "roberts") whose edge map runs
+    // as one streamed pass (ConvolutionEngine::streamMagnitude3x3): Sobel with ksize 3 and Prewitt, both at unit
+    // scale. Returns false for the other operators and sizes.
+    static bool streamedEdgeFactors(const std::string& op, int ksize, std::vector<int>& colx, std::vector<int>& rowx,
+                                    std::vector<int>& coly, std::vector<int>& rowy) {
+        if (op == "sobel" && isValidSobelKsize(ksize)) {
+            std::vector<int> smooth, deriv;
+            if (buildSobelFactors(ksize, smooth, deriv) != 1.0) return false;
+            colx = rowy = smooth;
+            rowx = coly = deriv;
+        } else if (op == "prewitt") {
+            cv::Mat kx, ky;
+            buildPrewittKernels(kx, ky);
+            if (!ConvolutionEngine::decompose(kx, colx, rowx) || !ConvolutionEngine::decompose(ky, coly, rowy)) return false;
+        } else {
+            return false;
+        }
+        return ConvolutionEngine::canStreamMagnitude3x3(colx, rowx, coly, rowy);
+    }
+
+    static cv::Mat detectEdgesPrewittGray(const cv::Mat& gray, cv::Mat dst = cv::Mat()) {
+        cv::Mat kx, ky;
+        buildPrewittKernels(kx, ky);
+        return applyEdgeFilterGray(gray, kx, ky, 1.0, dst);
+    }
+
+    static cv::Mat detectEdgesPrewitt(const cv::Mat& image, cv::Mat dst = cv::Mat()) {
+        cv::Mat kx, ky;
+        buildPrewittKernels(kx, ky);
+        return applyEdgeFilter(image, kx, ky, 1.0, dst);
     }
 
     // Detect Edge using Roberts cross masks
-    static cv::Mat detectEdgesRoberts(const cv::Mat& image) {
+    // 2x2 masks anchored at their top-left tap, i.e. the image is padded by 1 pixel on bottom and right
+    static void buildRobertsKernels(cv::Mat& kx, cv::Mat& ky) {
+        kx = (cv::Mat_<int>(2, 2) << 1, 0, 0, -1);
+        ky = (cv::Mat_<int>(2, 2) << 0, 1, -1, 0);
+    }
+
+    static cv::Mat detectEdgesRobertsGray(const cv::Mat& gray, cv::Mat dst = cv::Mat()) {
+        cv::Mat kx, ky;
+        buildRobertsKernels(kx, ky);
+
+        cv::Mat gx = ConvolutionEngine::correlate(gray, kx, cv::Point(0, 0));
+        cv::Mat gy = ConvolutionEngine::correlate(gray, ky, cv::Point(0, 0));
+
+        ConvolutionEngine::gradientMagnitude(gx, gy, 1.0, dst);
+        return dst;
+    }
+
+    static cv::Mat detectEdgesRoberts(const cv::Mat& image, cv::Mat dst = cv::Mat()) {
         cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        cv::Mat result = detectEdgesRobertsGray(gray);
+
+        return IntensityDataInfo::grayToBGR(result, dst);
+    }
+
+// Float32 gradient fields of one operator. Only the fields requested through GradientOutput flags are
+// written; each may wrap a caller-provided buffer, which is filled in place when its size/type match.
+enum GradientOutput { GRADIENT_X = 1, GRADIENT_Y = 2, GRADIENT_MAGNITUDE = 4, GRADIENT_ORIENTATION = 8 };
+
+struct GradientFields {
+    cv::Mat gx, gy, magnitude, orientation;
+};
+
+    // Integer x and/or y responses of a gradient operator ("sobel", "prewitt" or "roberts"); responses that are
+    // not wanted are left empty. Returns the scale that normalizes them.
+    static double correlateGradients(const cv::Mat& gray, const std::string& op, int ksize, bool want_x, bool want_y,
+                                     cv::Mat& ix, cv::Mat& iy) {
+        if (op == "sobel") {
+            std::vector<int> smooth, deriv;
+            double scale = buildSobelFactors(ksize, smooth, deriv);
+            if (want_x) ix = ConvolutionEngine::correlateSeparable(gray, smooth, deriv);
+            if (want_y) iy = ConvolutionEngine::correlateSeparable(gray, deriv, smooth);
+            return scale;
+        }
+
+        cv::Mat kx, ky;
+        cv::Point anchor(-1, -1);
+        if (op == "prewitt") {
+            buildPrewittKernels(kx, ky);
+        } else if (op == "roberts") {
+            buildRobertsKernels(kx, ky);
+            anchor = cv::Point(0, 0);
+        } else {
+            CV_Error(cv::Error::StsBadArg, "Unknown gradient operator: " + op);
+        }
+        if (want_x) ix = ConvolutionEngine::correlate(gray, kx, anchor);
+        if (want_y) iy = ConvolutionEngine::correlate(gray, ky, anchor);
+        return 1.0;
+    }
+
+    // The two correlations of correlateGradients, then a single parallel pass over the rows that writes every
+    // requested field. gx/gy carry the same scale as the 8-bit edge maps, so the magnitude is their unsaturated
+    // float counterpart, or |gx| + |gy| with `l1` (no square root). The orientation is atan2(gy, gx) in [0, 2*pi)
+    // radians, or [0, 360) degrees, with the accuracy of cv::phase (about 0.3 degrees).
+    static void computeGradientsGray(const cv::Mat& gray, const std::string& op, int ksize, int outputs, bool l1,
+                                     bool degrees, GradientFields& fields) {
+        const int derived = GRADIENT_MAGNITUDE | GRADIENT_ORIENTATION;
+        bool need_x = (outputs & (GRADIENT_X | derived)) != 0;
+        bool need_y = (outputs & (GRADIENT_Y | derived)) != 0;
+        cv::Mat ix, iy;
+        double scale = correlateGradients(gray, op, ksize, need_x, need_y, ix, iy);
+
+        cv::Size size = gray.size();
+        if (outputs & GRADIENT_X) fields.gx.create(size, CV_32FC1);
+        if (outputs & GRADIENT_Y) fields.gy.create(size, CV_32FC1);
+        if (outputs & GRADIENT_MAGNITUDE) fields.magnitude.create(size, CV_32FC1);
+        if (outputs & GRADIENT_ORIENTATION) fields.orientation.create(size, CV_32FC1);
+
+        cv::parallel_for_(cv::Range(0, size.height), [&](const cv::Range& range) {
+            // gx/gy rows that are only needed for the magnitude or orientation go through per-stripe scratch rows
+            cv::Mat scratch_x, scratch_y;
+            if (need_x && !(outputs & GRADIENT_X)) scratch_x.create(1, size.width, CV_32FC1);
+            if (need_y && !(outputs & GRADIENT_Y)) scratch_y.create(1, size.width, CV_32FC1);
+            for (int y = range.start; y < range.end; ++y) {
+                cv::Mat fx = (outputs & GRADIENT_X) ? fields.gx.row(y) : scratch_x;
+                cv::Mat fy = (outputs & GRADIENT_Y) ? fields.gy.row(y) : scratch_y;
+                if (need_x) ix.row(y).convertTo(fx, CV_32F, scale);
+                if (need_y) iy.row(y).convertTo(fy, CV_32F, scale);
+
+                if (outputs & GRADIENT_MAGNITUDE) {
+                    cv::Mat mag = fields.magnitude.row(y);
+                    if (l1) {
+                        const float* px = fx.ptr<float>();
+                        const float* py = fy.ptr<float>();
+                        float* pm = mag.ptr<float>();
+                        for (int x = 0; x < size.width; ++x) {
+                            pm[x] = std::abs(px[x]) + std::abs(py[x]);
+                        }
+                    } else {
+                        cv::magnitude(fx, fy, mag);
+                    }
+                }
+                if (outputs & GRADIENT_ORIENTATION) {
+                    cv::Mat angle = fields.orientation.row(y);
+                    cv::phase(fx, fy, angle, degrees);
+                }
+            }
+        });
+    }
+
+// Canny split at its thresholds. The grayscale conversion, Sobel gradients (3x3, replicated border), L1
+// magnitude and non-maximum suppression do not depend on the thresholds, so they run once per image and only
+// the magnitudes that survive suppression are kept; apply() then runs the hysteresis alone. Edge maps are
+// identical to cv::Canny(gray, edges, threshold1, threshold2). Immutable after construction.
+class CannyState {
+public:
+    explicit CannyState(const cv::Mat& image) {
+        cv::Mat gray = IntensityDataInfo::grayView(image);
+        cv::Mat dx, dy;
+        cv::Sobel(gray, dx, CV_16S, 1, 0, 3, 1, 0, cv::BORDER_REPLICATE);
+        cv::Sobel(gray, dy, CV_16S, 0, 1, 3, 1, 0, cv::BORDER_REPLICATE);
+        suppressed_ = suppressNonMaxima(dx, dy);
+    }
+
+    // Single-channel edge map (0 or 255) for one threshold pair
+    cv::Mat applyGray(double threshold1, double threshold2, cv::Mat dst = cv::Mat()) const {
+        dst.create(suppressed_.size(), CV_8UC1);
+        hysteresis(threshold1, threshold2, dst);
+        return dst;
+    }
 
-        cv::Mat result = cv::Mat::zeros(gray.size(), CV_8UC1);
-        cv::Mat padded;
-        // Pad with 1 pixel on bottom and right
-        cv::copyMakeBorder(gray, padded, 0, 1, 0, 1, cv::BORDER_REPLICATE);
-
-        int kx[2][2] = {{1, 0}, {0, -1}};
-        int ky[2][2] = {{0, 1}, {-1, 0}};
-
-        for (int y = 0; y < gray.rows; ++y) {
-            uchar* res_ptr = result.ptr<uchar>(y);
-            for (int x = 0; x < gray.cols; ++x) {
-                double px = 0.0, py = 0.0;
-                for (int i = 0; i < 2; ++i) {
-                    const uchar* pad_ptr = padded.ptr<uchar>(y + i);
-                    for (int j = 0; j < 2; ++j) {
-                        int val = pad_ptr[x + j];
-                        px += val * kx[i][j];
-                        py += val * ky[i][j];
+    // BGR result, matching detectEdgesCanny
+    cv::Mat apply(double threshold1, double threshold2, cv::Mat dst = cv::Mat()) const {
+        cv::Mat edges = applyGray(threshold1, threshold2);
+        return IntensityDataInfo::grayToBGR(edges, dst);
+    }
+
+    // Edge maps for every (thresholds1[i], thresholds2[j]) pair, written in order as consecutive frames to `out`
+    void sweep(const std::vector<double>& thresholds1, const std::vector<double>& thresholds2, bool single_channel,
+               uchar* out) const {
+        cv::Size sz = size();
+        int channels = single_channel ? 1 : 3;
+        size_t frame_bytes = static_cast<size_t>(sz.area()) * channels;
+        int pairs = static_cast<int>(thresholds1.size() * thresholds2.size());
+        cv::parallel_for_(cv::Range(0, pairs), [&](const cv::Range& r) {
+            cv::Mat edges;
+            for (int k = r.start; k < r.end; ++k) {
+                size_t i = k / thresholds2.size();
+                size_t j = k % thresholds2.size();
+                cv::Mat frame(sz, CV_8UC(channels), out + k * frame_bytes);
+                if (single_channel) {
+                    applyGray(thresholds1[i], thresholds2[j], frame);
+                } else {
+                    edges = applyGray(thresholds1[i], thresholds2[j], edges);
+                    IntensityDataInfo::grayToBGR(edges, frame);
+                }
+            }
+        });
+    }
+
+    cv::Size size() const { return suppressed_.size(); }
+    size_t nbytes() const { return suppressed_.total() * suppressed_.elemSize(); }
+
+private:
+    // tan(22.5 deg) in Q15, as in cv::Canny
+    static constexpr int kTan22Q15 = 13573;
+
+    // |dx| + |dy| where the pixel is a local maximum across the gradient direction, else 0 (CV_16U)
+    static cv::Mat suppressNonMaxima(const cv::Mat& dx, const cv::Mat& dy) {
+        int rows = dx.rows, cols = dx.cols;
+        cv::Mat suppressed(rows, cols, CV_16U);
+
+        cv::parallel_for_(cv::Range(0, rows), [&](const cv::Range& range) {
+            // Magnitudes of rows y - 1, y and y + 1 with a zero on either side; rows outside the image are zeros,
+            // so neighbours outside the image never suppress a pixel
+            std::vector<int> buffer(3 * (cols + 2), 0);
+            int* prev = buffer.data() + 1;
+            int* cur = prev + cols + 2;
+            int* next = cur + cols + 2;
+            auto magnitudeRow = [&](int y, int* m) {
+                if (y < 0 || y >= rows) {
+                    std::fill(m, m + cols, 0);
+                    return;
+                }
+                const short* gx = dx.ptr<short>(y);
+                const short* gy = dy.ptr<short>(y);
+                for (int x = 0; x < cols; ++x) {
+                    m[x] = std::abs(gx[x]) + std::abs(gy[x]);
+                }
+            };
+            magnitudeRow(range.start - 1, prev);
+            magnitudeRow(range.start, cur);
+
+            for (int y = range.start; y < range.end; ++y) {
+                magnitudeRow(y + 1, next);
+                const short* gx = dx.ptr<short>(y);
+                const short* gy = dy.ptr<short>(y);
+                ushort* out = suppressed.ptr<ushort>(y);
+                for (int x = 0; x < cols; ++x) {
+                    // Same direction sectors and tie-breaking as cv::Canny: the neighbour before the pixel along
+                    // the gradient must be strictly smaller, the one after smaller or equal (strictly on diagonals).
+                    // Every test is evaluated and combined with all-ones/all-zeros masks, so the loop has no
+                    // branches and vectorizes.
+                    int m = cur[x];
+                    int xs = gx[x], ys = gy[x];
+                    int ax = std::abs(xs), ay = std::abs(ys) << 15;
+                    int tg22x = ax * kTan22Q15;
+                    int horizontal = -(ay < tg22x);
+                    int vertical = -(ay > tg22x + (ax << 16)) & ~horizontal;
+                    int diagonal = ~(horizontal | vertical);
+                    int rising = -((xs ^ ys) >= 0);
+                    int keep_h = -((m > cur[x - 1]) & (m >= cur[x + 1]));
+                    int keep_v = -((m > prev[x]) & (m >= next[x]));
+                    int keep_rising = -((m > prev[x - 1]) & (m > next[x + 1]));
+                    int keep_falling = -((m > prev[x + 1]) & (m > next[x - 1]));
+                    int keep = (horizontal & keep_h) | (vertical & keep_v) |
+                               (diagonal & ((rising & keep_rising) | (~rising & keep_falling)));
+                    out[x] = static_cast<ushort>(m & keep);
+                }
+                int* recycled = prev;
+                prev = cur;
+                cur = next;
+                next = recycled;
+            }
+        });
+        return suppressed;
+    }
+
+    // Edges are the suppressed pixels above the low threshold that connect (8-neighbourhood) to one above the
+    // high threshold. Thresholds are swapped if needed and floored to integers, as cv::Canny does.
+    void hysteresis(double threshold1, double threshold2, cv::Mat& dst) const {
+        if (threshold1 > threshold2) std::swap(threshold1, threshold2);
+        // A surviving magnitude is always > 0, so negative thresholds behave like 0
+        int low = std::max(cvFloor(std::min(threshold1, 65535.0)), 0);
+        int high = std::max(cvFloor(std::min(threshold2, 65535.0)), 0);
+        int rows = suppressed_.rows, cols = suppressed_.cols;
+
+        // 0: candidate, 1: not an edge, 2: edge; the one-pixel border of 1s stops the growth at the image edge
+        cv::Mat map(rows + 2, cols + 2, CV_8U, cv::Scalar(1));
+        std::vector<uchar*> stack;
+        std::mutex stack_mutex;
+        cv::parallel_for_(cv::Range(0, rows), [&](const cv::Range& range) {
+            std::vector<uchar*> seeds;
+            for (int y = range.start; y < range.end; ++y) {
+                const ushort* s = suppressed_.ptr<ushort>(y);
+                uchar* m = map.ptr<uchar>(y + 1) + 1;
+                for (int x = 0; x < cols; ++x) {
+                    if (s[x] > low) {
+                        if (s[x] > high) {
+                            m[x] = 2;
+                            seeds.push_back(m + x);
+                        } else {
+                            m[x] = 0;
+                        }
                     }
                 }
-                double mag = std::sqrt(px * px + py * py);
-                res_ptr[x] = cv::saturate_cast<uchar>(mag);
+            }
+            std::lock_guard<std::mutex> lock(stack_mutex);
+            stack.insert(stack.end(), seeds.begin(), seeds.end());
+        });
+
+        const ptrdiff_t step = static_cast<ptrdiff_t>(map.step[0]);
+        const ptrdiff_t offsets[8] = { -step - 1, -step, -step + 1, -1, 1, step - 1, step, step + 1 };
+        while (!stack.empty()) {
+            uchar* p = stack.back();
+            stack.pop_back();
+            for (ptrdiff_t offset : offsets) {
+                if (p[offset] == 0) {
+                    p[offset] = 2;
+                    stack.push_back(p + offset);
+                }
             }
         }
-        cv::Mat result_bgr;
-        cv::cvtColor(result, result_bgr, cv::COLOR_GRAY2BGR);
-        return result_bgr;
+
+        cv::parallel_for_(cv::Range(0, rows), [&](const cv::Range& range) {
+            for (int y = range.start; y < range.end; ++y) {
+                const uchar* m = map.ptr<uchar>(y + 1) + 1;
+                uchar* out = dst.ptr<uchar>(y);
+                for (int x = 0; x < cols; ++x) {
+                    out[x] = m[x] == 2 ? 255 : 0;
+                }
+            }
+        });
     }
 
+    cv::Mat suppressed_;
+};
+
 // Pybind11 Wrappers
-py::array_t<unsigned char> canny_wrapper(py::array_t<unsigned char> img, double t1, double t2) {
+py::array_t<unsigned char> canny_wrapper(py::array_t<unsigned char> img, double t1, double t2, py::object out, py::object single_channel) {
     auto mat = numpy_to_mat(img);
-    auto res = detectEdgesCanny(mat, t1, t2);
-    return mat_to_numpy(res);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? detectEdgesCannyGray(IntensityDataInfo::grayView(mat), t1, t2, out_mat)
+                     : detectEdgesCanny(mat, t1, t2, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
 }
 
-py::array_t<unsigned char> sobel_wrapper(py::array_t<unsigned char> img, int ksize = 3) {
+// Raises ValueError for the Sobel sizes buildSobelFactors rejects, before any work starts
+inline void check_sobel_ksize(int ksize) {
+    if (!isValidSobelKsize(ksize)) {
+        throw py::value_error("`ksize` must be 1 or an odd number from 3 to 31, got " + std::to_string(ksize));
+    }
+}
+
+py::array_t<unsigned char> sobel_wrapper(py::array_t<unsigned char> img, int ksize, py::object out, py::object single_channel) {
+    check_sobel_ksize(ksize);
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? detectEdgesSobelGray(IntensityDataInfo::grayView(mat), ksize, out_mat)
+                     : detectEdgesSobel(mat, ksize, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+py::array_t<unsigned char> prewitt_wrapper(py::array_t<unsigned char> img, py::object out, py::object single_channel) {
     auto mat = numpy_to_mat(img);
-    auto res = detectEdgesSobel(mat, ksize);
-    return mat_to_numpy(res);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? detectEdgesPrewittGray(IntensityDataInfo::grayView(mat), out_mat)
+                     : detectEdgesPrewitt(mat, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
 }
 
-py::array_t<unsigned char> prewitt_wrapper(py::array_t<unsigned char> img) {
+py::array_t<unsigned char> roberts_wrapper(py::array_t<unsigned char> img, py::object out, py::object single_channel) {
     auto mat = numpy_to_mat(img);
-    auto res = detectEdgesPrewitt(mat);
-    return mat_to_numpy(res);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? detectEdgesRobertsGray(IntensityDataInfo::grayView(mat), out_mat)
+                     : detectEdgesRoberts(mat, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
 }
 
-py::array_t<unsigned char> roberts_wrapper(py::array_t<unsigned char> img) {
+std::shared_ptr<CannyState> canny_state_init_wrapper(py::array_t<unsigned char> img) {
     auto mat = numpy_to_mat(img);
-    auto res = detectEdgesRoberts(mat);
-    return mat_to_numpy(res);
+    py::gil_scoped_release release;
+    return std::make_shared<CannyState>(mat);
+}
+
+py::array_t<unsigned char> canny_state_apply_wrapper(const CannyState& state, double t1, double t2, py::object out,
+                                                     py::object single_channel) {
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? state.applyGray(t1, t2, out_mat) : state.apply(t1, t2, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+py::array_t<unsigned char> canny_state_sweep_wrapper(const CannyState& state, const std::vector<double>& thresholds1,
+                                                     const std::vector<double>& thresholds2, py::object single_channel) {
+    cv::Size sz = state.size();
+    bool single = resolve_single_channel(single_channel);
+    std::vector<py::ssize_t> shape = { static_cast<py::ssize_t>(thresholds1.size()), static_cast<py::ssize_t>(thresholds2.size()),
+                                       static_cast<py::ssize_t>(sz.height), static_cast<py::ssize_t>(sz.width) };
+    if (!single) {
+        shape.push_back(3);
+    }
+    py::array_t<unsigned char> result(shape);
+    unsigned char* ptr = result.mutable_data();
+    {
+        py::gil_scoped_release release;
+        state.sweep(thresholds1, thresholds2, single, ptr);
+    }
+    return result;
+}
+
+// Field names accepted by gradients(), in the bit order of GradientOutput
+static const char* const kGradientNames[] = { "gx", "gy", "magnitude", "orientation" };
+
+static int gradient_index(const std::string& name) {
+    for (int i = 0; i < 4; ++i) {
+        if (name == kGradientNames[i]) return i;
+    }
+    return -1;
+}
+
+py::dict gradients_wrapper(py::array_t<unsigned char> img, const std::string& op, int ksize,
+                           const std::vector<std::string>& outputs, bool l1, bool degrees, py::object out) {
+    auto mat = numpy_to_mat(img);
+    if (op != "sobel" && op != "prewitt" && op != "roberts") {
+        throw py::value_error("Unknown gradient operator '" + op + "' (expected 'sobel', 'prewitt' or 'roberts')");
+    }
+    if (op == "sobel") {
+        check_sobel_ksize(ksize);
+    }
+    int flags = 0;
+    for (const auto& name : outputs) {
+        int i = gradient_index(name);
+        if (i < 0) {
+            throw py::value_error("Unknown gradient output '" + name + "' (expected 'gx', 'gy', 'magnitude' or 'orientation')");
+        }
+        flags |= 1 << i;
+    }
+    if (flags == 0) {
+        throw py::value_error("`outputs` must name at least one field");
+    }
+
+    // Caller-provided buffers: {name: float32 (H, W) array} for some of the requested fields
+    GradientFields fields;
+    cv::Mat* slots[] = { &fields.gx, &fields.gy, &fields.magnitude, &fields.orientation };
+    py::dict buffers;
+    if (!out.is_none()) {
+        if (!py::isinstance<py::dict>(out)) {
+            throw py::type_error("`out` must be a dict mapping output names to float32 arrays");
+        }
+        buffers = py::reinterpret_borrow<py::dict>(out);
+    }
+    for (auto item : buffers) {
+        std::string name = py::str(item.first);
+        int i = gradient_index(name);
+        if (i < 0 || !(flags & (1 << i))) {
+            throw py::value_error("`out` has a buffer for '" + name + "', which is not a requested output");
+        }
+        cv::Mat buffer = out_to_mat<float>(py::reinterpret_borrow<py::object>(item.second));
+        if (buffer.rows != mat.rows || buffer.cols != mat.cols || buffer.channels() != 1) {
+            throw py::value_error("`out['" + name + "']` must have shape (H, W) of the image");
+        }
+        *slots[i] = buffer;
+    }
+
+    {
+        py::gil_scoped_release release;
+        computeGradientsGray(IntensityDataInfo::grayView(mat), op, ksize, flags, l1, degrees, fields);
+    }
+
+    // Fields in the order they were requested; caller buffers are returned as passed
+    py::dict result;
+    for (const auto& name : outputs) {
+        if (buffers.contains(name)) {
+            result[name.c_str()] = buffers[name.c_str()];
+        } else {
+            result[name.c_str()] = mat_to_numpy<float>(*slots[gradient_index(name)]);
+        }
+    }
+    return result;
+}
+
+// Registers backend.CannyState on the given module (shared by the standalone and combined modules)
+inline void bind_canny_state(py::module_& m) {
+    py::class_<CannyState, std::shared_ptr<CannyState>>(m, "CannyState",
+        "Canny gradients and non-maximum suppression of an image, computed once so that new thresholds\n"
+        "only re-run the hysteresis. Results are identical to canny(image, threshold1, threshold2).")
+        .def(py::init(profiled("CannyState", &canny_state_init_wrapper)), py::arg("image"))
+        .def("apply", profiled("CannyState.apply", &canny_state_apply_wrapper), "Edge map for one pair of thresholds",
+             py::arg("threshold1") = 100.0, py::arg("threshold2") = 200.0, py::arg("out") = py::none(),
+             py::arg("single_channel") = py::none())
+        .def("sweep", profiled("CannyState.sweep", &canny_state_sweep_wrapper), "Edge maps for every (threshold1, threshold2) pair in parallel; "
+             "returns an array of shape (len(thresholds1), len(thresholds2), H, W, 3), or (..., H, W) when single-channel",
+             py::arg("thresholds1"), py::arg("thresholds2"), py::arg("single_channel") = py::none())
+        .def_property_readonly("shape", [](const CannyState& s) {
+            return py::make_tuple(s.size().height, s.size().width);
+        });
 }
 
 #ifndef MAIN_BIND
 PYBIND11_MODULE(edge_backend, m) {
     m.doc() = "Edge detection C++ backend";
-    m.def("canny", &canny_wrapper, "Apply Canny edge detection");
-    m.def("sobel", &sobel_wrapper, "Apply Sobel edge detection", py::arg("img"), py::arg("ksize") = 3);
-    m.def("prewitt", &prewitt_wrapper, "Apply Prewitt edge detection");
-    m.def("roberts", &roberts_wrapper, "Apply Roberts edge detection");
+    m.def("canny", &canny_wrapper, "Apply Canny edge detection",
+          py::arg("img"), py::arg("threshold1") = 100.0, py::arg("threshold2") = 200.0, py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none());
+    m.def("sobel", &sobel_wrapper, "Apply Sobel edge detection",
+          py::arg("img"), py::arg("ksize") = 3, py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("prewitt", &prewitt_wrapper, "Apply Prewitt edge detection",
+          py::arg("img"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("roberts", &roberts_wrapper, "Apply Roberts edge detection",
+          py::arg("img"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("gradients", &gradients_wrapper, "Float32 gx, gy, magnitude and/or orientation of an edge operator in one pass",
+          py::arg("img"), py::arg("operator") = "sobel", py::arg("ksize") = 3,
+          py::arg("outputs") = std::vector<std::string>{ "gx", "gy", "magnitude", "orientation" },
+          py::arg("l1") = false, py::arg("degrees") = false, py::arg("out") = py::none());
+    bind_canny_state(m);
 }
 #endif
@@ -1,127 +1,346 @@
+#pragma once
 #include <vector>
 #include <cmath>
 #include <algorithm>
 #include "binding_utils.h"
 #include "intensity_data_info.h"
+#include "point_ops.h"
+#include <pybind11/stl.h>
 
 class ImageEnhancer {
+private:
+    // One 256-entry CLAHE LUT per tile (row ty * grid.width + tx), built in parallel across tiles.
+    // Images that do not divide into whole tiles are extended (BORDER_REFLECT_101) for the histograms only.
+    static cv::Mat claheLuts(const cv::Mat& gray, double clip_limit, cv::Size grid, cv::Size& tile) {
+        CV_Assert(gray.type() == CV_8UC1 && grid.width > 0 && grid.height > 0);
+        cv::Mat src = gray;
+        if (gray.cols % grid.width != 0 || gray.rows % grid.height != 0) {
+            cv::copyMakeBorder(gray, src, 0, grid.height - gray.rows % grid.height,
+                               0, grid.width - gray.cols % grid.width, cv::BORDER_REFLECT_101);
+        }
+        tile = cv::Size(src.cols / grid.width, src.rows / grid.height);
+
+        int tile_area = tile.area();
+        float lut_scale = 255.0f / tile_area;
+        int clip = 0;
+        if (clip_limit > 0.0) {
+            clip = std::max(static_cast<int>(clip_limit * tile_area / 256), 1);
+        }
+
+        cv::Mat luts(grid.area(), 256, CV_8UC1);
+        cv::parallel_for_(cv::Range(0, grid.area()), [&](const cv::Range& range) {
+            for (int t = range.start; t < range.end; ++t) {
+                cv::Mat roi = src(cv::Rect((t % grid.width) * tile.width, (t / grid.width) * tile.height,
+                                           tile.width, tile.height));
+                int hist[256] = {0};
+                for (int y = 0; y < roi.rows; ++y) {
+                    const uchar* ptr = roi.ptr<uchar>(y);
+                    for (int x = 0; x < roi.cols; ++x) {
+                        hist[ptr[x]]++;
+                    }
+                }
+
+                // Clip the histogram and hand the excess back evenly, the remainder spread over spaced bins
+                if (clip > 0) {
+                    int clipped = 0;
+                    for (int i = 0; i < 256; ++i) {
+                        if (hist[i] > clip) {
+                            clipped += hist[i] - clip;
+                            hist[i] = clip;
+                        }
+                    }
+                    int batch = clipped / 256;
+                    int residual = clipped - batch * 256;
+                    for (int i = 0; i < 256; ++i) {
+                        hist[i] += batch;
+                    }
+                    if (residual != 0) {
+                        int step = std::max(256 / residual, 1);
+                        for (int i = 0; i < 256 && residual > 0; i += step, residual--) {
+                            hist[i]++;
+                        }
+                    }
+                }
+
+                // Equalization LUT from the running sum
+                uchar* lut = luts.ptr<uchar>(t);
+                int sum = 0;
+                for (int i = 0; i < 256; ++i) {
+                    sum += hist[i];
+                    lut[i] = cv::saturate_cast<uchar>(sum * lut_scale);
+                }
+            }
+        });
+        return luts;
+    }
+
+    // Blend the LUTs of the (up to) four tiles around every pixel and hand each finished row of blended values
+    // to `store(y, values)`. Rows run in parallel; the column weights are shared by all rows.
+    template <typename Store>
+    static void claheInterpolate(const cv::Mat& gray, const cv::Mat& luts, cv::Size grid, cv::Size tile, Store store) {
+        std::vector<int> left(gray.cols), right(gray.cols);
+        std::vector<float> wr(gray.cols), wl(gray.cols);
+        float inv_tw = 1.0f / tile.width;
+        for (int x = 0; x < gray.cols; ++x) {
+            float txf = x * inv_tw - 0.5f;
+            int tx1 = cvFloor(txf);
+            wr[x] = txf - tx1;
+            wl[x] = 1.0f - wr[x];
+            left[x] = std::max(tx1, 0) * 256;
+            right[x] = std::min(tx1 + 1, grid.width - 1) * 256;
+        }
+
+        float inv_th = 1.0f / tile.height;
+        cv::parallel_for_(cv::Range(0, gray.rows), [&](const cv::Range& range) {
+            std::vector<float> values(gray.cols);
+            for (int y = range.start; y < range.end; ++y) {
+                float tyf = y * inv_th - 0.5f;
+                int ty1 = cvFloor(tyf);
+                float wb = tyf - ty1, wt = 1.0f - wb;
+                const uchar* top = luts.ptr<uchar>(std::max(ty1, 0) * grid.width);
+                const uchar* bottom = luts.ptr<uchar>(std::min(ty1 + 1, grid.height - 1) * grid.width);
+
+                const uchar* src = gray.ptr<uchar>(y);
+                for (int x = 0; x < gray.cols; ++x) {
+                    int v = src[x];
+                    values[x] = (top[left[x] + v] * wl[x] + top[right[x] + v] * wr[x]) * wt +
+                                (bottom[left[x] + v] * wl[x] + bottom[right[x] + v] * wr[x]) * wb;
+                }
+                store(y, values.data());
+            }
+        });
+    }
+
 public:
     // 1. Histogram Equalization (for Grayscale Images)
-    static cv::Mat equalizeHistogram(const cv::Mat& image) {
+    // Single-channel core: equalizes an 8-bit grayscale image into `dst` (also 8-bit grayscale).
+    // The mapping is a LUT built from the (parallel) histogram, applied in one parallel pass.
+    static cv::Mat equalizeGray(const cv::Mat& gray, cv::Mat dst = cv::Mat()) {
+        cv::Mat hist;
+        IntensityDataInfo::computeHistogram(gray, hist);
+        return PointOps::apply(gray, PointOps::equalize(hist.ptr<int>(0)), dst);
+    }
+
+    // `dst` may wrap a preallocated output buffer; it is written in place when its size/type match.
+    static cv::Mat equalizeHistogram(const cv::Mat& image, cv::Mat dst = cv::Mat()) {
         // Convert to grayscale if it's a color image. 
         // Note: For color histogram equalization typically you'd convert to YUV/HSV and equalize the Lightness/Value channel.
         // For simplicity and standard assignment requirements, we apply it on the grayscale version.
         cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        cv::Mat result = equalizeGray(gray);
 
-        // 1. Calculate Histogram
-        int hist[256] = {0};
-        for (int y = 0; y < gray.rows; ++y) {
-            const uchar* ptr = gray.ptr<uchar>(y);
-            for (int x = 0; x < gray.cols; ++x) {
-                hist[ptr[x]]++;
-            }
-        }
+        // Convert back to BGR for consistent frontend display
+        return IntensityDataInfo::grayToBGR(result, dst);
+    }
 
-        // 2. Calculate Cumulative Distribution Function (CDF)
-        int cdf[256] = {0};
-        cdf[0] = hist[0];
-        for (int i = 1; i < 256; ++i) {
-            cdf[i] = cdf[i - 1] + hist[i];
-        }
+    // 2. Contrast Limited Adaptive Histogram Equalization (CLAHE)
+    // The image is split into a grid of tiles, each tile gets its own equalization LUT built from its
+    // clipped histogram, and every pixel blends the LUTs of the four nearest tile centres bilinearly.
+    // `clip_limit` is relative to a flat histogram (<= 0 disables clipping). Same algorithm and rounding
+    // as cv::CLAHE, so results are identical to it.
+    // Single-channel core: equalizes an 8-bit grayscale image into `dst` (also 8-bit grayscale).
+    static cv::Mat claheGray(const cv::Mat& gray, double clip_limit = 2.0, cv::Size grid = cv::Size(8, 8),
+                             cv::Mat dst = cv::Mat()) {
+        cv::Size tile;
+        cv::Mat luts = claheLuts(gray, clip_limit, grid, tile);
 
-        // 3. Find the minimum non-zero value in the CDF
-        int cdf_min = 0;
-        for (int i = 0; i < 256; ++i) {
-            if (cdf[i] > 0) {
-                cdf_min = cdf[i];
-                break;
+        dst.create(gray.size(), CV_8UC1);
+        claheInterpolate(gray, luts, grid, tile, [&](int y, const float* values) {
+            uchar* out = dst.ptr<uchar>(y);
+            for (int x = 0; x < dst.cols; ++x) {
+                out[x] = cv::saturate_cast<uchar>(values[x]);
             }
-        }
+        });
+        return dst;
+    }
 
-        // 4. Create the equalization mapping function (LUT - Look Up Table)
-        int total_pixels = gray.rows * gray.cols;
-        uchar lut[256];
-        for (int i = 0; i < 256; ++i) {
-            // General Formula: h(v) = round( (cdf(v) - cdf_min) / (M*N - cdf_min) * (L - 1) )
-            float normalized_val = static_cast<float>(cdf[i] - cdf_min) / (total_pixels - cdf_min);
-            lut[i] = cv::saturate_cast<uchar>(std::round(normalized_val * 255.0f));
+    // Color-preserving CLAHE: equalizes the luminance (the Y of YCrCb) and keeps the chroma. The result is
+    // exactly converting to YCrCb, equalizing Y and converting back with cv::cvtColor; the conversion back runs
+    // row by row inside the interpolation pass, so no equalized YCrCb image is assembled first.
+    static cv::Mat claheColor(const cv::Mat& image, double clip_limit = 2.0, cv::Size grid = cv::Size(8, 8),
+                              cv::Mat dst = cv::Mat()) {
+        if (image.channels() != 3) {
+            return claheGray(IntensityDataInfo::grayView(image), clip_limit, grid, dst);
         }
+        cv::Mat ycrcb, luma;
+        cv::cvtColor(image, ycrcb, cv::COLOR_BGR2YCrCb);
+        cv::extractChannel(ycrcb, luma, 0);
+        cv::Size tile;
+        cv::Mat luts = claheLuts(luma, clip_limit, grid, tile);
 
-        // 5. Apply the mapping to create the new image
-        cv::Mat result(gray.size(), gray.type());
-        for (int y = 0; y < gray.rows; ++y) {
-            const uchar* src_ptr = gray.ptr<uchar>(y);
-            uchar* dst_ptr = result.ptr<uchar>(y);
-            for (int x = 0; x < gray.cols; ++x) {
-                dst_ptr[x] = lut[src_ptr[x]];
+        // In-place safe: `image` is only read by the conversion above
+        dst.create(image.size(), image.type());
+        claheInterpolate(luma, luts, grid, tile, [&](int y, const float* values) {
+            uchar* row = ycrcb.ptr<uchar>(y);
+            for (int x = 0; x < ycrcb.cols; ++x) {
+                row[3 * x] = cv::saturate_cast<uchar>(values[x]);
             }
-        }
+            cv::Mat out = dst.row(y);
+            cv::cvtColor(ycrcb.row(y), out, cv::COLOR_YCrCb2BGR);
+        });
+        return dst;
+    }
+
+    static cv::Mat claheImage(const cv::Mat& image, double clip_limit = 2.0, cv::Size grid = cv::Size(8, 8),
+                              cv::Mat dst = cv::Mat()) {
+        cv::Mat result = claheGray(IntensityDataInfo::grayView(image), clip_limit, grid);
 
         // Convert back to BGR for consistent frontend display
-        cv::Mat result_bgr;
-        cv::cvtColor(result, result_bgr, cv::COLOR_GRAY2BGR);
-        return result_bgr;
+        return IntensityDataInfo::grayToBGR(result, dst);
+    }
+
+    // 3. Image Normalization (Contrast Stretching)
+    // Single-channel core: stretches an 8-bit grayscale image into `dst` (also 8-bit grayscale).
+    // I_min and I_max are read off the histogram, and the stretch is applied as a LUT.
+    static cv::Mat normalizeGray(const cv::Mat& gray, cv::Mat dst = cv::Mat()) {
+        cv::Mat hist;
+        IntensityDataInfo::computeHistogram(gray, hist);
+        return PointOps::apply(gray, PointOps::normalize(hist.ptr<int>(0)), dst);
     }
 
-    // 2. Image Normalization (Contrast Stretching)
-    static cv::Mat normalizeImage(const cv::Mat& image) {
+    static cv::Mat normalizeImage(const cv::Mat& image, cv::Mat dst = cv::Mat()) {
         cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        cv::Mat result = normalizeGray(gray);
 
-        // 1. Find the min (I_min) and max (I_max) intensity values in the current image
-        uchar I_min = 255;
-        uchar I_max = 0;
-        
-        for (int y = 0; y < gray.rows; ++y) {
-            const uchar* ptr = gray.ptr<uchar>(y);
-            for (int x = 0; x < gray.cols; ++x) {
-                if (ptr[x] < I_min) I_min = ptr[x];
-                if (ptr[x] > I_max) I_max = ptr[x];
-            }
-        }
+        // Convert back to BGR for consistent frontend display
+        return IntensityDataInfo::grayToBGR(result, dst);
+    }
 
-        // 2. Apply min-max normalization formula
-        // I_new = (I_old - I_min) / (I_max - I_min) * 255
-        cv::Mat result(gray.size(), gray.type());
-        
-        if (I_max == I_min) {
-            // Edge case: Image is completely flat (solid color)
-            result = gray.clone();
-        } else {
-            float scale = 255.0f / (I_max - I_min);
-            for (int y = 0; y < gray.rows; ++y) {
-                const uchar* src_ptr = gray.ptr<uchar>(y);
-                uchar* dst_ptr = result.ptr<uchar>(y);
-                for (int x = 0; x < gray.cols; ++x) {
-                    dst_ptr[x] = cv::saturate_cast<uchar>(std::round((src_ptr[x] - I_min) * scale));
-                }
-            }
-        }
+    // 4. Channel-wise point operations (color is kept; every channel goes through the same LUT)
+    static cv::Mat adjustGamma(const cv::Mat& image, double gamma, cv::Mat dst = cv::Mat()) {
+        return PointOps::apply(image, PointOps::gamma(gamma), dst);
+    }
 
-        // Convert back to BGR for consistent frontend display
-        cv::Mat result_bgr;
-        cv::cvtColor(result, result_bgr, cv::COLOR_GRAY2BGR);
-        return result_bgr;
+    static cv::Mat adjustBrightnessContrast(const cv::Mat& image, double brightness, double contrast, cv::Mat dst = cv::Mat()) {
+        return PointOps::apply(image, PointOps::brightnessContrast(brightness, contrast), dst);
+    }
+
+    static cv::Mat threshold(const cv::Mat& image, double threshold, double max_value, cv::Mat dst = cv::Mat()) {
+        return PointOps::apply(image, PointOps::threshold(threshold, max_value), dst);
+    }
+
+    static cv::Mat invert(const cv::Mat& image, cv::Mat dst = cv::Mat()) {
+        return PointOps::apply(image, PointOps::invert(), dst);
     }
 };
 
 // Pybind11 Wrappers
 
-py::array_t<unsigned char> equalize_wrapper(py::array_t<unsigned char> img) {
+py::array_t<unsigned char> equalize_wrapper(py::array_t<unsigned char> img, py::object out, py::object single_channel) {
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? ImageEnhancer::equalizeGray(IntensityDataInfo::grayView(mat), out_mat)
+                     : ImageEnhancer::equalizeHistogram(mat, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+// preserve_color equalizes only the luminance of a color image; otherwise the result is grayscale like equalize
+py::array_t<unsigned char> clahe_wrapper(py::array_t<unsigned char> img, double clip_limit, std::pair<int, int> tile_grid,
+                                         bool preserve_color, py::object out, py::object single_channel) {
     auto mat = numpy_to_mat(img);
-    auto res = ImageEnhancer::equalizeHistogram(mat);
-    return mat_to_numpy(res);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Size grid(tile_grid.first, tile_grid.second);
+    if (grid.width < 1 || grid.height < 1) {
+        throw py::value_error("`tile_grid` must be two positive integers (columns, rows)");
+    }
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        if (preserve_color && mat.channels() == 3) {
+            res = ImageEnhancer::claheColor(mat, clip_limit, grid, out_mat);
+        } else {
+            res = single ? ImageEnhancer::claheGray(IntensityDataInfo::grayView(mat), clip_limit, grid, out_mat)
+                         : ImageEnhancer::claheImage(mat, clip_limit, grid, out_mat);
+        }
+    }
+    return result_to_numpy(res, out, out_mat);
 }
 
-py::array_t<unsigned char> normalize_wrapper(py::array_t<unsigned char> img) {
+py::array_t<unsigned char> normalize_wrapper(py::array_t<unsigned char> img, py::object out, py::object single_channel) {
     auto mat = numpy_to_mat(img);
-    auto res = ImageEnhancer::normalizeImage(mat);
-    return mat_to_numpy(res);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? ImageEnhancer::normalizeGray(IntensityDataInfo::grayView(mat), out_mat)
+                     : ImageEnhancer::normalizeImage(mat, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+py::array_t<unsigned char> gamma_wrapper(py::array_t<unsigned char> img, double gamma, py::object out) {
+    if (!(gamma > 0)) {
+        throw py::value_error("`gamma` must be > 0");
+    }
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = ImageEnhancer::adjustGamma(mat, gamma, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+py::array_t<unsigned char> brightness_contrast_wrapper(py::array_t<unsigned char> img, double brightness, double contrast,
+                                                       py::object out) {
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = ImageEnhancer::adjustBrightnessContrast(mat, brightness, contrast, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+py::array_t<unsigned char> threshold_wrapper(py::array_t<unsigned char> img, double threshold, double max_value,
+                                             py::object out) {
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = ImageEnhancer::threshold(mat, threshold, max_value, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+py::array_t<unsigned char> invert_wrapper(py::array_t<unsigned char> img, py::object out) {
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = ImageEnhancer::invert(mat, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
 }
 
 #ifndef MAIN_BIND
 PYBIND11_MODULE(enhance_backend, m) {
     m.doc() = "Image enhancement C++ backend";
-    m.def("equalize", &equalize_wrapper, "Apply Histogram Equalization");
-    m.def("normalize", &normalize_wrapper, "Apply Image Normalization");
+    m.def("equalize", &equalize_wrapper, "Apply Histogram Equalization",
+          py::arg("image"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("clahe", &clahe_wrapper, "Apply Contrast Limited Adaptive Histogram Equalization",
+          py::arg("image"), py::arg("clip_limit") = 2.0, py::arg("tile_grid") = std::make_pair(8, 8),
+          py::arg("preserve_color") = false, py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("gamma", &gamma_wrapper, "Apply gamma correction (255 * (v / 255)^gamma) to every channel",
+          py::arg("image"), py::arg("gamma"), py::arg("out") = py::none());
+    m.def("brightness_contrast", &brightness_contrast_wrapper, "Apply contrast * (v - 128) + 128 + brightness to every channel",
+          py::arg("image"), py::arg("brightness") = 0.0, py::arg("contrast") = 1.0, py::arg("out") = py::none());
+    m.def("threshold", &threshold_wrapper, "Binary threshold of every channel (max_value where v > threshold, else 0)",
+          py::arg("image"), py::arg("threshold") = 127.0, py::arg("max_value") = 255.0, py::arg("out") = py::none());
+    m.def("invert", &invert_wrapper, "Invert every channel (255 - v)",
+          py::arg("image"), py::arg("out") = py::none());
+    m.def("normalize", &normalize_wrapper, "Apply Image Normalization",
+          py::arg("image"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
 }
 #endif
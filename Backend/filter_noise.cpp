@@ -1,55 +1,493 @@
+#pragma once
 #include "binding_utils.h"
+#include "filter_planner.h"
+#include "result_cache.h"
+#include <pybind11/stl.h>
 #include <string>
+#include <vector>
+#include <list>
+#include <tuple>
+#include <mutex>
+#include <algorithm>
+#include <cstring>
 
 namespace py = pybind11;
 
+// 8-bit medians with kernels at least this large use the constant-time histogram median below;
+// smaller kernels stay on cv::medianBlur, whose sorting networks win there. cv::medianBlur is constant-time for
+// these kernels too, so on one thread the histogram median is only 0-15% faster (about even from ksize 25 on);
+// the gain comes from running its tiles on every thread.
+static const int kHistogramMedianMinKernel = 9;
+
+// Largest kernel whose window count (ksize^2) still fits the 16-bit histogram bins
+static const int kHistogramMedianMaxKernel = 255;
+
+// Column stripe width (in pixels) per histogram worker; keeps a stripe's column histograms cache resident
+static const int kHistogramMedianStripe = 512;
+
+// Bands shorter than this many kernel heights spend more time priming column histograms than filtering
+static const int kHistogramMedianMinBandKernels = 4;
+
+// 16-bin slice of a histogram; every add/sub is a fixed 16-lane loop the compiler vectorizes
+static inline void addBins(uint16_t* acc, const uint16_t* h) {
+    for (int b = 0; b < 16; ++b) acc[b] += h[b];
+}
+static inline void subBins(uint16_t* acc, const uint16_t* h) {
+    for (int b = 0; b < 16; ++b) acc[b] -= h[b];
+}
+
+// Median of rows [row_begin, row_end) x columns [col_begin, col_end) using Perreault & Hebert's constant-time
+// algorithm: one 256-bin histogram per column (16 coarse + 256 fine bins) slides down the rows, and the kernel
+// histogram slides along each row by adding/removing whole column histograms. Fine bins of the kernel histogram
+// are only brought up to date for the coarse bin that holds the median.
+// Borders are replicated exactly like cv::medianBlur, so the output is identical to it. Counts never exceed
+// ksize^2, so 16-bit bins are exact for ksize <= kHistogramMedianMaxKernel.
+static void histogramMedianTile(const cv::Mat& src, cv::Mat& dst, int ksize,
+                                int row_begin, int row_end, int col_begin, int col_end) {
+    const int cn = src.channels();
+    const int r = ksize / 2;
+    const int rank = ksize * ksize / 2;    // 0-based position of the median in the sorted window
+    const int n = col_end - col_begin + 2 * r; // histogram columns, including the replicated margins
+
+    // Source offset of every histogram column (the margins repeat the edge column)
+    std::vector<int> offsets(n);
+    for (int j = 0; j < n; ++j) {
+        offsets[j] = std::min(std::max(col_begin - r + j, 0), src.cols - 1) * cn;
+    }
+
+    // Column histograms laid out so the columns of one (channel, coarse bin) segment are contiguous
+    std::vector<uint16_t> col_coarse(static_cast<size_t>(cn) * n * 16, 0);
+    std::vector<uint16_t> col_fine(static_cast<size_t>(cn) * 16 * n * 16, 0);
+    auto updateColumns = [&](int y, int delta) {
+        const uchar* row = src.ptr<uchar>(std::min(std::max(y, 0), src.rows - 1));
+        for (int c = 0; c < cn; ++c) {
+            uint16_t* coarse = &col_coarse[static_cast<size_t>(c) * n * 16];
+            uint16_t* fine = &col_fine[static_cast<size_t>(c) * 16 * n * 16];
+            for (int j = 0; j < n; ++j) {
+                int v = row[offsets[j] + c];
+                coarse[j * 16 + (v >> 4)] += delta;
+                fine[((v >> 4) * n + j) * 16 + (v & 15)] += delta;
+            }
+        }
+    };
+    for (int y = row_begin - r; y <= row_begin + r; ++y) {
+        updateColumns(y, 1);
+    }
+
+    alignas(16) uint16_t coarse[16];
+    alignas(16) uint16_t fine[16][16];
+    int fresh[16]; // output column for which fine[k] is up to date
+
+    for (int y = row_begin; y < row_end; ++y) {
+        if (y > row_begin) {
+            updateColumns(y - r - 1, -1);
+            updateColumns(y + r, 1);
+        }
+        uchar* out = dst.ptr<uchar>(y) + col_begin * cn;
+
+        for (int c = 0; c < cn; ++c) {
+            const uint16_t* hc = &col_coarse[static_cast<size_t>(c) * n * 16];
+            const uint16_t* hf = &col_fine[static_cast<size_t>(c) * 16 * n * 16];
+
+            // Window of output column i covers histogram columns [i, i + 2r]
+            std::fill(coarse, coarse + 16, 0);
+            for (int j = 0; j < 2 * r; ++j) {
+                addBins(coarse, hc + j * 16);
+            }
+            std::fill(fresh, fresh + 16, -2 * ksize); // forces a rebuild on first use
+
+            for (int i = 0; i < n - 2 * r; ++i) {
+                addBins(coarse, hc + (i + 2 * r) * 16);
+
+                // Coarse bin holding the median
+                int k = 0, below = 0;
+                while (below + coarse[k] <= rank) {
+                    below += coarse[k++];
+                }
+
+                // Bring its fine segment from column `fresh[k]` to column i
+                const uint16_t* segment = hf + static_cast<size_t>(k) * n * 16;
+                if (i - fresh[k] > 2 * r) {
+                    std::fill(fine[k], fine[k] + 16, 0);
+                    for (int j = i; j <= i + 2 * r; ++j) {
+                        addBins(fine[k], segment + j * 16);
+                    }
+                } else {
+                    for (int p = fresh[k] + 1; p <= i; ++p) {
+                        addBins(fine[k], segment + (p + 2 * r) * 16);
+                        subBins(fine[k], segment + (p - 1) * 16);
+                    }
+                }
+                fresh[k] = i;
+
+                int b = 0;
+                while (below + fine[k][b] <= rank) {
+                    below += fine[k][b++];
+                }
+                out[i * cn + c] = static_cast<uchar>(k * 16 + b);
+
+                subBins(coarse, hc + i * 16);
+            }
+        }
+    }
+}
+
+// Constant-time 8-bit median, split into column stripes and row bands that run in parallel.
+// Each tile primes its own column histograms, so bands are kept several kernel heights tall.
+static void histogramMedianBlur(const cv::Mat& image, cv::Mat& dst, int ksize) {
+    // Tiles read rows below the one they write, so in-place calls filter a copy
+    cv::Mat src = image;
+    dst.create(image.size(), image.type());
+    if (dst.data == image.data) {
+        src = image.clone();
+    }
+
+    int stripe_width = std::max(16, kHistogramMedianStripe / src.channels());
+    int stripes = (src.cols + stripe_width - 1) / stripe_width;
+    int wanted_bands = (cv::getNumThreads() + stripes - 1) / stripes;
+    int bands = std::max(1, std::min(wanted_bands, src.rows / (kHistogramMedianMinBandKernels * ksize)));
+
+    cv::parallel_for_(cv::Range(0, bands * stripes), [&](const cv::Range& range) {
+        for (int tile = range.start; tile < range.end; ++tile) {
+            int band = tile / stripes, stripe = tile % stripes;
+            int row_begin = static_cast<int>(static_cast<long long>(src.rows) * band / bands);
+            int row_end = static_cast<int>(static_cast<long long>(src.rows) * (band + 1) / bands);
+            int col_begin = stripe * stripe_width;
+            int col_end = std::min(src.cols, col_begin + stripe_width);
+            histogramMedianTile(src, dst, ksize, row_begin, row_end, col_begin, col_end);
+        }
+    });
+}
+
 class SpatialFilter {
+private:
+    // Kernel spectra for FFT convolution are cached per (padded size, filter, kernel size)
+    static const size_t kKernelSpectrumCacheCapacity = 8;
+
+    using SpectrumKey = std::tuple<int, int, std::string, int>;
+
+    static std::mutex& spectrumCacheMutex() {
+        static std::mutex mutex;
+        return mutex;
+    }
+
+    static std::list<std::pair<SpectrumKey, cv::Mat>>& spectrumCache() {
+        static std::list<std::pair<SpectrumKey, cv::Mat>> cache;
+        return cache;
+    }
+
+    // Packed (CCS) spectrum of the ksize x ksize smoothing kernel, wrapped around the origin of a padded grid
+    static cv::Mat kernelSpectrum(const std::string& filter_type, int ksize, cv::Size padded) {
+        SpectrumKey key(padded.height, padded.width, filter_type, ksize);
+        {
+            std::lock_guard<std::mutex> lock(spectrumCacheMutex());
+            auto& cache = spectrumCache();
+            for (auto it = cache.begin(); it != cache.end(); ++it) {
+                if (it->first == key) {
+                    cache.splice(cache.begin(), cache, it);
+                    return it->second;
+                }
+            }
+        }
+
+        // Same taps as cv::blur / cv::GaussianBlur(sigma = 0)
+        cv::Mat taps = filter_type == "Gaussian" ? cv::getGaussianKernel(ksize, 0, CV_64F)
+                                                 : cv::Mat(ksize, 1, CV_64F, cv::Scalar(1.0 / ksize));
+        cv::Mat kernel(padded, CV_32F, cv::Scalar(0));
+        int anchor = ksize / 2;
+        for (int i = 0; i < ksize; ++i) {
+            for (int j = 0; j < ksize; ++j) {
+                // Correlation with the tap at (i, j) is convolution with it at (anchor - i, anchor - j)
+                int y = (anchor - i + padded.height) % padded.height;
+                int x = (anchor - j + padded.width) % padded.width;
+                kernel.at<float>(y, x) = static_cast<float>(taps.at<double>(i) * taps.at<double>(j));
+            }
+        }
+        cv::Mat spectrum;
+        cv::dft(kernel, spectrum);
+
+        std::lock_guard<std::mutex> lock(spectrumCacheMutex());
+        auto& cache = spectrumCache();
+        cache.emplace_front(key, spectrum);
+        if (cache.size() > kKernelSpectrumCacheCapacity) {
+            cache.pop_back();
+        }
+        return spectrum;
+    }
+
 public:
-    static cv::Mat applyAverageFilter(const cv::Mat& image, int kernel_size) {
-        cv::Mat result;
+    // `dst` may wrap a preallocated output buffer; it is written in place when its size/type match.
+    // `method` is "auto" (the cheapest method whose output equals OpenCV's, so results never depend on the
+    // planner's calibration) or one of FilterPlanner::methods(filter_type); "fft" must be asked for by name.
+    static cv::Mat applyAverageFilter(const cv::Mat& image, int kernel_size, cv::Mat dst = cv::Mat(),
+                                      const std::string& method = "auto") {
+        if (resolveMethod("Average", image, kernel_size, method) == "fft") {
+            return applyFFTFilter(image, "Average", kernel_size, dst);
+        }
         // OpenCV blur acts as a normalized box filter
-        cv::blur(image, result, cv::Size(kernel_size, kernel_size));
-        return result;
+        cv::blur(image, dst, cv::Size(kernel_size, kernel_size));
+        return dst;
     }
 
-    static cv::Mat applyGaussianFilter(const cv::Mat& image, int kernel_size) {
-        cv::Mat result;
+    static cv::Mat applyGaussianFilter(const cv::Mat& image, int kernel_size, cv::Mat dst = cv::Mat(),
+                                       const std::string& method = "auto") {
+        if (resolveMethod("Gaussian", image, kernel_size, method) == "fft") {
+            return applyFFTFilter(image, "Gaussian", kernel_size, dst);
+        }
         // Gaussian blur. Setting sigmaX and sigmaY to 0 lets OpenCV calculate it automatically from the kernel size
-        cv::GaussianBlur(image, result, cv::Size(kernel_size, kernel_size), 0, 0);
-        return result;
+        cv::GaussianBlur(image, dst, cv::Size(kernel_size, kernel_size), 0, 0);
+        return dst;
+    }
+
+    // Linear smoothing by FFT convolution: each channel is border-extended like cv::blur / cv::GaussianBlur
+    // (BORDER_REFLECT_101), zero-padded to an optimal DFT size and multiplied with the cached kernel spectrum.
+    // Results are the exactly rounded filter output; OpenCV's fixed-point 8-bit paths can be a level or two off it.
+    static cv::Mat applyFFTFilter(const cv::Mat& image, const std::string& filter_type, int kernel_size, cv::Mat dst = cv::Mat()) {
+        std::string kind = FilterPlanner::canonical(filter_type);
+        CV_Assert(!kind.empty() && kernel_size >= 1 && image.depth() == CV_8U);
+
+        int anchor = kernel_size / 2;
+        cv::Size extended(image.cols + kernel_size - 1, image.rows + kernel_size - 1);
+        cv::Size padded = FilterPlanner::dftSize(image.rows, image.cols, kernel_size);
+        cv::Mat spectrum = kernelSpectrum(kind, kernel_size, padded);
+
+        std::vector<cv::Mat> planes;
+        cv::split(image, planes);
+        for (cv::Mat& plane : planes) {
+            cv::Mat border, grid(padded, CV_32F, cv::Scalar(0)), freq, result;
+            cv::copyMakeBorder(plane, border, anchor, kernel_size - 1 - anchor, anchor, kernel_size - 1 - anchor,
+                               cv::BORDER_REFLECT_101);
+            border.convertTo(grid(cv::Rect(cv::Point(0, 0), extended)), CV_32F);
+
+            // Only the rows holding data need transforming forward, and only the rows we keep backward
+            // (OpenCV rejects the row hint for single-column grids)
+            bool row_hint = padded.width > 1;
+            cv::dft(grid, freq, 0, row_hint ? extended.height : 0);
+            cv::mulSpectrums(freq, spectrum, freq, 0);
+            cv::idft(freq, result, cv::DFT_SCALE | cv::DFT_REAL_OUTPUT, row_hint ? anchor + image.rows : 0);
+            result(cv::Rect(anchor, anchor, image.cols, image.rows)).convertTo(plane, CV_8U);
+        }
+
+        dst.create(image.size(), image.type());
+        cv::merge(planes, dst);
+        return dst;
+    }
+
+    // Whether the FFT path can compute this call. Kernels the spatial path would reject (even Gaussian sizes,
+    // non-positive sizes) stay on it so OpenCV reports the error exactly as before.
+    static bool fftApplies(const std::string& filter_type, const cv::Mat& image, int kernel_size) {
+        return kernel_size >= 1 && image.depth() == CV_8U && !image.empty() &&
+               (FilterPlanner::canonical(filter_type) != "Gaussian" || kernel_size % 2 == 1);
+    }
+
+    // The method that will actually run. "auto" only picks among methods with OpenCV-identical output, so the
+    // result is the same on every machine whatever the calibration.
+    static std::string resolveMethod(const std::string& filter_type, const cv::Mat& image, int kernel_size,
+                                     const std::string& method) {
+        std::vector<std::string> candidates = FilterPlanner::methods(filter_type);
+        std::string spatial = candidates.empty() ? "" : candidates.front();
+        if (method == "auto") {
+            return candidates.empty() ? spatial
+                                      : FilterPlanner::choose(filter_type, image.rows, image.cols, image.channels(), kernel_size, true);
+        }
+        if (std::find(candidates.begin(), candidates.end(), method) == candidates.end()) {
+            CV_Error(cv::Error::StsBadArg, "Method '" + method + "' cannot compute a " + filter_type + " filter");
+        }
+        return method;
+    }
+
+    static cv::Mat applyMedianFilter(const cv::Mat& image, int kernel_size, cv::Mat dst = cv::Mat()) {
+        // Median filter is non-linear and replaces each pixel with the median of its neighbors.
+        // Large 8-bit kernels switch to the parallel constant-time histogram median (same output).
+        if (image.depth() == CV_8U && kernel_size % 2 == 1 && kernel_size >= kHistogramMedianMinKernel &&
+            kernel_size <= kHistogramMedianMaxKernel && !image.empty()) {
+            histogramMedianBlur(image, dst, kernel_size);
+            return dst;
+        }
+        cv::medianBlur(image, dst, kernel_size);
+        return dst;
     }
 
-    static cv::Mat applyMedianFilter(const cv::Mat& image, int kernel_size) {
-        cv::Mat result;
-        // Median filter is non-linear and replaces each pixel with the median of its neighbors
-        cv::medianBlur(image, result, kernel_size);
-        return result;
+    // Dispatch based on filter type parameter (unknown types return an unchanged copy)
+    static cv::Mat apply(const cv::Mat& image, const std::string& filter_type, int kernel_size, cv::Mat dst = cv::Mat(),
+                         const std::string& method = "auto") {
+        if (filter_type == "Average Filter" || filter_type == "Average") {
+            return applyAverageFilter(image, kernel_size, dst, method);
+        } else if (filter_type == "Gaussian Filter" || filter_type == "Gaussian") {
+            return applyGaussianFilter(image, kernel_size, dst, method);
+        } else if (filter_type == "Median Filter" || filter_type == "Median") {
+            return applyMedianFilter(image, kernel_size, dst);
+        }
+        // Fallback
+        image.copyTo(dst);
+        return dst;
     }
 };
 
-py::array_t<unsigned char> apply_filter_wrapper(py::array_t<unsigned char> img, const std::string& filter_type, int kernel_size) {
+// Benchmark every method on a synthetic 1-megapixel BGR image (the common case; interleaved channels are
+// cheaper per sample than planar ones) and fit the per-sample cost model to the timings.
+// Takes about a second; the result becomes the active model.
+static FilterCostModel calibrateFilterPlanner() {
+    cv::Mat image(1024, 1024, CV_8UC3), dst;
+    cv::randu(image, cv::Scalar::all(0), cv::Scalar::all(256));
+    double samples = static_cast<double>(image.total()) * image.channels();
+
+    // Best of three runs, in nanoseconds per sample
+    auto timed = [&](const std::string& filter_type, int ksize, const std::string& method) {
+        double best = 0;
+        for (int run = 0; run < 3; ++run) {
+            int64 start = cv::getTickCount();
+            SpatialFilter::apply(image, filter_type, ksize, dst, method);
+            double ns = (cv::getTickCount() - start) * 1e9 / cv::getTickFrequency() / samples;
+            best = run == 0 ? ns : std::min(best, ns);
+        }
+        return best;
+    };
+
+    FilterCostModel model;
+    model.box_ns = timed("Average", 15, "box");
+
+    // Least-squares line through the separable timings against the number of taps
+    std::vector<int> sizes = { 7, 15, 31, 63 };
+    double sx = 0, sy = 0, sxx = 0, sxy = 0;
+    for (int ksize : sizes) {
+        double taps = 2.0 * ksize, ns = timed("Gaussian", ksize, "separable");
+        sx += taps; sy += ns; sxx += taps * taps; sxy += taps * ns;
+    }
+    double n = static_cast<double>(sizes.size());
+    model.separable_tap_ns = std::max(0.0, (n * sxy - sx * sy) / (n * sxx - sx * sx));
+    model.separable_ns = std::max(0.0, (sy - model.separable_tap_ns * sx) / n);
+
+    int fft_ksize = 31;
+    cv::Size padded = FilterPlanner::dftSize(image.rows, image.cols, fft_ksize);
+    double elements = static_cast<double>(padded.area());
+    model.fft_ns = timed("Gaussian", fft_ksize, "fft") * samples / (elements * std::log2(elements) * image.channels());
+
+    model.calibrated = true;
+    FilterPlanner::setModel(model);
+    return model;
+}
+
+static py::dict filter_model_to_dict(const FilterCostModel& model) {
+    py::dict result, crossovers;
+    result["box_ns"] = model.box_ns;
+    result["separable_ns"] = model.separable_ns;
+    result["separable_tap_ns"] = model.separable_tap_ns;
+    result["fft_ns"] = model.fft_ns;
+    result["calibrated"] = model.calibrated;
+    for (const char* filter_type : { "Average", "Gaussian" }) {
+        py::dict by_size;
+        for (int side : { 256, 512, 1024, 2048, 4096 }) {
+            int ksize = FilterPlanner::crossover(model, filter_type, side, side);
+            by_size[py::int_(side)] = ksize > 0 ? py::object(py::int_(ksize)) : py::object(py::none());
+        }
+        crossovers[filter_type] = by_size;
+    }
+    result["crossovers"] = crossovers;
+    return result;
+}
+
+// With the result cache enabled, results are keyed by the method that actually runs rather than the requested one,
+// so "auto" shares entries with the method it resolves to and a newly loaded planner model cannot return the
+// result of a method it no longer picks.
+py::array_t<unsigned char> apply_filter_wrapper(py::array_t<unsigned char> img, const std::string& filter_type, int kernel_size,
+                                                py::object out, const std::string& method) {
     auto mat = numpy_to_mat(img);
+    std::string cache_key;
+    if (ResultCache::enabled()) {
+        ResultKey key("apply_filter");
+        key.add(img);
+        key.add(filter_type);
+        key.add(kernel_size);
+        key.add(out);
+        key.add(FilterPlanner::methods(filter_type).empty() ? method
+                                                            : SpatialFilter::resolveMethod(filter_type, mat, kernel_size, method));
+        if (key.cacheable()) {
+            cache_key = key.str();
+            py::object hit = ResultCache::lookup(cache_key);
+            if (!hit.is_none()) {
+                return py::reinterpret_borrow<py::array_t<unsigned char>>(hit);
+            }
+        }
+    }
+
+    auto out_mat = out_to_mat(out);
     cv::Mat res;
-    
-    // Dispatch based on filter type parameter
-    if (filter_type == "Average Filter" || filter_type == "Average") {
-        res = SpatialFilter::applyAverageFilter(mat, kernel_size);
-    } else if (filter_type == "Gaussian Filter" || filter_type == "Gaussian") {
-        res = SpatialFilter::applyGaussianFilter(mat, kernel_size);
-    } else if (filter_type == "Median Filter" || filter_type == "Median") {
-        res = SpatialFilter::applyMedianFilter(mat, kernel_size);
-    } else {
-        // Fallback
-        res = mat.clone(); 
+    {
+        py::gil_scoped_release release;
+        res = SpatialFilter::apply(mat, filter_type, kernel_size, out_mat, method);
+    }
+    py::array_t<unsigned char> result = result_to_numpy(res, out, out_mat);
+    if (!cache_key.empty()) {
+        ResultCache::insertArray(cache_key, result);
+    }
+    return result;
+}
+
+// The method apply_filter(method="auto") would use, the fastest method overall (which may be the opt-in "fft"),
+// and the estimated cost of every candidate
+py::dict plan_filter_wrapper(py::array_t<unsigned char> img, const std::string& filter_type, int kernel_size) {
+    auto mat = numpy_to_mat(img);
+    FilterCostModel model = FilterPlanner::model();
+    py::dict estimates;
+    for (const std::string& method : FilterPlanner::methods(filter_type)) {
+        estimates[py::str(method)] = FilterPlanner::estimate(model, method, mat.rows, mat.cols, mat.channels(), kernel_size) * 1e-6;
     }
-    
-    return mat_to_numpy(res);
+
+    py::dict result;
+    std::string method = SpatialFilter::resolveMethod(filter_type, mat, kernel_size, "auto");
+    result["method"] = method.empty() ? py::object(py::none()) : py::object(py::str(method));
+    std::string fastest = SpatialFilter::fftApplies(filter_type, mat, kernel_size)
+                              ? FilterPlanner::choose(model, filter_type, mat.rows, mat.cols, mat.channels(), kernel_size)
+                              : method;
+    result["fastest"] = fastest.empty() ? py::object(py::none()) : py::object(py::str(fastest));
+    result["estimates_ms"] = estimates;
+    result["calibrated"] = model.calibrated;
+    return result;
+}
+
+// Benchmark the local machine, activate the fitted model and optionally persist it to `path`
+py::dict calibrate_filter_planner_wrapper(const std::string& path) {
+    FilterCostModel model;
+    {
+        py::gil_scoped_release release;
+        model = calibrateFilterPlanner();
+    }
+    if (!path.empty()) {
+        FilterPlanner::save(model, path);
+    }
+    return filter_model_to_dict(model);
+}
+
+// Activate a model persisted by calibrate_filter_planner; False if `path` holds no usable calibration
+bool load_filter_planner_wrapper(const std::string& path) {
+    FilterCostModel model;
+    if (!FilterPlanner::load(path, model)) {
+        return false;
+    }
+    FilterPlanner::setModel(model);
+    return true;
+}
+
+py::dict get_filter_planner_wrapper() {
+    return filter_model_to_dict(FilterPlanner::model());
 }
 
 #ifndef MAIN_BIND
 PYBIND11_MODULE(filter_backend, m) {
     m.doc() = "Spatial Domain filtering C++ backend";
-    m.def("apply_filter", &apply_filter_wrapper, "Apply spatial filters based on type and kernel size",
+    m.def("apply_filter", &apply_filter_wrapper,
+          "Apply spatial filters based on type and kernel size. method=\"auto\" only uses methods whose output equals "
+          "OpenCV's, so results are the same on every machine. method=\"fft\" opts in to FFT convolution, faster for "
+          "very large Average/Gaussian kernels but up to 2 levels off the OpenCV result",
+          py::arg("image"), py::arg("filter_type"), py::arg("kernel_size"), py::arg("out") = py::none(),
+          py::arg("method") = "auto");
+    m.def("plan_filter", &plan_filter_wrapper, "Method apply_filter(method=\"auto\") runs, the fastest method overall, and estimated costs",
           py::arg("image"), py::arg("filter_type"), py::arg("kernel_size"));
+    m.def("calibrate_filter_planner", &calibrate_filter_planner_wrapper, "Benchmark filter methods and fit the planner",
+          py::arg("path") = "");
+    m.def("load_filter_planner", &load_filter_planner_wrapper, "Load a persisted filter planner calibration",
+          py::arg("path"));
+    m.def("get_filter_planner", &get_filter_planner_wrapper, "Active filter planner cost model and crossover points");
 }
 #endif
@@ -0,0 +1,166 @@
+#pragma once
+#include <opencv2/opencv.hpp>
+#include <fstream>
+#include <string>
+#include <vector>
+#include <mutex>
+#include <cmath>
+
+// Per-sample costs (in nanoseconds) of the ways a linear smoothing filter can be computed.
+// The defaults are rough figures for a single modern core; calibration (calibrateFilterPlanner in
+// filter_noise.cpp) replaces them with measurements of the local machine.
+struct FilterCostModel {
+    double box_ns = 0.7;             // running-sum box filter, independent of the kernel size
+    double separable_ns = 0.1;       // separable row + column passes: fixed part ...
+    double separable_tap_ns = 0.125; // ... plus this per kernel tap (2 * ksize taps)
+    double fft_ns = 1.5;             // FFT convolution, per padded DFT element and log2(elements)
+    bool calibrated = false;
+};
+
+// Picks the cheapest way to run an "Average" or "Gaussian" filter for a given image and kernel size:
+//   "box"       running sums (cv::blur), O(1) per pixel; Average only
+//   "separable" row + column passes (cv::GaussianBlur), O(ksize) per pixel; Gaussian only
+//   "fft"       convolution by pointwise multiplication of DFTs padded to cv::getOptimalDFTSize, O(log N) per pixel
+class FilterPlanner {
+private:
+    static std::mutex& modelMutex() {
+        static std::mutex mutex;
+        return mutex;
+    }
+
+    static FilterCostModel& currentModel() {
+        static FilterCostModel model;
+        return model;
+    }
+
+public:
+    // Largest kernel size searched for crossover points
+    static const int kMaxCrossoverKernel = 255;
+
+    // Canonical filter name ("Average" / "Gaussian"), or "" for filters the planner does not handle
+    static std::string canonical(const std::string& filter_type) {
+        if (filter_type == "Average Filter" || filter_type == "Average") return "Average";
+        if (filter_type == "Gaussian Filter" || filter_type == "Gaussian") return "Gaussian";
+        return "";
+    }
+
+    // Methods that can compute `filter_type`, in order of preference when costs tie
+    static std::vector<std::string> methods(const std::string& filter_type) {
+        std::string kind = canonical(filter_type);
+        if (kind == "Average") return { "box", "fft" };
+        if (kind == "Gaussian") return { "separable", "fft" };
+        return {};
+    }
+
+    // Whether `method` returns exactly what OpenCV's spatial filter returns. "fft" gives the exactly rounded filter
+    // output, which can be a level or two off OpenCV's fixed-point paths, so it only runs when asked for by name.
+    static bool matchesOpenCV(const std::string& method) {
+        return method != "fft";
+    }
+
+    // Padded DFT size for FFT convolution: the image plus the kernel overlap, rounded up to a fast size
+    static cv::Size dftSize(int rows, int cols, int ksize) {
+        return cv::Size(cv::getOptimalDFTSize(cols + ksize - 1), cv::getOptimalDFTSize(rows + ksize - 1));
+    }
+
+    static FilterCostModel model() {
+        std::lock_guard<std::mutex> lock(modelMutex());
+        return currentModel();
+    }
+
+    static void setModel(const FilterCostModel& model) {
+        std::lock_guard<std::mutex> lock(modelMutex());
+        currentModel() = model;
+    }
+
+    // Estimated run time in nanoseconds
+    static double estimate(const FilterCostModel& model, const std::string& method, int rows, int cols, int channels, int ksize) {
+        double samples = static_cast<double>(rows) * cols * channels;
+        if (method == "box") {
+            return model.box_ns * samples;
+        } else if (method == "separable") {
+            return (model.separable_ns + model.separable_tap_ns * 2.0 * ksize) * samples;
+        } else if (method == "fft") {
+            cv::Size padded = dftSize(rows, cols, ksize);
+            double elements = static_cast<double>(padded.area());
+            return model.fft_ns * elements * std::log2(elements) * channels;
+        }
+        return -1;
+    }
+
+    // Cheapest method; with `opencv_only`, among those whose output is identical to OpenCV's
+    static std::string choose(const FilterCostModel& model, const std::string& filter_type, int rows, int cols, int channels, int ksize,
+                              bool opencv_only = false) {
+        std::string best;
+        double best_cost = 0;
+        for (const std::string& method : methods(filter_type)) {
+            if (opencv_only && !matchesOpenCV(method)) continue;
+            double cost = estimate(model, method, rows, cols, channels, ksize);
+            if (best.empty() || cost < best_cost) {
+                best = method;
+                best_cost = cost;
+            }
+        }
+        return best;
+    }
+
+    static std::string choose(const std::string& filter_type, int rows, int cols, int channels, int ksize,
+                              bool opencv_only = false) {
+        return choose(model(), filter_type, rows, cols, channels, ksize, opencv_only);
+    }
+
+    // Smallest odd kernel size at which "fft" becomes the cheapest method for a rows x cols image, or 0 if it never does
+    static int crossover(const FilterCostModel& model, const std::string& filter_type, int rows, int cols) {
+        for (int ksize = 1; ksize <= kMaxCrossoverKernel; ksize += 2) {
+            if (choose(model, filter_type, rows, cols, 1, ksize) == "fft") {
+                return ksize;
+            }
+        }
+        return 0;
+    }
+
+    // Persist the model, together with the crossover kernel sizes it implies for a few square image sizes.
+    // Any format cv::FileStorage understands works (.json, .yml, .xml).
+    static void save(const FilterCostModel& model, const std::string& path) {
+        cv::FileStorage fs(path, cv::FileStorage::WRITE);
+        if (!fs.isOpened()) {
+            CV_Error(cv::Error::StsError, "Cannot write filter planner calibration to " + path);
+        }
+        fs << "box_ns" << model.box_ns;
+        fs << "separable_ns" << model.separable_ns;
+        fs << "separable_tap_ns" << model.separable_tap_ns;
+        fs << "fft_ns" << model.fft_ns;
+        fs << "crossovers" << "{";
+        for (const char* filter_type : { "Average", "Gaussian" }) {
+            fs << filter_type << "[";
+            for (int side : { 256, 512, 1024, 2048, 4096 }) {
+                fs << "{" << "size" << side << "ksize" << crossover(model, filter_type, side, side) << "}";
+            }
+            fs << "]";
+        }
+        fs << "}";
+    }
+
+    // Load a model written by save(); returns false (and leaves `model` alone) if the file is missing or incomplete
+    static bool load(const std::string& path, FilterCostModel& model) {
+        // cv::FileStorage logs an error for a missing file, which is the normal case before the first calibration
+        if (!std::ifstream(path).good()) return false;
+        cv::FileStorage fs;
+        try {
+            if (!fs.open(path, cv::FileStorage::READ)) return false;
+        } catch (const cv::Exception&) {
+            return false;
+        }
+        FilterCostModel loaded;
+        const char* keys[] = { "box_ns", "separable_ns", "separable_tap_ns", "fft_ns" };
+        double* fields[] = { &loaded.box_ns, &loaded.separable_ns, &loaded.separable_tap_ns, &loaded.fft_ns };
+        for (int i = 0; i < 4; ++i) {
+            cv::FileNode node = fs[keys[i]];
+            if (!node.isReal() && !node.isInt()) return false;
+            *fields[i] = static_cast<double>(node);
+        }
+        loaded.calibrated = true;
+        model = loaded;
+        return true;
+    }
+};
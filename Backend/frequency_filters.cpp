@@ -1,12 +1,32 @@
 #pragma once
 #include "binding_utils.h"
 #include "intensity_data_info.h"
+#include "result_cache.h"
 #include <string>
+#include <list>
+#include <tuple>
+#include <mutex>
+#include <memory>
 
 namespace py = pybind11;
 
 class FrequencyFilters {
 private:
+    // Radial masks are cached per (padded size, radius, type); bounded so large images cannot pile up
+    static const size_t kMaskCacheCapacity = 16;
+
+    using MaskKey = std::tuple<int, int, int, bool>;
+
+    static std::mutex& maskCacheMutex() {
+        static std::mutex mutex;
+        return mutex;
+    }
+
+    static std::list<std::pair<MaskKey, cv::Mat>>& maskCache() {
+        static std::list<std::pair<MaskKey, cv::Mat>> cache;
+        return cache;
+    }
+
     // Helper function to rearrange the quadrants of Fourier image
     static void fftShift(cv::Mat& magI) {
         magI = magI(cv::Rect(0, 0, magI.cols & -2, magI.rows & -2));
@@ -29,19 +49,18 @@ private:
     }
 
 public:
-    // Apply the Frequency domain Filters
-    static cv::Mat applyFFTFilter(const cv::Mat& image, const std::string& filter_type, int radius) {
-        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
-
+    // Forward DFT of the grayscale image, zero-padded to an even optimal size (CV_32FC2).
+    // The spectrum is kept in natural (unshifted) order; masks are pre-shifted instead.
+    static cv::Mat forwardDFT(const cv::Mat& gray) {
         // Expand input image to optimal size for fast computation
         cv::Mat padded;
         int m = cv::getOptimalDFTSize(gray.rows);
         int n = cv::getOptimalDFTSize(gray.cols);
-        
+
         // Ensure m and n are even so fftShift doesn't crop the matrix
         if (m % 2 != 0) m++;
         if (n % 2 != 0) n++;
-        
+
         cv::copyMakeBorder(gray, padded, 0, m - gray.rows, 0, n - gray.cols, cv::BORDER_CONSTANT, cv::Scalar::all(0));
 
         // Make place for both the complex and the real values
@@ -51,54 +70,217 @@ public:
 
         // Make the Discrete Fourier Transform
         cv::dft(complexI, complexI);
+        return complexI;
+    }
 
-        // Shift quadrants to the center
-        fftShift(complexI);
+    // Binary (0/1) CV_8U circular mask centred on the shifted spectrum, then shifted back so it
+    // lines up with the natural-order spectrum. Shared between calls through a small LRU cache.
+    static cv::Mat radialMask(cv::Size size, int radius, bool low_pass) {
+        MaskKey key(size.width, size.height, radius, low_pass);
+        std::lock_guard<std::mutex> lock(maskCacheMutex());
 
-        // Create Mask (Low Pass or High Pass)
-        cv::Mat mask = cv::Mat(complexI.size(), CV_32F, cv::Scalar(filter_type == "low_pass" ? 0 : 1));
-        cv::Point center(complexI.cols / 2, complexI.rows / 2);
-        cv::circle(mask, center, radius, cv::Scalar(filter_type == "low_pass" ? 1 : 0), -1);
+        auto& cache = maskCache();
+        for (auto it = cache.begin(); it != cache.end(); ++it) {
+            if (it->first == key) {
+                cache.splice(cache.begin(), cache, it);
+                return it->second;
+            }
+        }
 
-        // Merge mask into two channels to match complexI
-        cv::Mat maskPlanes[] = {mask, mask};
-        cv::Mat complexMask;
-        cv::merge(maskPlanes, 2, complexMask);
+        // Create Mask (Low Pass or High Pass)
+        cv::Mat mask(size, CV_8U, cv::Scalar(low_pass ? 0 : 1));
+        cv::Point center(size.width / 2, size.height / 2);
+        cv::circle(mask, center, radius, cv::Scalar(low_pass ? 1 : 0), -1);
+        fftShift(mask);
 
-        // Apply mask (element-wise multiplication)
-        cv::mulSpectrums(complexI, complexMask, complexI, 0);
+        cache.emplace_front(key, mask);
+        if (cache.size() > kMaskCacheCapacity) {
+            cache.pop_back();
+        }
+        return mask;
+    }
 
-        // Shift back
-        fftShift(complexI);
+    // Apply a 0/1 mask to a natural-order spectrum, then invert, crop to `original` and normalize
+    // to an 8-bit grayscale image. The mask acts as the complex value m + i*m (the mask duplicated
+    // into both planes and multiplied with mulSpectrums), i.e. (re, im) -> (m * (re - im), m * (re + im)).
+    static cv::Mat inverseFiltered(const cv::Mat& complexI, const cv::Mat& mask, cv::Size original, cv::Mat dst = cv::Mat()) {
+        cv::Mat filtered(complexI.size(), CV_32FC2);
+        for (int y = 0; y < complexI.rows; ++y) {
+            const float* src_ptr = complexI.ptr<float>(y);
+            const uchar* mask_ptr = mask.ptr<uchar>(y);
+            float* dst_ptr = filtered.ptr<float>(y);
+            for (int x = 0; x < complexI.cols; ++x) {
+                float re = src_ptr[2 * x];
+                float im = src_ptr[2 * x + 1];
+                if (mask_ptr[x]) {
+                    dst_ptr[2 * x] = re - im;
+                    dst_ptr[2 * x + 1] = re + im;
+                } else {
+                    dst_ptr[2 * x] = 0.f;
+                    dst_ptr[2 * x + 1] = 0.f;
+                }
+            }
+        }
 
         // Inverse Transform (IDFT)
-        cv::idft(complexI, complexI, cv::DFT_SCALE | cv::DFT_REAL_OUTPUT);
-        cv::split(complexI, planes);
-        cv::Mat img_back = planes[0];
+        cv::Mat img_back;
+        cv::idft(filtered, img_back, cv::DFT_SCALE | cv::DFT_REAL_OUTPUT);
 
         // Crop back to original size and normalize
-        img_back = img_back(cv::Rect(0, 0, gray.cols, gray.rows));
+        img_back = img_back(cv::Rect(0, 0, original.width, original.height));
         cv::normalize(img_back, img_back, 0, 255, cv::NORM_MINMAX);
-        
-        cv::Mat result;
-        img_back.convertTo(result, CV_8U);
-        cv::cvtColor(result, result, cv::COLOR_GRAY2BGR);
-        
-        return result;
+
+        img_back.convertTo(dst, CV_8U);
+        return dst;
+    }
+
+    // Single-channel core: filters an 8-bit grayscale image into `dst` (also 8-bit grayscale)
+    static cv::Mat applyFFTFilterGray(const cv::Mat& gray, const std::string& filter_type, int radius, cv::Mat dst = cv::Mat()) {
+        cv::Mat complexI = forwardDFT(gray);
+        cv::Mat mask = radialMask(complexI.size(), radius, filter_type == "low_pass");
+        return inverseFiltered(complexI, mask, gray.size(), dst);
+    }
+
+    // Apply the Frequency domain Filters
+    // `dst` may wrap a preallocated output buffer; it is written in place when its size/type match.
+    static cv::Mat applyFFTFilter(const cv::Mat& image, const std::string& filter_type, int radius, cv::Mat dst = cv::Mat()) {
+        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        cv::Mat result = applyFFTFilterGray(gray, filter_type, radius);
+
+        return IntensityDataInfo::grayToBGR(result, dst);
     }
 };
 
+// Forward spectrum of one image, computed once so that low/high-pass filtering at many radii
+// only costs the mask scale and the inverse transform. Immutable after construction.
+// `source_key` (ImageFingerprint::describe of the image) lets results be shared through the ResultCache.
+class Spectrum {
+public:
+    explicit Spectrum(const cv::Mat& image, std::string source_key = "") : source_key_(std::move(source_key)) {
+        cv::Mat gray = IntensityDataInfo::convertToGrayscale(image);
+        original_size_ = gray.size();
+        complexI_ = FrequencyFilters::forwardDFT(gray);
+    }
+
+    // Single-channel result
+    cv::Mat applyGray(const std::string& filter_type, int radius, cv::Mat dst = cv::Mat()) const {
+        cv::Mat mask = FrequencyFilters::radialMask(complexI_.size(), radius, filter_type == "low_pass");
+        return FrequencyFilters::inverseFiltered(complexI_, mask, original_size_, dst);
+    }
+
+    // BGR result, matching applyFFTFilter
+    cv::Mat apply(const std::string& filter_type, int radius, cv::Mat dst = cv::Mat()) const {
+        cv::Mat result = applyGray(filter_type, radius);
+        return IntensityDataInfo::grayToBGR(result, dst);
+    }
+
+    cv::Size originalSize() const { return original_size_; }
+    cv::Size paddedSize() const { return complexI_.size(); }
+    const std::string& sourceKey() const { return source_key_; }
+    size_t nbytes() const { return complexI_.total() * complexI_.elemSize(); }
+
+private:
+    cv::Mat complexI_;
+    cv::Size original_size_;
+    std::string source_key_;
+};
+
 // Pybind11 wrapper
-py::array_t<unsigned char> apply_fft_wrapper(py::array_t<unsigned char> img, const std::string& filter_type, int radius) {
+py::array_t<unsigned char> apply_fft_wrapper(py::array_t<unsigned char> img, const std::string& filter_type, int radius,
+                                             py::object out, py::object single_channel) {
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? FrequencyFilters::applyFFTFilterGray(IntensityDataInfo::grayView(mat), filter_type, radius, out_mat)
+                     : FrequencyFilters::applyFFTFilter(mat, filter_type, radius, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+// With the result cache enabled, spectra are cached by image content: reloading the same image reuses its
+// forward DFT, and Spectrum.apply shares cache entries with apply_fft on that image.
+std::shared_ptr<Spectrum> spectrum_init_wrapper(py::array_t<unsigned char> img) {
     auto mat = numpy_to_mat(img);
-    auto res = FrequencyFilters::applyFFTFilter(mat, filter_type, radius);
-    return mat_to_numpy(res);
+    if (!ResultCache::enabled()) {
+        py::gil_scoped_release release;
+        return std::make_shared<Spectrum>(mat);
+    }
+
+    std::string source = ImageFingerprint::describe(mat);
+    std::string key = "Spectrum|" + source;
+    py::object hit = ResultCache::lookup(key);
+    if (!hit.is_none()) {
+        return *hit.cast<py::capsule>().get_pointer<std::shared_ptr<Spectrum>>();
+    }
+    std::shared_ptr<Spectrum> spectrum;
+    {
+        py::gil_scoped_release release;
+        spectrum = std::make_shared<Spectrum>(mat, source);
+    }
+    py::capsule holder(new std::shared_ptr<Spectrum>(spectrum),
+                       [](void* p) { delete static_cast<std::shared_ptr<Spectrum>*>(p); });
+    ResultCache::insert(key, holder, spectrum->nbytes());
+    return spectrum;
+}
+
+py::array_t<unsigned char> spectrum_apply_wrapper(const Spectrum& spectrum, const std::string& filter_type, int radius,
+                                                  py::object out, py::object single_channel) {
+    std::string cache_key;
+    if (ResultCache::enabled() && !spectrum.sourceKey().empty()) {
+        // Same key as apply_fft(image, filter_type, radius, out, single_channel)
+        ResultKey key("apply_fft");
+        key.addImage(spectrum.sourceKey());
+        key.add(filter_type);
+        key.add(radius);
+        key.add(out);
+        key.add(single_channel);
+        if (key.cacheable()) {
+            cache_key = key.str();
+            py::object hit = ResultCache::lookup(cache_key);
+            if (!hit.is_none()) {
+                return py::reinterpret_borrow<py::array_t<unsigned char>>(hit);
+            }
+        }
+    }
+
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = single ? spectrum.applyGray(filter_type, radius, out_mat) : spectrum.apply(filter_type, radius, out_mat);
+    }
+    py::array_t<unsigned char> result = result_to_numpy(res, out, out_mat);
+    if (!cache_key.empty()) {
+        ResultCache::insertArray(cache_key, result);
+    }
+    return result;
+}
+
+// Registers backend.Spectrum on the given module (shared by the standalone and combined modules)
+inline void bind_spectrum(py::module_& m) {
+    py::class_<Spectrum, std::shared_ptr<Spectrum>>(m, "Spectrum", "Cached forward DFT of an image for repeated low/high-pass filtering")
+        .def(py::init(profiled("Spectrum", &spectrum_init_wrapper)), py::arg("image"))
+        .def("apply", profiled("Spectrum.apply", &spectrum_apply_wrapper), "Apply a Low-pass or High-pass filter at the given radius",
+             py::arg("filter_type"), py::arg("radius"), py::arg("out") = py::none(),
+             py::arg("single_channel") = py::none())
+        .def_property_readonly("shape", [](const Spectrum& s) {
+            return py::make_tuple(s.originalSize().height, s.originalSize().width);
+        })
+        .def_property_readonly("padded_shape", [](const Spectrum& s) {
+            return py::make_tuple(s.paddedSize().height, s.paddedSize().width);
+        });
 }
 
 #ifndef MAIN_BIND
 PYBIND11_MODULE(freq_backend, m) {
     m.doc() = "Frequency domain filtering C++ backend";
     m.def("apply_fft", &apply_fft_wrapper, "Apply Low-pass or High-pass FFT filter",
-          py::arg("image"), py::arg("filter_type"), py::arg("radius"));
+          py::arg("image"), py::arg("filter_type"), py::arg("radius"), py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none());
+    bind_spectrum(m);
 }
 #endif
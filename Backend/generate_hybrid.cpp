@@ -1,59 +1,232 @@
 #include "binding_utils.h"
+#include <pybind11/stl.h>
+#include <memory>
+#include <mutex>
+#include <vector>
 
 #define MAIN_BIND
 #include "frequency_filters.cpp"
 
 namespace py = pybind11;
 
+// Both halves come from the grayscale spectra, so the hybrid is built on one plane and only
+// expanded to BGR (three identical planes) at the end unless a single-channel result is requested.
 class HybridGenerator {
 public:
+    // Low-pass half of the hybrid, as float so it can be summed without overflow
+    static cv::Mat lowComponent(const Spectrum& spectrum_a, int radius_a) {
+        cv::Mat low_float;
+        spectrum_a.applyGray("low_pass", radius_a).convertTo(low_float, CV_32F);
+        return low_float;
+    }
+
+    // High-pass half of the hybrid, re-centred around 0
+    static cv::Mat highComponent(const Spectrum& spectrum_b, int radius_b) {
+        cv::Mat high_float;
+        spectrum_b.applyGray("high_pass", radius_b).convertTo(high_float, CV_32F);
+
+        // 'applyFFTFilter' normalizes its output to [0, 255], which gives the high-pass image
+        // an artificial DC offset (mean around ~128). We must subtract this mean so that
+        // the high-pass details are centered around 0 before adding to the low-pass image.
+        cv::Scalar mean_val = cv::mean(high_float);
+        high_float -= mean_val;
+        return high_float;
+    }
+
+    // Combine both halves into the final 8-bit hybrid (BGR, or one plane with `single_channel`)
+    static cv::Mat combine(const cv::Mat& low_float, const cv::Mat& high_float, bool single_channel = false,
+                           cv::Mat dst = cv::Mat()) {
+        cv::Mat hybrid_float = low_float + high_float;
+        if (single_channel) {
+            hybrid_float.convertTo(dst, CV_8U); // This automatically saturates above 255 and below 0
+            return dst;
+        }
+        cv::Mat hybrid;
+        hybrid_float.convertTo(hybrid, CV_8U);
+        return IntensityDataInfo::grayToBGR(hybrid, dst);
+    }
+
     // Make the Hybrid Image
-    static cv::Mat createHybridImage(const cv::Mat& img_a, const cv::Mat& img_b, int radius_a, int radius_b) {
+    // `dst` may wrap a preallocated output buffer; it is written in place when its size/type match.
+    static cv::Mat createHybridImage(const cv::Mat& img_a, const cv::Mat& img_b, int radius_a, int radius_b,
+                                     bool single_channel = false, cv::Mat dst = cv::Mat()) {
         cv::Mat b_resized;
-        
-        // Ensure images are the same size
+
+        // Ensure images are the same size (no copy needed when they already match)
         if (img_a.size() != img_b.size()) {
             cv::resize(img_b, b_resized, img_a.size());
         } else {
-            b_resized = img_b.clone();
+            b_resized = img_b;
         }
 
         // Apply Low-pass to Image A and High-pass to Image B
-        cv::Mat low_pass_a = FrequencyFilters::applyFFTFilter(img_a, "low_pass", radius_a);
-        cv::Mat high_pass_b = FrequencyFilters::applyFFTFilter(b_resized, "high_pass", radius_b);
+        cv::Mat low_float = lowComponent(Spectrum(img_a), radius_a);
+        cv::Mat high_float = highComponent(Spectrum(b_resized), radius_b);
 
-        // Convert to float to avoid overflow/underflow during subtraction and addition
-        cv::Mat low_float, high_float;
-        low_pass_a.convertTo(low_float, CV_32F);
-        high_pass_b.convertTo(high_float, CV_32F);
+        return combine(low_float, high_float, single_channel, dst);
+    }
+};
 
-        // 'applyFFTFilter' normalizes its output to [0, 255], which gives the high-pass image
-        // an artificial DC offset (mean around ~128). We must subtract this mean so that
-        // the high-pass details are centered around 0 before adding to the low-pass image.
-        cv::Scalar mean_val = cv::mean(high_float);
-        high_float -= mean_val;
+// Hybrid of two fixed images. The forward spectra of A and B are computed once; the most recent
+// low-pass / high-pass halves are kept so moving one cutoff only redoes that image's mask + IDFT.
+class HybridEngine {
+public:
+    HybridEngine(const cv::Mat& img_a, const cv::Mat& img_b) {
+        cv::Mat b_resized;
+        if (img_a.size() != img_b.size()) {
+            cv::resize(img_b, b_resized, img_a.size());
+        } else {
+            b_resized = img_b;
+        }
+        spectrum_a_ = std::make_shared<const Spectrum>(img_a);
+        spectrum_b_ = std::make_shared<const Spectrum>(b_resized);
+    }
 
-        // Combine them
-        cv::Mat hybrid_float = low_float + high_float;
-        
-        cv::Mat hybrid;
-        hybrid_float.convertTo(hybrid, CV_8U); // This automatically saturates above 255 and below 0
-        
-        return hybrid;
+    // Reuse spectra the caller already holds (they must describe images of the same size)
+    HybridEngine(std::shared_ptr<const Spectrum> spectrum_a, std::shared_ptr<const Spectrum> spectrum_b)
+        : spectrum_a_(std::move(spectrum_a)), spectrum_b_(std::move(spectrum_b)) {}
+
+    cv::Size size() const { return spectrum_a_->originalSize(); }
+
+    cv::Mat render(int radius_a, int radius_b, bool single_channel = false, cv::Mat dst = cv::Mat()) const {
+        return HybridGenerator::combine(low(radius_a), high(radius_b), single_channel, dst);
+    }
+
+    // Render every (radius_a, radius_b) pair into `out`, laid out as (len(radii_a), len(radii_b), H, W, 3),
+    // or (len(radii_a), len(radii_b), H, W) with `single_channel`.
+    // Each distinct half is computed once and the pairs are combined in parallel.
+    void sweep(const std::vector<int>& radii_a, const std::vector<int>& radii_b, bool single_channel, uchar* out) const {
+        std::vector<cv::Mat> lows(radii_a.size());
+        std::vector<cv::Mat> highs(radii_b.size());
+
+        cv::parallel_for_(cv::Range(0, static_cast<int>(radii_a.size())), [&](const cv::Range& r) {
+            for (int i = r.start; i < r.end; ++i) lows[i] = HybridGenerator::lowComponent(*spectrum_a_, radii_a[i]);
+        });
+        cv::parallel_for_(cv::Range(0, static_cast<int>(radii_b.size())), [&](const cv::Range& r) {
+            for (int j = r.start; j < r.end; ++j) highs[j] = HybridGenerator::highComponent(*spectrum_b_, radii_b[j]);
+        });
+
+        cv::Size sz = size();
+        int channels = single_channel ? 1 : 3;
+        size_t frame_bytes = static_cast<size_t>(sz.area()) * channels;
+        int pairs = static_cast<int>(radii_a.size() * radii_b.size());
+        cv::parallel_for_(cv::Range(0, pairs), [&](const cv::Range& r) {
+            for (int k = r.start; k < r.end; ++k) {
+                size_t i = k / radii_b.size();
+                size_t j = k % radii_b.size();
+                cv::Mat frame(sz, CV_8UC(channels), out + k * frame_bytes);
+                HybridGenerator::combine(lows[i], highs[j], single_channel, frame);
+            }
+        });
+    }
+
+private:
+    cv::Mat low(int radius_a) const {
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (radius_a != low_radius_) {
+            low_ = HybridGenerator::lowComponent(*spectrum_a_, radius_a);
+            low_radius_ = radius_a;
+        }
+        return low_;
+    }
+
+    cv::Mat high(int radius_b) const {
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (radius_b != high_radius_) {
+            high_ = HybridGenerator::highComponent(*spectrum_b_, radius_b);
+            high_radius_ = radius_b;
+        }
+        return high_;
     }
+
+    std::shared_ptr<const Spectrum> spectrum_a_;
+    std::shared_ptr<const Spectrum> spectrum_b_;
+
+    mutable std::mutex mutex_;
+    mutable int low_radius_ = -1;
+    mutable int high_radius_ = -1;
+    mutable cv::Mat low_;
+    mutable cv::Mat high_;
 };
 
-py::array_t<unsigned char> create_hybrid_wrapper(py::array_t<unsigned char> img_a, py::array_t<unsigned char> img_b, int radius_a, int radius_b) {
+py::array_t<unsigned char> create_hybrid_wrapper(py::array_t<unsigned char> img_a, py::array_t<unsigned char> img_b, int radius_a, int radius_b,
+                                                 py::object out, py::object single_channel) {
     auto mat_a = numpy_to_mat(img_a);
     auto mat_b = numpy_to_mat(img_b);
-    auto res = HybridGenerator::createHybridImage(mat_a, mat_b, radius_a, radius_b);
-    return mat_to_numpy(res);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = HybridGenerator::createHybridImage(mat_a, mat_b, radius_a, radius_b, single, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+std::shared_ptr<HybridEngine> hybrid_engine_from_images(py::array_t<unsigned char> img_a, py::array_t<unsigned char> img_b) {
+    auto mat_a = numpy_to_mat(img_a);
+    auto mat_b = numpy_to_mat(img_b);
+    py::gil_scoped_release release;
+    return std::make_shared<HybridEngine>(mat_a, mat_b);
+}
+
+std::shared_ptr<HybridEngine> hybrid_engine_from_spectra(std::shared_ptr<Spectrum> spectrum_a, std::shared_ptr<Spectrum> spectrum_b) {
+    if (spectrum_a->originalSize() != spectrum_b->originalSize()) {
+        throw py::value_error("Both spectra must come from images of the same size");
+    }
+    return std::make_shared<HybridEngine>(spectrum_a, spectrum_b);
+}
+
+py::array_t<unsigned char> hybrid_render_wrapper(const HybridEngine& engine, int radius_a, int radius_b, py::object out,
+                                                 py::object single_channel) {
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = engine.render(radius_a, radius_b, single, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+py::array_t<unsigned char> hybrid_sweep_wrapper(const HybridEngine& engine, const std::vector<int>& radii_a, const std::vector<int>& radii_b,
+                                                py::object single_channel) {
+    cv::Size sz = engine.size();
+    bool single = resolve_single_channel(single_channel);
+    std::vector<py::ssize_t> shape = { static_cast<py::ssize_t>(radii_a.size()), static_cast<py::ssize_t>(radii_b.size()),
+                                       static_cast<py::ssize_t>(sz.height), static_cast<py::ssize_t>(sz.width) };
+    if (!single) {
+        shape.push_back(3);
+    }
+    py::array_t<unsigned char> result(shape);
+    unsigned char* ptr = result.mutable_data();
+    {
+        py::gil_scoped_release release;
+        engine.sweep(radii_a, radii_b, single, ptr);
+    }
+    return result;
+}
+
+// Registers backend.HybridEngine on the given module (backend.Spectrum must be registered too)
+inline void bind_hybrid_engine(py::module_& m) {
+    py::class_<HybridEngine, std::shared_ptr<HybridEngine>>(m, "HybridEngine",
+                                                            "Hybrid image generator that caches the spectra of both inputs")
+        .def(py::init(profiled("HybridEngine", &hybrid_engine_from_images)), py::arg("img_a"), py::arg("img_b"))
+        .def(py::init(profiled("HybridEngine", &hybrid_engine_from_spectra)), py::arg("spectrum_a"), py::arg("spectrum_b"))
+        .def("render", profiled("HybridEngine.render", &hybrid_render_wrapper), "Render the hybrid for one pair of cutoff radii",
+             py::arg("radius_a"), py::arg("radius_b"), py::arg("out") = py::none(), py::arg("single_channel") = py::none())
+        .def("sweep", profiled("HybridEngine.sweep", &hybrid_sweep_wrapper), "Render hybrids for every (radius_a, radius_b) pair in parallel; "
+             "returns an array of shape (len(radii_a), len(radii_b), H, W, 3), or (..., H, W) when single-channel",
+             py::arg("radii_a"), py::arg("radii_b"), py::arg("single_channel") = py::none());
 }
 
 #ifndef MAIN_BIND
 PYBIND11_MODULE(hybrid_backend, m) {
     m.doc() = "Hybrid Image generation C++ backend";
     m.def("create_hybrid", &create_hybrid_wrapper, "Create hybrid image from two inputs",
-          py::arg("img_a"), py::arg("img_b"), py::arg("radius_a"), py::arg("radius_b"));
+          py::arg("img_a"), py::arg("img_b"), py::arg("radius_a"), py::arg("radius_b"), py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none());
+    bind_spectrum(m);
+    bind_hybrid_engine(m);
 }
 #endif
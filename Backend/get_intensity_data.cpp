@@ -1,80 +1,211 @@
+#pragma once
 #include "binding_utils.h"
 #include "intensity_data_info.h"
+#include <pybind11/stl.h>
 #include <vector>
+#include <list>
+#include <tuple>
+#include <mutex>
+#include <memory>
+#include <cmath>
+#include <algorithm>
 
 namespace py = pybind11;
 
+// Histogram-derived statistics of an 8-bit image. Only the histogram touches the pixels;
+// the CDF, extrema, moments and percentiles are all read off it in O(256) per channel.
+struct ImageStats {
+    cv::Mat histogram;              // (channels x 256) CV_32S counts
+    cv::Mat cdf;                    // (channels x 256) CV_32S running sum of `histogram`
+    std::vector<int> min, max;      // per channel, -1 when there are no samples
+    std::vector<double> mean, stddev;  // per channel (population standard deviation)
+    long long count = 0;            // samples per channel
+    int stride = 1;
 
+    static ImageStats compute(const cv::Mat& image, int stride) {
+        ImageStats stats;
+        stats.stride = stride;
+        IntensityDataInfo::computeHistogram(image, stats.histogram, stride);
+        stats.histogram.copyTo(stats.cdf);
+
+        int channels = stats.histogram.rows;
+        stats.min.assign(channels, -1);
+        stats.max.assign(channels, -1);
+        stats.mean.assign(channels, 0.0);
+        stats.stddev.assign(channels, 0.0);
+        stats.count = static_cast<long long>((image.rows + stride - 1) / stride) * ((image.cols + stride - 1) / stride);
+
+        for (int c = 0; c < channels; ++c) {
+            const int* h = stats.histogram.ptr<int>(c);
+            int* cdf = stats.cdf.ptr<int>(c);
+            double sum = 0, sum_sq = 0;
+            for (int v = 0; v < 256; ++v) {
+                if (v > 0) cdf[v] += cdf[v - 1];
+                if (h[v] == 0) continue;
+                if (stats.min[c] < 0) stats.min[c] = v;
+                stats.max[c] = v;
+                sum += static_cast<double>(h[v]) * v;
+                sum_sq += static_cast<double>(h[v]) * v * v;
+            }
+            if (stats.count > 0) {
+                stats.mean[c] = sum / stats.count;
+                stats.stddev[c] = std::sqrt(std::max(0.0, sum_sq / stats.count - stats.mean[c] * stats.mean[c]));
+            }
+        }
+        return stats;
+    }
+
+    // Nearest-rank percentile: the smallest level whose CDF reaches q% of the samples (-1 when empty)
+    int percentile(int channel, double q) const {
+        if (count == 0) return -1;
+        double rank = std::max(1.0, std::ceil(std::min(std::max(q, 0.0), 100.0) / 100.0 * count));
+        const int* cdf_ptr = cdf.ptr<int>(channel);
+        return static_cast<int>(std::lower_bound(cdf_ptr, cdf_ptr + 256, rank) - cdf_ptr);
+    }
+};
+
+// Recently computed stats, keyed by the array object they came from (held weakly, so a dead array
+// can never be confused with a new one at the same address) and the sampling stride.
+// Cached arrays are assumed not to be modified in place; pass use_cache=False for such buffers.
+// Only touched with the GIL held, and never freed so no Python object outlives the interpreter.
+using StatsCacheEntry = std::tuple<py::weakref, int, std::shared_ptr<const ImageStats>>;
+static const size_t kStatsCacheCapacity = 8;
+
+static std::list<StatsCacheEntry>& statsCache() {
+    static auto* cache = new std::list<StatsCacheEntry>();
+    return *cache;
+}
+
+static std::shared_ptr<const ImageStats> lookupStats(const py::handle& img, int stride) {
+    auto& cache = statsCache();
+    for (auto it = cache.begin(); it != cache.end();) {
+        py::object target = std::get<0>(*it)();
+        if (target.is_none()) {
+            it = cache.erase(it); // the array is gone
+            continue;
+        }
+        if (target.is(img) && std::get<1>(*it) == stride) {
+            cache.splice(cache.begin(), cache, it);
+            return std::get<2>(cache.front());
+        }
+        ++it;
+    }
+    return nullptr;
+}
+
+static void storeStats(const py::handle& img, int stride, std::shared_ptr<const ImageStats> stats) {
+    auto& cache = statsCache();
+    cache.emplace_front(py::weakref(img), stride, std::move(stats));
+    if (cache.size() > kStatsCacheCapacity) {
+        cache.pop_back();
+    }
+}
 
 // Pybind11 Wrappers
 
-py::array_t<unsigned char> to_grayscale_wrapper(py::array_t<unsigned char> img) {
+py::array_t<unsigned char> to_grayscale_wrapper(py::array_t<unsigned char> img, py::object out) {
     auto mat = numpy_to_mat(img);
-    auto res = IntensityDataInfo::convertToGrayscale(mat);
-    return mat_to_numpy(res);
+    auto out_mat = out_to_mat(out);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = IntensityDataInfo::convertToGrayscale(mat, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
 }
 
 // Calculate Histogram and return as numpy array of shape (channels, 256)
-py::array_t<int> histogram_wrapper(py::array_t<unsigned char> img) {
+py::array_t<int> histogram_wrapper(py::array_t<unsigned char> img, py::object out) {
     auto mat = numpy_to_mat(img);
-    int channels = mat.channels();
-    
-    py::array_t<int> result({channels, 256});
-    py::buffer_info buf = result.request();
-    int* ptr = static_cast<int*>(buf.ptr);
-    
-    // Initialize to 0
-    std::fill(ptr, ptr + (channels * 256), 0);
+    auto out_mat = out_to_mat<int>(out);
+    cv::Mat res = out_mat;
+    {
+        py::gil_scoped_release release;
+        IntensityDataInfo::computeHistogram(mat, res);
+    }
     
-    if (channels == 3) {
-        for (int y = 0; y < mat.rows; ++y) {
-            const cv::Vec3b* src_ptr = mat.ptr<cv::Vec3b>(y);
-            for (int x = 0; x < mat.cols; ++x) {
-                ptr[0 * 256 + src_ptr[x][0]]++;
-                ptr[1 * 256 + src_ptr[x][1]]++;
-                ptr[2 * 256 + src_ptr[x][2]]++;
-            }
-        }
-    } else {
-        for (int y = 0; y < mat.rows; ++y) {
-            const uchar* src_ptr = mat.ptr<uchar>(y);
-            for (int x = 0; x < mat.cols; ++x) {
-                ptr[src_ptr[x]]++;
+    return result_to_numpy<int>(res, out, out_mat);
+}
+
+// Calculate CDF based on the calculated histogram
+py::array_t<int> cdf_wrapper(py::array_t<unsigned char> img, py::object out) {
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat<int>(out);
+    cv::Mat res = out_mat;
+    {
+        py::gil_scoped_release release;
+
+        // Generate the histogram first, then accumulate it in place
+        IntensityDataInfo::computeHistogram(mat, res);
+        for (int c = 0; c < res.rows; ++c) {
+            int* ptr = res.ptr<int>(c);
+            for (int i = 1; i < 256; ++i) {
+                ptr[i] += ptr[i - 1];
             }
         }
     }
     
-    return result;
+    return result_to_numpy<int>(res, out, out_mat);
 }
 
-// Calculate CDF based on the calculated histogram
-py::array_t<int> cdf_wrapper(py::array_t<unsigned char> img) {
-    // Generate the histogram first
-    py::array_t<int> hist = histogram_wrapper(img);
-    py::buffer_info hist_buf = hist.request();
-    int* hist_ptr = static_cast<int*>(hist_buf.ptr);
-    
-    int channels = hist.shape(0);
-    
-    py::array_t<int> result({channels, 256});
-    py::buffer_info res_buf = result.request();
-    int* res_ptr = static_cast<int*>(res_buf.ptr);
-    
+// Histogram, CDF, extrema, moments and percentiles in one pass, cached per input array
+py::dict image_stats_wrapper(py::array_t<unsigned char> img, int stride, const std::vector<double>& percentiles, bool use_cache) {
+    if (stride < 1) {
+        throw py::value_error("`stride` must be >= 1");
+    }
+
+    std::shared_ptr<const ImageStats> stats = use_cache ? lookupStats(img, stride) : nullptr;
+    if (!stats) {
+        auto mat = numpy_to_mat(img);
+        {
+            py::gil_scoped_release release;
+            stats = std::make_shared<const ImageStats>(ImageStats::compute(mat, stride));
+        }
+        if (use_cache) {
+            storeStats(img, stride, stats);
+        }
+    }
+
+    int channels = stats->histogram.rows;
+    py::array_t<int> percentile_values({ static_cast<py::ssize_t>(channels), static_cast<py::ssize_t>(percentiles.size()) });
+    auto pv = percentile_values.mutable_unchecked<2>();
     for (int c = 0; c < channels; ++c) {
-        res_ptr[c * 256 + 0] = hist_ptr[c * 256 + 0];
-        for (int i = 1; i < 256; ++i) {
-            res_ptr[c * 256 + i] = res_ptr[c * 256 + i - 1] + hist_ptr[c * 256 + i];
+        for (size_t i = 0; i < percentiles.size(); ++i) {
+            pv(c, i) = stats->percentile(c, percentiles[i]);
         }
     }
-    
+
+    // Small per-call copies, so callers can never modify the cached stats
+    py::dict result;
+    result["histogram"] = mat_to_numpy<int>(stats->histogram.clone());
+    result["cdf"] = mat_to_numpy<int>(stats->cdf.clone());
+    result["min"] = py::array_t<int>(stats->min.size(), stats->min.data());
+    result["max"] = py::array_t<int>(stats->max.size(), stats->max.data());
+    result["mean"] = py::array_t<double>(stats->mean.size(), stats->mean.data());
+    result["std"] = py::array_t<double>(stats->stddev.size(), stats->stddev.data());
+    result["percentiles"] = percentile_values;
+    result["percentile_levels"] = py::array_t<double>(percentiles.size(), percentiles.data());
+    result["count"] = stats->count;
+    result["stride"] = stats->stride;
     return result;
 }
 
+void clear_stats_cache_wrapper() {
+    statsCache().clear();
+}
+
 #ifndef MAIN_BIND
 PYBIND11_MODULE(intensity_backend, m) {
     m.doc() = "Intensity data extraction C++ backend for Histogram and CDF";
-    m.def("to_grayscale", &to_grayscale_wrapper, "Convert image to grayscale");
-    m.def("calculate_histogram", &histogram_wrapper, "Calculate 256-bin histogram for each channel");
-    m.def("calculate_cdf", &cdf_wrapper, "Calculate Cumulative Distribution Function for each channel");
+    m.def("to_grayscale", &to_grayscale_wrapper, "Convert image to grayscale",
+          py::arg("image"), py::arg("out") = py::none());
+    m.def("calculate_histogram", &histogram_wrapper, "Calculate 256-bin histogram for each channel",
+          py::arg("image"), py::arg("out") = py::none());
+    m.def("calculate_cdf", &cdf_wrapper, "Calculate Cumulative Distribution Function for each channel",
+          py::arg("image"), py::arg("out") = py::none());
+    m.def("image_stats", &image_stats_wrapper, "Histogram, CDF, min/max, mean/std and percentiles per channel in one pass",
+          py::arg("image"), py::arg("stride") = 1, py::arg("percentiles") = std::vector<double>{ 1, 5, 25, 50, 75, 95, 99 },
+          py::arg("use_cache") = true);
+    m.def("clear_stats_cache", &clear_stats_cache_wrapper, "Drop all cached image_stats results");
 }
 #endif
@@ -1,17 +1,104 @@
 #pragma once
 #include <opencv2/opencv.hpp>
+#include <vector>
+#include <mutex>
+#include <algorithm>
+#include "profiler.h"
 
 class IntensityDataInfo {
+private:
+    // Images below this many samples are histogrammed on the calling thread only
+    static constexpr double kParallelHistogramMinSamples = 1 << 18;
+
+    // Add every `stride`-th pixel of one row to a (channels x 256) histogram laid out contiguously
+    static inline void accumulateRow(const uchar* src, int cols, int channels, int stride, int* hist) {
+        int step = channels * stride;
+        if (channels == 1) {
+            for (int x = 0; x < cols; ++x) {
+                hist[src[x * step]]++;
+            }
+        } else if (channels == 3) {
+            int* h0 = hist;
+            int* h1 = hist + 256;
+            int* h2 = hist + 512;
+            for (int x = 0; x < cols; ++x) {
+                const uchar* px = src + x * step;
+                h0[px[0]]++;
+                h1[px[1]]++;
+                h2[px[2]]++;
+            }
+        } else {
+            for (int x = 0; x < cols; ++x) {
+                const uchar* px = src + x * step;
+                for (int c = 0; c < channels; ++c) {
+                    hist[c * 256 + px[c]]++;
+                }
+            }
+        }
+    }
+
 public:
     // 1. Grayscale Conversion
-    static cv::Mat convertToGrayscale(const cv::Mat& image) {
+    // `dst` may wrap a preallocated output buffer; it is written in place when its size/type match.
+    static cv::Mat convertToGrayscale(const cv::Mat& image, cv::Mat dst = cv::Mat()) {
+        ProfileStage stage("to_gray");
         if (image.channels() == 3) {
-            cv::Mat gray;
             // Note: Depending on frontend (RGB vs BGR representation in NumPy), we might need COLOR_RGB2GRAY
             // Assuming default OpenCV BGR order for CV_8UC3 internally. If rgb, result is visually identical for grayscale.
-            cv::cvtColor(image, gray, cv::COLOR_BGR2GRAY);
-            return gray;
+            cv::cvtColor(image, dst, cv::COLOR_BGR2GRAY);
+            return dst;
+        }
+        image.copyTo(dst); // Already grayscale
+        return dst;
+    }
+
+    // Grayscale view for single-channel cores: a 1-channel input is returned as-is (no copy)
+    static cv::Mat grayView(const cv::Mat& image) {
+        return image.channels() == 1 ? image : convertToGrayscale(image);
+    }
+
+    // Expand a grayscale result to 3 identical BGR planes for display
+    static cv::Mat grayToBGR(const cv::Mat& gray, cv::Mat dst = cv::Mat()) {
+        ProfileStage stage("to_bgr");
+        cv::cvtColor(gray, dst, cv::COLOR_GRAY2BGR);
+        return dst;
+    }
+
+    // 2. Histogram
+    // Fill a (channels x 256) CV_32S Mat with per-channel histogram counts of every `stride`-th row and column.
+    // Row bands are counted in parallel into private partial histograms that are merged once per band.
+    // Pure C++ (no Python objects touched) so it can run with the GIL released.
+    static void computeHistogram(const cv::Mat& mat, cv::Mat& hist, int stride = 1) {
+        int channels = mat.channels();
+
+        // Initialize to 0 (reuses `hist` when it already wraps a buffer of the right shape)
+        hist.create(channels, 256, CV_32S);
+        hist.setTo(0);
+
+        int rows = (mat.rows + stride - 1) / stride;
+        int cols = (mat.cols + stride - 1) / stride;
+        if (rows == 0 || cols == 0) {
+            return;
         }
-        return image.clone(); // Already grayscale
+
+        double samples = static_cast<double>(rows) * cols;
+        double stripes = samples < kParallelHistogramMinSamples ? 1 : std::min(rows, 4 * cv::getNumThreads());
+
+        std::mutex merge_mutex;
+        cv::parallel_for_(cv::Range(0, rows), [&](const cv::Range& r) {
+            std::vector<int> partial(channels * 256, 0);
+            for (int i = r.start; i < r.end; ++i) {
+                accumulateRow(mat.ptr<uchar>(i * stride), cols, channels, stride, partial.data());
+            }
+
+            std::lock_guard<std::mutex> lock(merge_mutex);
+            for (int c = 0; c < channels; ++c) {
+                int* dst = hist.ptr<int>(c);
+                const int* src = partial.data() + c * 256;
+                for (int v = 0; v < 256; ++v) {
+                    dst[v] += src[v];
+                }
+            }
+        }, stripes);
     }
 };
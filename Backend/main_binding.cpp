@@ -1,4 +1,5 @@
 #include "binding_utils.h"
+#include "result_cache.h"
 #include "get_intensity_data.cpp"
 #include "adding_noise.cpp"
 #include "filter_noise.cpp"
@@ -6,38 +7,142 @@
 #include "enhance_image.cpp"
 #include "frequency_filters.cpp"
 #include "generate_hybrid.cpp"
+#include "pipeline.cpp"
+#include "batch.cpp"
 
 namespace py = pybind11;
 
 PYBIND11_MODULE(backend, m) {
-    m.doc() = "Computer Vision Assignment 1 C++ Backend Module";
+    m.doc() = "Computer Vision Assignment 1 C++ Backend Module\n\n"
+              "Thread safety: every function releases the GIL while it processes pixels, and the only shared state\n"
+              "(internal caches) is lock-protected, so concurrent calls from Python threads run in parallel.\n"
+              "Calls may share the same input array as long as no thread writes to it during the call.";
+
+    // Every function accepts an optional preallocated `out=` array (same shape and dtype as the result).
+    // When given, the result is written into it and `out` is returned; otherwise a new array is returned
+    // that takes ownership of the C++ result buffer without copying. Inputs may be any strided view.
+
+    // Ops whose result is grayscale (edges, equalize, normalize, FFT filters, hybrids, pipelines) return BGR
+    // with three identical planes by default. `single_channel=True` returns the (H, W) plane instead, skipping
+    // the expansion and its 3x memory; `single_channel=None` follows the module-wide default below.
+    m.def("set_single_channel_output", [](bool enabled) { single_channel_default() = enabled; },
+          "Set the module-wide default for `single_channel` (initially False)", py::arg("enabled"));
+    m.def("get_single_channel_output", []() { return single_channel_default().load(); },
+          "Return the module-wide default for `single_channel`");
 
     // 1. Image I/O & Core Handling
-    m.def("to_grayscale", &to_grayscale_wrapper, "Convert image to grayscale");
-    m.def("calculate_histogram", &histogram_wrapper, "Calculate 256-bin histogram for each channel");
-    m.def("calculate_cdf", &cdf_wrapper, "Calculate Cumulative Distribution Function for each channel");
+    m.def("to_grayscale", profiled("to_grayscale", &to_grayscale_wrapper), "Convert image to grayscale",
+          py::arg("image"), py::arg("out") = py::none());
+    m.def("calculate_histogram", profiled("calculate_histogram", &histogram_wrapper), "Calculate 256-bin histogram for each channel",
+          py::arg("image"), py::arg("out") = py::none());
+    m.def("calculate_cdf", profiled("calculate_cdf", &cdf_wrapper), "Calculate Cumulative Distribution Function for each channel",
+          py::arg("image"), py::arg("out") = py::none());
+    // Returns a dict: 'histogram' and 'cdf' (channels x 256), per-channel 'min', 'max', 'mean', 'std',
+    // 'percentiles' (channels x len(percentiles), nearest rank), 'percentile_levels', 'count' and 'stride'.
+    // stride > 1 samples every stride-th row and column. Results are cached per array object (arrays are
+    // assumed not to be modified in place; pass use_cache=False otherwise).
+    m.def("image_stats", profiled("image_stats", &image_stats_wrapper), "Histogram, CDF, min/max, mean/std and percentiles per channel in one pass",
+          py::arg("image"), py::arg("stride") = 1, py::arg("percentiles") = std::vector<double>{ 1, 5, 25, 50, 75, 95, 99 },
+          py::arg("use_cache") = true);
+    m.def("clear_stats_cache", profiled("clear_stats_cache", &clear_stats_cache_wrapper), "Drop all cached image_stats results");
 
     // 2. Additive Noise
-    m.def("add_noise", &add_noise_wrapper, "Add noise to an image dynamically based on type and intensity",
-          py::arg("image"), py::arg("noise_type"), py::arg("intensity"));
+    // Noise is reproducible from `seed` (independent of the thread count); seed=None draws a fresh one.
+    // Passing the input itself as `out` adds the noise in place.
+    m.def("add_noise", profiled("add_noise", &add_noise_wrapper), "Add noise to an image dynamically based on type and intensity",
+          py::arg("image"), py::arg("noise_type"), py::arg("intensity"), py::arg("out") = py::none(),
+          py::arg("seed") = py::none());
 
     // 3. Spatial Domain Filtering
-    m.def("apply_filter", &apply_filter_wrapper, "Apply spatial filters based on type and kernel size",
+    // Average/Gaussian run with OpenCV's running sums or separable passes (method="auto"), or with FFT convolution
+    // when method="fft" asks for it; plan_filter reports the choice and whether FFT would be faster.
+    // calibrate_filter_planner measures the local machine once and can persist the fit for load_filter_planner.
+    m.def("apply_filter", profiled("apply_filter", &apply_filter_wrapper),
+          "Apply spatial filters based on type and kernel size. method=\"auto\" only uses methods whose output equals "
+          "OpenCV's, so results are the same on every machine. method=\"fft\" opts in to FFT convolution, faster for "
+          "very large Average/Gaussian kernels but up to 2 levels off the OpenCV result",
+          py::arg("image"), py::arg("filter_type"), py::arg("kernel_size"), py::arg("out") = py::none(),
+          py::arg("method") = "auto");
+    m.def("plan_filter", profiled("plan_filter", &plan_filter_wrapper), "Method apply_filter(method=\"auto\") runs, the fastest method overall, and estimated costs",
           py::arg("image"), py::arg("filter_type"), py::arg("kernel_size"));
+    m.def("calibrate_filter_planner", profiled("calibrate_filter_planner", &calibrate_filter_planner_wrapper), "Benchmark filter methods and fit the planner",
+          py::arg("path") = "");
+    m.def("load_filter_planner", profiled("load_filter_planner", &load_filter_planner_wrapper), "Load a persisted filter planner calibration",
+          py::arg("path"));
+    m.def("get_filter_planner", profiled("get_filter_planner", &get_filter_planner_wrapper), "Active filter planner cost model and crossover points");
 
     // 4. Edge Detection
-    m.def("canny", &canny_wrapper, "Apply Canny edge detection");
-    m.def("sobel", &sobel_wrapper, "Apply Sobel edge detection");
-    m.def("prewitt", &prewitt_wrapper, "Apply Prewitt edge detection");
-    m.def("roberts", &roberts_wrapper, "Apply Roberts edge detection");
+    m.def("canny", profiled("canny", memoized("canny", &canny_wrapper)), "Apply Canny edge detection",
+          py::arg("image"), py::arg("threshold1") = 100.0, py::arg("threshold2") = 200.0, py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none());
+    m.def("sobel", profiled("sobel", memoized("sobel", &sobel_wrapper)), "Apply Sobel edge detection",
+          py::arg("image"), py::arg("ksize") = 3, py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("prewitt", profiled("prewitt", memoized("prewitt", &prewitt_wrapper)), "Apply Prewitt edge detection",
+          py::arg("image"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("roberts", profiled("roberts", memoized("roberts", &roberts_wrapper)), "Apply Roberts edge detection",
+          py::arg("image"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    // Float32 fields for feature extraction: a dict with the requested subset of gx, gy, magnitude and orientation
+    m.def("gradients", profiled("gradients", &gradients_wrapper),
+          "Float32 gx, gy, magnitude and/or orientation of an edge operator in one pass",
+          py::arg("image"), py::arg("operator") = "sobel", py::arg("ksize") = 3,
+          py::arg("outputs") = std::vector<std::string>{ "gx", "gy", "magnitude", "orientation" },
+          py::arg("l1") = false, py::arg("degrees") = false, py::arg("out") = py::none());
+    // CannyState(image) keeps the gradients and non-maximum suppression of one image: apply(threshold1, threshold2)
+    // only re-runs the hysteresis, and sweep(thresholds1, thresholds2) returns the edge maps of a whole grid.
+    bind_canny_state(m);
 
     // 5. Contrast Enhancement & Histograms
-    m.def("equalize", &equalize_wrapper, "Apply Histogram Equalization");
-    m.def("normalize", &normalize_wrapper, "Apply Image Normalization");
+    m.def("equalize", profiled("equalize", memoized("equalize", &equalize_wrapper)), "Apply Histogram Equalization",
+          py::arg("image"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    m.def("normalize", profiled("normalize", memoized("normalize", &normalize_wrapper)), "Apply Image Normalization",
+          py::arg("image"), py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    // Tiled adaptive equalization (tile_grid = (columns, rows)). preserve_color=True equalizes only the
+    // luminance of a color image and keeps its chroma; otherwise the result is grayscale like equalize.
+    m.def("clahe", profiled("clahe", memoized("clahe", &clahe_wrapper)), "Apply Contrast Limited Adaptive Histogram Equalization",
+          py::arg("image"), py::arg("clip_limit") = 2.0, py::arg("tile_grid") = std::make_pair(8, 8),
+          py::arg("preserve_color") = false, py::arg("out") = py::none(), py::arg("single_channel") = py::none());
+    // Point operations: each is a 256-entry LUT applied to every channel; chains of them (and of
+    // equalize/normalize) collapse into a single LUT pass inside a Pipeline.
+    m.def("gamma", profiled("gamma", &gamma_wrapper), "Apply gamma correction (255 * (v / 255)^gamma) to every channel",
+          py::arg("image"), py::arg("gamma"), py::arg("out") = py::none());
+    m.def("brightness_contrast", profiled("brightness_contrast", &brightness_contrast_wrapper), "Apply contrast * (v - 128) + 128 + brightness to every channel",
+          py::arg("image"), py::arg("brightness") = 0.0, py::arg("contrast") = 1.0, py::arg("out") = py::none());
+    m.def("threshold", profiled("threshold", &threshold_wrapper), "Binary threshold of every channel (max_value where v > threshold, else 0)",
+          py::arg("image"), py::arg("threshold") = 127.0, py::arg("max_value") = 255.0, py::arg("out") = py::none());
+    m.def("invert", profiled("invert", &invert_wrapper), "Invert every channel (255 - v)",
+          py::arg("image"), py::arg("out") = py::none());
 
     // 6. Frequency Domain Filtering & Hybrid Images
-    m.def("apply_fft", &apply_fft_wrapper, "Apply Low-pass or High-pass FFT filter",
-          py::arg("image"), py::arg("filter_type"), py::arg("radius"));
-    m.def("create_hybrid", &create_hybrid_wrapper, "Create hybrid image from two inputs",
-          py::arg("img_a"), py::arg("img_b"), py::arg("radius_a"), py::arg("radius_b"));
+    m.def("apply_fft", profiled("apply_fft", memoized("apply_fft", &apply_fft_wrapper)), "Apply Low-pass or High-pass FFT filter",
+          py::arg("image"), py::arg("filter_type"), py::arg("radius"), py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none());
+    m.def("create_hybrid", profiled("create_hybrid", memoized("create_hybrid", &create_hybrid_wrapper)), "Create hybrid image from two inputs",
+          py::arg("img_a"), py::arg("img_b"), py::arg("radius_a"), py::arg("radius_b"), py::arg("out") = py::none(),
+          py::arg("single_channel") = py::none());
+    bind_spectrum(m);
+    bind_hybrid_engine(m);
+
+    // 7. Native multi-op pipelines
+    bind_pipeline(m);
+
+    // 8. Profiling
+    // With set_profiling(True) every call above records its wall time split into stages ("numpy_to_mat",
+    // "to_gray", "compute", "to_bgr", "mat_to_numpy") with the bytes allocated and copied in each.
+    // get_profile() aggregates per op, last_profile() is the calling thread's latest op, and
+    // export_trace(path) writes the recorded calls for chrome://tracing. Off by default; near-free when off.
+    bind_profiler(m);
+
+    // 9. Result cache
+    // With set_result_cache_budget(bytes) > 0, edge detectors, filters, equalize/normalize/clahe, apply_fft,
+    // create_hybrid and Spectrum are memoized by (op, image content fingerprint, parameters) in an LRU bounded
+    // by the budget. Cached results are returned as read-only arrays, shared between hits. Calls with `out=`
+    // are never cached. result_cache_stats() reports hits, misses and evictions for sizing the budget.
+    bind_result_cache(m);
+
+    // 10. Batched ops
+    // <op>_batch(images, ..., threads=0) runs an op over an (N, H, W, C) array, an (N, H, W) stack of grayscale
+    // images or a list of arrays in one call, processing the images concurrently on the native thread pool
+    // (at most `threads` at a time; 0 uses the whole pool, whose size set_num_threads changes). Results come
+    // back stacked as (N, ...) when they share one shape (also into `out=`), else as a list of arrays.
+    bind_batch(m);
 }
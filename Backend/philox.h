@@ -0,0 +1,50 @@
+#pragma once
+#include <cstdint>
+#include <random>
+
+// Philox4x32-10 counter-based generator (Salmon et al., "Parallel Random Numbers: As Easy as 1, 2, 3").
+// Every (seed, counter) pair maps to four independent 32-bit outputs, so the random numbers of any pixel
+// can be computed directly from its coordinates: results do not depend on how rows are split across threads.
+class Philox4x32 {
+private:
+    static inline void round(uint32_t ctr[4], const uint32_t key[2]) {
+        uint64_t p0 = static_cast<uint64_t>(0xD2511F53u) * ctr[0];
+        uint64_t p1 = static_cast<uint64_t>(0xCD9E8D57u) * ctr[2];
+        uint32_t hi0 = static_cast<uint32_t>(p0 >> 32), lo0 = static_cast<uint32_t>(p0);
+        uint32_t hi1 = static_cast<uint32_t>(p1 >> 32), lo1 = static_cast<uint32_t>(p1);
+
+        uint32_t c1 = ctr[1], c3 = ctr[3];
+        ctr[0] = hi1 ^ c1 ^ key[0];
+        ctr[1] = lo1;
+        ctr[2] = hi0 ^ c3 ^ key[1];
+        ctr[3] = lo0;
+    }
+
+public:
+    // Four 32-bit outputs for counter (c0, c1, c2, c3) under a 64-bit key
+    static inline void generate(uint64_t seed, uint32_t c0, uint32_t c1, uint32_t c2, uint32_t c3, uint32_t out[4]) {
+        uint32_t key[2] = { static_cast<uint32_t>(seed), static_cast<uint32_t>(seed >> 32) };
+        out[0] = c0;
+        out[1] = c1;
+        out[2] = c2;
+        out[3] = c3;
+        for (int i = 0; i < 10; ++i) {
+            if (i > 0) {
+                key[0] += 0x9E3779B9u;
+                key[1] += 0xBB67AE85u;
+            }
+            round(out, key);
+        }
+    }
+
+    // Fresh 64-bit seed for calls that do not ask for reproducible output
+    static uint64_t randomSeed() {
+        std::random_device rd;
+        return (static_cast<uint64_t>(rd()) << 32) | rd();
+    }
+
+    // Uniform float in [0, 1) from one 32-bit output (24 significant bits)
+    static inline float toUnitFloat(uint32_t u) {
+        return static_cast<float>(u >> 8) * (1.0f / 16777216.0f);
+    }
+};
@@ -0,0 +1,347 @@
+#pragma once
+#include "binding_utils.h"
+#include <pybind11/stl.h>
+#include "intensity_data_info.h"
+#include "point_ops.h"
+#include "adding_noise.cpp"
+#include "filter_noise.cpp"
+#include "edge_detection.cpp"
+#include "enhance_image.cpp"
+#include "frequency_filters.cpp"
+#include <memory>
+#include <string>
+#include <vector>
+
+namespace py = pybind11;
+
+// One validated step of a Pipeline. Parameter names mirror the keyword arguments of the module functions.
+struct PipelineStep {
+    enum class Op { ToGrayscale, AddNoise, ApplyFilter, Canny, Sobel, Prewitt, Roberts, Equalize, Normalize, ApplyFFT,
+                    Gamma, BrightnessContrast, Threshold, Invert };
+
+    Op op;
+    std::string name;
+    std::string kind;          // noise_type (add_noise), filter_type (apply_filter, apply_fft)
+    double intensity = 0;      // add_noise
+    bool has_seed = false;     // add_noise: reproducible noise when a seed is given
+    uint64_t seed = 0;
+    int size = 3;              // kernel_size (apply_filter), ksize (sobel), radius (apply_fft)
+    double threshold1 = 100;   // canny
+    double threshold2 = 200;   // canny
+    PointLut lut{};            // gamma, brightness_contrast, threshold, invert: built once at parse time
+
+    bool isPointOp() const {
+        return op == Op::Equalize || op == Op::Normalize || op == Op::Gamma || op == Op::BrightnessContrast ||
+               op == Op::Threshold || op == Op::Invert;
+    }
+
+    // Point ops whose table depends on the histogram of their input (the others carry a fixed `lut`)
+    bool needsHistogram() const {
+        return op == Op::Equalize || op == Op::Normalize;
+    }
+
+    // Kernel factors when this is an edge operator that runs as one streamed pass (Sobel 3, Prewitt)
+    bool streamedEdgeFactors(std::vector<int>& colx, std::vector<int>& rowx, std::vector<int>& coly,
+                             std::vector<int>& rowy) const {
+        return (op == Op::Sobel || op == Op::Prewitt) && ::streamedEdgeFactors(name, size, colx, rowx, coly, rowy);
+    }
+};
+
+// Runs an ordered chain of ops natively in one call.
+// Ops that work on grayscale (edges, equalize, normalize, apply_fft) return BGR with three identical planes
+// when called one by one. Inside the pipeline such a result stays a single plane flagged as `replicated`:
+// the next gray op uses it directly (BGR2GRAY of identical planes is exact), channel-wise filters keep the
+// planes identical, and the BGR expansion only happens for per-channel noise or at the very end.
+// Consecutive point ops (equalize, normalize, gamma, brightness_contrast, threshold, invert) are fused into
+// one LUT: the histogram is computed once per run of them and pushed through the LUT composed so far, so
+// the chain costs one histogram and one pass over the pixels. Sobel 3 and Prewitt run as one streamed pass
+// that also takes over the LUT of the point ops right before them (applied as input rows are read) and of
+// the fixed-table ones right after them (folded into the table that rounds the magnitude), so those point
+// ops cost no pass at all.
+class Pipeline {
+public:
+    explicit Pipeline(std::vector<PipelineStep> steps) : steps_(std::move(steps)) {}
+
+    const std::vector<PipelineStep>& steps() const { return steps_; }
+
+    // `dst` may wrap a preallocated output buffer; it is written in place when its size/type match.
+    // With `single_channel`, a grayscale final result is returned as one plane instead of BGR.
+    cv::Mat run(const cv::Mat& image, bool single_channel = false, cv::Mat dst = cv::Mat()) const {
+        cv::Mat current = image;   // borrowed input, never written to
+        bool replicated = false;   // `current` is one plane standing for identical B, G and R planes
+        PointLut pending = PointOps::identity();  // LUT still to be applied to `current` by a streamed edge step
+        std::vector<int> colx, rowx, coly, rowy;
+
+        for (size_t i = 0; i < steps_.size();) {
+            if (steps_[i].isPointOp()) {
+                size_t end = i;
+                while (end < steps_.size() && steps_[end].isPointOp()) ++end;
+                bool defer = end < steps_.size() && steps_[end].streamedEdgeFactors(colx, rowx, coly, rowy);
+                current = runPointOps(i, end, current, replicated, current.data != image.data, defer ? &pending : nullptr);
+                i = end;
+                continue;
+            }
+
+            const PipelineStep& step = steps_[i++];
+            switch (step.op) {
+            case PipelineStep::Op::ToGrayscale:
+                if (current.channels() == 3) {
+                    current = IntensityDataInfo::convertToGrayscale(current);
+                }
+                replicated = false; // to_grayscale genuinely returns one channel
+                break;
+            case PipelineStep::Op::AddNoise:
+                // Noise is drawn independently per channel, so replicated planes must be materialized first
+                if (replicated) {
+                    current = IntensityDataInfo::grayToBGR(current);
+                    replicated = false;
+                }
+                current = NoiseGenerator::apply(current, step.kind, step.intensity,
+                                                step.has_seed ? step.seed : Philox4x32::randomSeed());
+                break;
+            case PipelineStep::Op::ApplyFilter:
+                // Channel-wise filters keep identical planes identical, so `replicated` carries over
+                current = SpatialFilter::apply(current, step.kind, step.size);
+                break;
+            default:
+                if (step.streamedEdgeFactors(colx, rowx, coly, rowy)) {
+                    // Fixed-table point ops right after the edge map are folded into its rounding table
+                    PointLut out_lut = PointOps::identity();
+                    while (i < steps_.size() && steps_[i].isPointOp() && !steps_[i].needsHistogram()) {
+                        out_lut = PointOps::compose(out_lut, steps_[i++].lut);
+                    }
+                    cv::Mat edges;
+                    ConvolutionEngine::streamMagnitude3x3(IntensityDataInfo::grayView(current), colx, rowx, coly, rowy, edges,
+                                                          PointOps::isIdentity(pending) ? nullptr : pending.data(),
+                                                          PointOps::isIdentity(out_lut) ? nullptr : out_lut.data());
+                    current = edges;
+                    pending = PointOps::identity();
+                } else {
+                    current = applyGrayOp(step, IntensityDataInfo::grayView(current));
+                }
+                replicated = true;
+                break;
+            }
+        }
+
+        if (replicated && !single_channel) {
+            return IntensityDataInfo::grayToBGR(current, dst);
+        }
+        if (dst.empty() && current.data != image.data) {
+            return current;
+        }
+        current.copyTo(dst);
+        return dst;
+    }
+
+private:
+    // Run steps_[begin, end), all point ops, on `current` as a single composed LUT.
+    // `owned` means `current` is a pipeline intermediate that may be overwritten. With `deferred`, a LUT on a
+    // single plane is stored there instead of applied, for the next step to apply as it reads `current`.
+    cv::Mat runPointOps(size_t begin, size_t end, cv::Mat current, bool& replicated, bool owned,
+                        PointLut* deferred = nullptr) const {
+        PointLut lut = PointOps::identity();
+        cv::Mat hist;           // histogram of `current` (single plane), computed on first use
+        int remapped[256];
+
+        for (size_t i = begin; i < end; ++i) {
+            const PipelineStep& step = steps_[i];
+            if (!step.needsHistogram()) {
+                // Channel-wise: identical planes stay identical
+                lut = PointOps::compose(lut, step.lut);
+                continue;
+            }
+
+            if (current.channels() != 1) {
+                // The gray conversion does not commute with the LUT: apply what is pending, then go to one plane
+                if (!PointOps::isIdentity(lut)) {
+                    current = PointOps::apply(current, lut, owned ? current : cv::Mat());
+                    lut = PointOps::identity();
+                }
+                current = IntensityDataInfo::convertToGrayscale(current);
+                owned = true;
+            }
+            if (hist.empty()) {
+                IntensityDataInfo::computeHistogram(current, hist);
+            }
+            PointOps::remapHistogram(hist.ptr<int>(0), lut, remapped);
+            lut = PointOps::compose(lut, step.op == PipelineStep::Op::Equalize ? PointOps::equalize(remapped)
+                                                                               : PointOps::normalize(remapped));
+            replicated = true;
+        }
+
+        if (PointOps::isIdentity(lut)) {
+            return current;
+        }
+        if (deferred && current.channels() == 1) {
+            *deferred = lut;
+            return current;
+        }
+        return PointOps::apply(current, lut, owned ? current : cv::Mat());
+    }
+
+    static cv::Mat applyGrayOp(const PipelineStep& step, const cv::Mat& gray) {
+        switch (step.op) {
+        case PipelineStep::Op::Canny:
+            return detectEdgesCannyGray(gray, step.threshold1, step.threshold2);
+        case PipelineStep::Op::Sobel:
+            return detectEdgesSobelGray(gray, step.size);
+        case PipelineStep::Op::Prewitt:
+            return detectEdgesPrewittGray(gray);
+        case PipelineStep::Op::Roberts:
+            return detectEdgesRobertsGray(gray);
+        case PipelineStep::Op::ApplyFFT:
+            return FrequencyFilters::applyFFTFilterGray(gray, step.kind, step.size);
+        default:
+            CV_Error(cv::Error::StsBadArg, "Not a grayscale op: " + step.name);
+        }
+    }
+
+    std::vector<PipelineStep> steps_;
+};
+
+// Parse one step spec: "op", ("op", {params}) or {"op": "op", **params}
+static PipelineStep parse_pipeline_step(const py::handle& spec) {
+    std::string name;
+    py::dict params;
+    if (py::isinstance<py::str>(spec)) {
+        name = spec.cast<std::string>();
+    } else if (py::isinstance<py::dict>(spec)) {
+        params = spec.attr("copy")().cast<py::dict>();
+        if (!params.contains("op")) {
+            throw py::value_error("Pipeline step dict needs an 'op' key");
+        }
+        name = params.attr("pop")("op").cast<std::string>();
+    } else {
+        if (!py::isinstance<py::sequence>(spec) || py::len(spec) != 2) {
+            throw py::value_error("Pipeline steps must be 'op', ('op', {params}) or {'op': 'op', ...}");
+        }
+        py::sequence seq = py::reinterpret_borrow<py::sequence>(spec);
+        name = seq[0].cast<std::string>();
+        params = seq[1].attr("copy")().cast<py::dict>();
+    }
+
+    auto take = [&](const char* key, bool required) -> py::object {
+        if (!params.contains(key)) {
+            if (required) throw py::value_error("Pipeline step '" + name + "' needs parameter '" + key + "'");
+            return py::none();
+        }
+        return params.attr("pop")(key);
+    };
+
+    PipelineStep step;
+    step.name = name;
+    if (name == "to_grayscale") {
+        step.op = PipelineStep::Op::ToGrayscale;
+    } else if (name == "add_noise") {
+        step.op = PipelineStep::Op::AddNoise;
+        step.kind = take("noise_type", true).cast<std::string>();
+        step.intensity = take("intensity", true).cast<double>();
+        py::object seed = take("seed", false);
+        if (!seed.is_none()) {
+            step.has_seed = true;
+            step.seed = resolve_seed(seed);
+        }
+    } else if (name == "apply_filter") {
+        step.op = PipelineStep::Op::ApplyFilter;
+        step.kind = take("filter_type", true).cast<std::string>();
+        step.size = take("kernel_size", true).cast<int>();
+    } else if (name == "canny") {
+        step.op = PipelineStep::Op::Canny;
+        py::object t1 = take("threshold1", false), t2 = take("threshold2", false);
+        if (!t1.is_none()) step.threshold1 = t1.cast<double>();
+        if (!t2.is_none()) step.threshold2 = t2.cast<double>();
+    } else if (name == "sobel") {
+        step.op = PipelineStep::Op::Sobel;
+        py::object ksize = take("ksize", false);
+        if (!ksize.is_none()) step.size = ksize.cast<int>();
+        check_sobel_ksize(step.size);
+    } else if (name == "prewitt") {
+        step.op = PipelineStep::Op::Prewitt;
+    } else if (name == "roberts") {
+        step.op = PipelineStep::Op::Roberts;
+    } else if (name == "equalize") {
+        step.op = PipelineStep::Op::Equalize;
+    } else if (name == "normalize") {
+        step.op = PipelineStep::Op::Normalize;
+    } else if (name == "gamma") {
+        step.op = PipelineStep::Op::Gamma;
+        double gamma = take("gamma", true).cast<double>();
+        if (!(gamma > 0)) {
+            throw py::value_error("Pipeline step 'gamma' needs gamma > 0");
+        }
+        step.lut = PointOps::gamma(gamma);
+    } else if (name == "brightness_contrast") {
+        step.op = PipelineStep::Op::BrightnessContrast;
+        py::object brightness = take("brightness", false), contrast = take("contrast", false);
+        step.lut = PointOps::brightnessContrast(brightness.is_none() ? 0.0 : brightness.cast<double>(),
+                                                contrast.is_none() ? 1.0 : contrast.cast<double>());
+    } else if (name == "threshold") {
+        step.op = PipelineStep::Op::Threshold;
+        py::object level = take("threshold", false), max_value = take("max_value", false);
+        step.lut = PointOps::threshold(level.is_none() ? 127.0 : level.cast<double>(),
+                                       max_value.is_none() ? 255.0 : max_value.cast<double>());
+    } else if (name == "invert") {
+        step.op = PipelineStep::Op::Invert;
+        step.lut = PointOps::invert();
+    } else if (name == "apply_fft") {
+        step.op = PipelineStep::Op::ApplyFFT;
+        step.kind = take("filter_type", true).cast<std::string>();
+        step.size = take("radius", true).cast<int>();
+    } else {
+        throw py::value_error("Unknown pipeline op '" + name + "'");
+    }
+
+    if (py::len(params) > 0) {
+        throw py::value_error("Unexpected parameter(s) for pipeline step '" + name + "': " +
+                              py::str(params.attr("keys")()).cast<std::string>());
+    }
+    return step;
+}
+
+std::shared_ptr<Pipeline> pipeline_init_wrapper(const py::iterable& specs) {
+    std::vector<PipelineStep> steps;
+    for (py::handle spec : specs) {
+        steps.push_back(parse_pipeline_step(spec));
+    }
+    return std::make_shared<Pipeline>(std::move(steps));
+}
+
+py::array_t<unsigned char> pipeline_run_wrapper(const Pipeline& pipeline, py::array_t<unsigned char> img, py::object out,
+                                                py::object single_channel) {
+    auto mat = numpy_to_mat(img);
+    auto out_mat = out_to_mat(out);
+    bool single = resolve_single_channel(single_channel);
+    cv::Mat res;
+    {
+        py::gil_scoped_release release;
+        res = pipeline.run(mat, single, out_mat);
+    }
+    return result_to_numpy(res, out, out_mat);
+}
+
+// Registers backend.Pipeline on the given module
+inline void bind_pipeline(py::module_& m) {
+    py::class_<Pipeline, std::shared_ptr<Pipeline>>(m, "Pipeline",
+        "Ordered chain of backend ops executed natively in one call.\n"
+        "Steps are 'op', ('op', {params}) or {'op': 'op', **params}, using the same names and keyword\n"
+        "parameters as the module functions, e.g. [('add_noise', {'noise_type': 'Gaussian', 'intensity': 10}),\n"
+        "('apply_filter', {'filter_type': 'Median', 'kernel_size': 5}), 'normalize', ('sobel', {'ksize': 3})].\n"
+        "Consecutive point ops (equalize, normalize, gamma, brightness_contrast, threshold, invert) run as one LUT pass.")
+        .def(py::init(&pipeline_init_wrapper), py::arg("steps"))
+        .def("run", profiled("Pipeline.run", &pipeline_run_wrapper), "Run every step on the image and return the final result",
+             py::arg("image"), py::arg("out") = py::none(), py::arg("single_channel") = py::none())
+        .def_property_readonly("ops", [](const Pipeline& p) {
+            std::vector<std::string> names;
+            for (const PipelineStep& step : p.steps()) names.push_back(step.name);
+            return names;
+        })
+        .def("__len__", [](const Pipeline& p) { return p.steps().size(); });
+}
+
+#ifndef MAIN_BIND
+PYBIND11_MODULE(pipeline_backend, m) {
+    m.doc() = "Native multi-op pipeline C++ backend";
+    bind_pipeline(m);
+}
+#endif
@@ -0,0 +1,150 @@
+#pragma once
+#include <opencv2/opencv.hpp>
+#include <array>
+#include <cmath>
+
+// 256-entry table mapping an 8-bit value to its new value
+using PointLut = std::array<uchar, 256>;
+
+// Point operations (each output value depends only on the input value) expressed as 8-bit LUTs.
+// A chain of them is a single LUT: compose() folds one after another. Data-dependent ops (equalize,
+// normalize) only need the histogram of their input, which is the original histogram pushed through
+// the LUT composed so far (remapHistogram), so the whole chain costs one histogram and one LUT pass.
+class PointOps {
+public:
+    static PointLut identity() {
+        PointLut lut;
+        for (int v = 0; v < 256; ++v) lut[v] = static_cast<uchar>(v);
+        return lut;
+    }
+
+    static bool isIdentity(const PointLut& lut) {
+        for (int v = 0; v < 256; ++v) {
+            if (lut[v] != v) return false;
+        }
+        return true;
+    }
+
+    // `second` applied to the output of `first`
+    static PointLut compose(const PointLut& first, const PointLut& second) {
+        PointLut lut;
+        for (int v = 0; v < 256; ++v) lut[v] = second[first[v]];
+        return lut;
+    }
+
+    // Histogram of lut(image) from the histogram of image
+    static void remapHistogram(const int* hist, const PointLut& lut, int* out) {
+        std::fill(out, out + 256, 0);
+        for (int v = 0; v < 256; ++v) out[lut[v]] += hist[v];
+    }
+
+    // Histogram equalization: h(v) = round((cdf(v) - cdf_min) / (M*N - cdf_min) * (L - 1))
+    static PointLut equalize(const int* hist) {
+        int cdf[256];
+        cdf[0] = hist[0];
+        for (int i = 1; i < 256; ++i) {
+            cdf[i] = cdf[i - 1] + hist[i];
+        }
+
+        // Minimum non-zero value in the CDF
+        int cdf_min = 0;
+        for (int i = 0; i < 256; ++i) {
+            if (cdf[i] > 0) {
+                cdf_min = cdf[i];
+                break;
+            }
+        }
+
+        PointLut lut;
+        int total_pixels = cdf[255];
+        if (total_pixels == cdf_min) {
+            // A single-valued image has no spread to equalize; it maps to black
+            lut.fill(0);
+            return lut;
+        }
+        for (int i = 0; i < 256; ++i) {
+            float normalized_val = static_cast<float>(cdf[i] - cdf_min) / (total_pixels - cdf_min);
+            lut[i] = cv::saturate_cast<uchar>(std::round(normalized_val * 255.0f));
+        }
+        return lut;
+    }
+
+    // Min-max contrast stretch: I_new = (I_old - I_min) / (I_max - I_min) * 255 (identity for a flat image)
+    static PointLut normalize(const int* hist) {
+        int I_min = 0, I_max = 255;
+        while (I_min < 255 && hist[I_min] == 0) ++I_min;
+        while (I_max > 0 && hist[I_max] == 0) --I_max;
+        if (I_max <= I_min) {
+            return identity();
+        }
+        PointLut lut;
+        float scale = 255.0f / (I_max - I_min);
+        for (int v = 0; v < 256; ++v) {
+            lut[v] = cv::saturate_cast<uchar>(std::round((v - I_min) * scale));
+        }
+        return lut;
+    }
+
+    // 255 * (v / 255)^gamma: gamma < 1 brightens, gamma > 1 darkens
+    static PointLut gamma(double gamma) {
+        CV_Assert(gamma > 0);
+        PointLut lut;
+        for (int v = 0; v < 256; ++v) {
+            lut[v] = cv::saturate_cast<uchar>(std::round(255.0 * std::pow(v / 255.0, gamma)));
+        }
+        return lut;
+    }
+
+    // contrast * (v - 128) + 128 + brightness, saturated
+    static PointLut brightnessContrast(double brightness, double contrast) {
+        PointLut lut;
+        for (int v = 0; v < 256; ++v) {
+            lut[v] = cv::saturate_cast<uchar>(contrast * (v - 128) + 128 + brightness);
+        }
+        return lut;
+    }
+
+    // Binary threshold: max_value where v > threshold, else 0 (as cv::THRESH_BINARY)
+    static PointLut threshold(double threshold, double max_value) {
+        PointLut lut;
+        uchar high = cv::saturate_cast<uchar>(max_value);
+        for (int v = 0; v < 256; ++v) {
+            lut[v] = v > threshold ? high : 0;
+        }
+        return lut;
+    }
+
+    static PointLut invert() {
+        PointLut lut;
+        for (int v = 0; v < 256; ++v) lut[v] = static_cast<uchar>(255 - v);
+        return lut;
+    }
+
+    // Map every sample of an 8-bit image (all channels) through `lut` in one pass, rows in parallel.
+    // `dst` may wrap a preallocated output buffer, including the input itself.
+    static cv::Mat apply(const cv::Mat& image, const PointLut& lut, cv::Mat dst = cv::Mat()) {
+        CV_Assert(image.depth() == CV_8U);
+        dst.create(image.size(), image.type());
+        const uchar* table = lut.data();
+        int samples = image.cols * image.channels();
+
+        cv::parallel_for_(cv::Range(0, image.rows), [&](const cv::Range& range) {
+            for (int y = range.start; y < range.end; ++y) {
+                const uchar* src = image.ptr<uchar>(y);
+                uchar* out = dst.ptr<uchar>(y);
+                int x = 0;
+                // Eight independent lookups per iteration keep several loads in flight
+                for (; x <= samples - 8; x += 8) {
+                    uchar v0 = table[src[x]], v1 = table[src[x + 1]], v2 = table[src[x + 2]], v3 = table[src[x + 3]];
+                    uchar v4 = table[src[x + 4]], v5 = table[src[x + 5]], v6 = table[src[x + 6]], v7 = table[src[x + 7]];
+                    out[x] = v0; out[x + 1] = v1; out[x + 2] = v2; out[x + 3] = v3;
+                    out[x + 4] = v4; out[x + 5] = v5; out[x + 6] = v6; out[x + 7] = v7;
+                }
+                for (; x < samples; ++x) {
+                    out[x] = table[src[x]];
+                }
+            }
+        });
+        return dst;
+    }
+};
@@ -0,0 +1,421 @@
+#pragma once
+#include <opencv2/opencv.hpp>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <atomic>
+#include <chrono>
+#include <deque>
+#include <fstream>
+#include <map>
+#include <mutex>
+#include <string>
+#include <type_traits>
+#include <utility>
+#include <vector>
+
+namespace py = pybind11;
+
+// Optional per-op instrumentation of the backend module.
+// Every bound function opens a ProfileOp scope; the boundary helpers and the grayscale/BGR conversions open
+// ProfileStage scopes inside it ("numpy_to_mat", "to_gray", "to_bgr", "mat_to_numpy"), and the time not
+// covered by a stage is reported as "compute". Bytes allocated (cv::Mat buffers created on the calling
+// thread) and bytes copied (strided gathers and copies at the NumPy boundary) are charged to the open stage.
+// While profiling is off, each scope costs one relaxed atomic load.
+struct ProfileStageRecord {
+    const char* name;
+    int64_t start_ns;
+    int64_t dur_ns;
+    uint64_t bytes_allocated;
+    uint64_t bytes_copied;
+};
+
+struct ProfileOpRecord {
+    const char* name = "";
+    int thread = 0;
+    int64_t start_ns = 0;
+    int64_t dur_ns = 0;
+    uint64_t bytes_allocated = 0;  // not charged to any stage
+    uint64_t bytes_copied = 0;
+    std::vector<ProfileStageRecord> stages;
+};
+
+struct ProfileStageTotals {
+    uint64_t calls = 0;
+    int64_t total_ns = 0;
+    uint64_t bytes_allocated = 0;
+    uint64_t bytes_copied = 0;
+};
+
+struct ProfileOpTotals {
+    uint64_t calls = 0;
+    int64_t total_ns = 0;
+    int64_t max_ns = 0;
+    uint64_t bytes_allocated = 0;
+    uint64_t bytes_copied = 0;
+    std::map<std::string, ProfileStageTotals> stages;
+};
+
+class Profiler {
+private:
+    // Ops kept for trace export; older ones are dropped first
+    static const size_t kTraceCapacity = 1 << 16;
+
+    struct State {
+        std::mutex mutex;
+        std::map<std::string, ProfileOpTotals> totals;
+        std::deque<ProfileOpRecord> trace;
+        uint64_t dropped = 0;
+        bool has_last = false;
+        ProfileOpRecord last;
+    };
+
+    static State& state() {
+        static State s;
+        return s;
+    }
+
+    static std::atomic<bool>& enabledFlag() {
+        static std::atomic<bool> enabled{false};
+        return enabled;
+    }
+
+    // Wraps OpenCV's standard allocator to charge new Mat buffers to the open op on this thread
+    class CountingAllocator : public cv::MatAllocator {
+    public:
+        cv::UMatData* allocate(int dims, const int* sizes, int type, void* data, size_t* step,
+                               cv::AccessFlag flags, cv::UMatUsageFlags usageFlags) const override {
+            cv::UMatData* u = cv::Mat::getStdAllocator()->allocate(dims, sizes, type, data, step, flags, usageFlags);
+            if (u && !data) {
+                Profiler::addAllocated(u->size);
+            }
+            return u;
+        }
+
+        bool allocate(cv::UMatData* data, cv::AccessFlag accessflags, cv::UMatUsageFlags usageFlags) const override {
+            return cv::Mat::getStdAllocator()->allocate(data, accessflags, usageFlags);
+        }
+
+        void deallocate(cv::UMatData* data) const override {
+            cv::Mat::getStdAllocator()->deallocate(data);
+        }
+    };
+
+    static CountingAllocator& countingAllocator() {
+        static CountingAllocator allocator;
+        return allocator;
+    }
+
+    // Default allocator in place before profiling was turned on
+    static cv::MatAllocator*& previousAllocator() {
+        static cv::MatAllocator* allocator = nullptr;
+        return allocator;
+    }
+
+public:
+    // Per-thread bookkeeping of the op being profiled
+    struct ThreadContext {
+        ProfileOpRecord* op = nullptr;
+        ProfileStageRecord* stage = nullptr;
+        bool has_last = false;
+        ProfileOpRecord last;
+        int id = 0;
+    };
+
+    static ThreadContext& context() {
+        static std::atomic<int> next_id{1};
+        thread_local ThreadContext ctx;
+        if (ctx.id == 0) ctx.id = next_id++;
+        return ctx;
+    }
+
+    static bool enabled() {
+        return enabledFlag().load(std::memory_order_relaxed);
+    }
+
+    static void setEnabled(bool enabled) {
+        std::lock_guard<std::mutex> lock(state().mutex);
+        if (enabled == enabledFlag().load()) return;
+        // Buffers allocated while profiling keep pointing at the standard allocator, so switching back is safe
+        if (enabled) {
+            previousAllocator() = cv::Mat::getDefaultAllocator();
+            cv::Mat::setDefaultAllocator(&countingAllocator());
+        } else {
+            cv::Mat::setDefaultAllocator(previousAllocator());
+        }
+        enabledFlag() = enabled;
+    }
+
+    static int64_t nowNs() {
+        static const auto epoch = std::chrono::steady_clock::now();
+        return std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now() - epoch).count();
+    }
+
+    static void addAllocated(uint64_t bytes) {
+        ThreadContext& ctx = context();
+        if (ctx.stage) ctx.stage->bytes_allocated += bytes;
+        else if (ctx.op) ctx.op->bytes_allocated += bytes;
+    }
+
+    static void addCopied(uint64_t bytes) {
+        if (!enabled()) return;
+        ThreadContext& ctx = context();
+        if (ctx.stage) ctx.stage->bytes_copied += bytes;
+        else if (ctx.op) ctx.op->bytes_copied += bytes;
+    }
+
+    static void record(const ProfileOpRecord& op) {
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        ProfileOpTotals& totals = s.totals[op.name];
+        totals.calls++;
+        totals.total_ns += op.dur_ns;
+        totals.max_ns = std::max(totals.max_ns, op.dur_ns);
+        int64_t staged_ns = 0;
+        for (const ProfileStageRecord& stage : op.stages) {
+            ProfileStageTotals& st = totals.stages[stage.name];
+            st.calls++;
+            st.total_ns += stage.dur_ns;
+            st.bytes_allocated += stage.bytes_allocated;
+            st.bytes_copied += stage.bytes_copied;
+            totals.bytes_allocated += stage.bytes_allocated;
+            totals.bytes_copied += stage.bytes_copied;
+            staged_ns += stage.dur_ns;
+        }
+        ProfileStageTotals& compute = totals.stages["compute"];
+        compute.calls++;
+        compute.total_ns += op.dur_ns - staged_ns;
+        compute.bytes_allocated += op.bytes_allocated;
+        compute.bytes_copied += op.bytes_copied;
+        totals.bytes_allocated += op.bytes_allocated;
+        totals.bytes_copied += op.bytes_copied;
+
+        if (s.trace.size() == kTraceCapacity) {
+            s.trace.pop_front();
+            s.dropped++;
+        }
+        s.trace.push_back(op);
+        s.last = op;
+        s.has_last = true;
+    }
+
+    static void reset() {
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        s.totals.clear();
+        s.trace.clear();
+        s.dropped = 0;
+        s.has_last = false;
+    }
+
+    // Snapshot of the totals, the most recent op and the trace size, taken under the lock
+    static void snapshot(std::map<std::string, ProfileOpTotals>& totals, bool& has_last, ProfileOpRecord& last,
+                         size_t& events, uint64_t& dropped) {
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        totals = s.totals;
+        has_last = s.has_last;
+        last = s.last;
+        events = s.trace.size();
+        dropped = s.dropped;
+    }
+
+    // Write the recorded ops and stages as Chrome trace events (chrome://tracing, Perfetto); returns the op count
+    static size_t exportTrace(const std::string& path) {
+        std::deque<ProfileOpRecord> trace;
+        {
+            std::lock_guard<std::mutex> lock(state().mutex);
+            trace = state().trace;
+        }
+        std::ofstream file(path);
+        if (!file) {
+            CV_Error(cv::Error::StsError, "Cannot write profile trace to " + path);
+        }
+        auto event = [&](const char* name, const char* cat, int tid, int64_t start_ns, int64_t dur_ns,
+                         uint64_t allocated, uint64_t copied, bool first) {
+            file << (first ? "\n" : ",\n") << "{\"name\":\"" << name << "\",\"cat\":\"" << cat
+                 << "\",\"ph\":\"X\",\"pid\":1,\"tid\":" << tid << ",\"ts\":" << start_ns / 1e3
+                 << ",\"dur\":" << dur_ns / 1e3 << ",\"args\":{\"bytes_allocated\":" << allocated
+                 << ",\"bytes_copied\":" << copied << "}}";
+        };
+        file.precision(15);
+        file << "{\"displayTimeUnit\":\"ms\",\"traceEvents\":[";
+        bool first = true;
+        for (const ProfileOpRecord& op : trace) {
+            event(op.name, "op", op.thread, op.start_ns, op.dur_ns, op.bytes_allocated, op.bytes_copied, first);
+            first = false;
+            for (const ProfileStageRecord& stage : op.stages) {
+                event(stage.name, "stage", op.thread, stage.start_ns, stage.dur_ns, stage.bytes_allocated,
+                      stage.bytes_copied, false);
+            }
+        }
+        file << "\n]}\n";
+        return trace.size();
+    }
+};
+
+// Profiles one call of a bound function (a no-op while profiling is off). Nested ops on the same
+// thread (e.g. a method calling another bound function) are folded into the outermost one.
+class ProfileOp {
+public:
+    explicit ProfileOp(const char* name) {
+        if (!Profiler::enabled()) return;
+        Profiler::ThreadContext& ctx = Profiler::context();
+        if (ctx.op) return;
+        record_.name = name;
+        record_.thread = ctx.id;
+        record_.start_ns = Profiler::nowNs();
+        ctx.op = &record_;
+        active_ = true;
+    }
+
+    ~ProfileOp() {
+        if (!active_) return;
+        Profiler::ThreadContext& ctx = Profiler::context();
+        record_.dur_ns = Profiler::nowNs() - record_.start_ns;
+        ctx.op = nullptr;
+        ctx.stage = nullptr;
+        ctx.last = record_;
+        ctx.has_last = true;
+        Profiler::record(record_);
+    }
+
+    ProfileOp(const ProfileOp&) = delete;
+    ProfileOp& operator=(const ProfileOp&) = delete;
+
+private:
+    ProfileOpRecord record_;
+    bool active_ = false;
+};
+
+// Times one stage of the op open on this thread; does nothing outside an op or inside another stage
+class ProfileStage {
+public:
+    explicit ProfileStage(const char* name) {
+        if (!Profiler::enabled()) return;
+        Profiler::ThreadContext& ctx = Profiler::context();
+        if (!ctx.op || ctx.stage) return;
+        ctx.op->stages.push_back({ name, Profiler::nowNs(), 0, 0, 0 });
+        ctx.stage = &ctx.op->stages.back();
+        op_ = ctx.op;
+    }
+
+    ~ProfileStage() {
+        if (!op_) return;
+        Profiler::ThreadContext& ctx = Profiler::context();
+        if (ctx.op == op_ && ctx.stage) {
+            ctx.stage->dur_ns = Profiler::nowNs() - ctx.stage->start_ns;
+            ctx.stage = nullptr;
+        }
+    }
+
+    ProfileStage(const ProfileStage&) = delete;
+    ProfileStage& operator=(const ProfileStage&) = delete;
+
+private:
+    ProfileOpRecord* op_ = nullptr;
+};
+
+template <typename F, typename R, typename... Args>
+auto profiled_impl(const char* name, F fn, R (*)(Args...)) {
+    return [name, fn](Args... args) -> R {
+        ProfileOp op(name);
+        return fn(std::forward<Args>(args)...);
+    };
+}
+
+// Wraps a bound function (pointer or lambda) so every call is profiled as `name`; the signature is kept for pybind11
+template <typename F>
+auto profiled(const char* name, F fn) {
+    using Signature = py::detail::function_signature_t<F>;
+    return profiled_impl(name, fn, static_cast<std::add_pointer_t<Signature>>(nullptr));
+}
+
+// Latency breakdown of one op: total, then (stage, ms) in order with "compute" for the unstaged time
+inline py::dict profile_op_to_dict(const ProfileOpRecord& op) {
+    py::list stages;
+    int64_t staged_ns = 0;
+    uint64_t allocated = op.bytes_allocated, copied = op.bytes_copied;
+    for (const ProfileStageRecord& stage : op.stages) {
+        stages.append(py::make_tuple(stage.name, stage.dur_ns / 1e6));
+        staged_ns += stage.dur_ns;
+        allocated += stage.bytes_allocated;
+        copied += stage.bytes_copied;
+    }
+    stages.append(py::make_tuple("compute", (op.dur_ns - staged_ns) / 1e6));
+    py::dict d;
+    d["op"] = op.name;
+    d["total_ms"] = op.dur_ns / 1e6;
+    d["stages"] = stages;
+    d["bytes_allocated"] = allocated;
+    d["bytes_copied"] = copied;
+    return d;
+}
+
+py::dict get_profile_wrapper() {
+    std::map<std::string, ProfileOpTotals> totals;
+    bool has_last;
+    ProfileOpRecord last;
+    size_t events;
+    uint64_t dropped;
+    Profiler::snapshot(totals, has_last, last, events, dropped);
+
+    py::dict ops;
+    for (const auto& entry : totals) {
+        const ProfileOpTotals& t = entry.second;
+        py::dict stages;
+        for (const auto& stage : t.stages) {
+            py::dict st;
+            st["calls"] = stage.second.calls;
+            st["total_ms"] = stage.second.total_ns / 1e6;
+            st["bytes_allocated"] = stage.second.bytes_allocated;
+            st["bytes_copied"] = stage.second.bytes_copied;
+            stages[py::str(stage.first)] = st;
+        }
+        py::dict op;
+        op["calls"] = t.calls;
+        op["total_ms"] = t.total_ns / 1e6;
+        op["mean_ms"] = t.total_ns / 1e6 / t.calls;
+        op["max_ms"] = t.max_ns / 1e6;
+        op["bytes_allocated"] = t.bytes_allocated;
+        op["bytes_copied"] = t.bytes_copied;
+        op["stages"] = stages;
+        ops[py::str(entry.first)] = op;
+    }
+
+    py::dict result;
+    result["enabled"] = Profiler::enabled();
+    result["ops"] = ops;
+    result["last"] = has_last ? py::object(profile_op_to_dict(last)) : py::object(py::none());
+    result["trace_events"] = events;
+    result["trace_dropped"] = dropped;
+    return result;
+}
+
+py::object last_profile_wrapper(bool clear) {
+    Profiler::ThreadContext& ctx = Profiler::context();
+    if (!ctx.has_last) {
+        return py::none();
+    }
+    py::dict d = profile_op_to_dict(ctx.last);
+    ctx.has_last = !clear;
+    return d;
+}
+
+size_t export_trace_wrapper(const std::string& path) {
+    py::gil_scoped_release release;
+    return Profiler::exportTrace(path);
+}
+
+// Registers the profiling functions on the given module
+inline void bind_profiler(py::module_& m) {
+    m.def("set_profiling", &Profiler::setEnabled, "Turn per-op profiling on or off (initially off)", py::arg("enabled"));
+    m.def("is_profiling", &Profiler::enabled, "Whether per-op profiling is on");
+    m.def("get_profile", &get_profile_wrapper,
+          "Per-op totals (calls, total/mean/max ms, bytes allocated/copied, per-stage breakdown) and the last op");
+    m.def("last_profile", &last_profile_wrapper,
+          "Latency breakdown of the last op profiled on the calling thread (None if there is none); "
+          "clear=True forgets it so the next call only reports a newer op", py::arg("clear") = false);
+    m.def("reset_profile", &Profiler::reset, "Clear all profiling totals and trace events");
+    m.def("export_trace", &export_trace_wrapper, "Write the recorded ops as a Chrome trace JSON file",
+          py::arg("path"));
+}
@@ -0,0 +1,343 @@
+#pragma once
+#include "binding_utils.h"
+#include <pybind11/stl.h>
+#include <cstdint>
+#include <cstring>
+#include <list>
+#include <mutex>
+#include <string>
+#include <type_traits>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+namespace py = pybind11;
+
+// 64-bit content hash of an 8-bit image: every row is hashed in parallel (four independent
+// multiply-rotate lanes, as in xxHash64) and the row hashes are folded in order with the shape.
+class ImageFingerprint {
+private:
+    static constexpr uint64_t kPrime1 = 0x9E3779B185EBCA87ULL;
+    static constexpr uint64_t kPrime2 = 0xC2B2AE3D27D4EB4FULL;
+    static constexpr uint64_t kPrime3 = 0x165667B19E3779F9ULL;
+    static constexpr uint64_t kPrime4 = 0x85EBCA77C2B2AE63ULL;
+    static constexpr uint64_t kPrime5 = 0x27D4EB2F165667C5ULL;
+
+    static inline uint64_t rotl(uint64_t x, int r) { return (x << r) | (x >> (64 - r)); }
+
+    static inline uint64_t round(uint64_t acc, uint64_t input) {
+        return rotl(acc + input * kPrime2, 31) * kPrime1;
+    }
+
+    static inline uint64_t merge(uint64_t acc, uint64_t value) {
+        return (acc ^ round(0, value)) * kPrime1 + kPrime4;
+    }
+
+    static inline uint64_t avalanche(uint64_t h) {
+        h ^= h >> 33;
+        h *= kPrime2;
+        h ^= h >> 29;
+        h *= kPrime3;
+        h ^= h >> 32;
+        return h;
+    }
+
+    static inline uint64_t read64(const uchar* p) {
+        uint64_t v;
+        std::memcpy(&v, p, sizeof(v));
+        return v;
+    }
+
+    static uint64_t hashBytes(const uchar* p, size_t len, uint64_t seed) {
+        const uchar* end = p + len;
+        uint64_t h;
+        if (len >= 32) {
+            uint64_t v1 = seed + kPrime1 + kPrime2, v2 = seed + kPrime2, v3 = seed, v4 = seed - kPrime1;
+            for (; p + 32 <= end; p += 32) {
+                v1 = round(v1, read64(p));
+                v2 = round(v2, read64(p + 8));
+                v3 = round(v3, read64(p + 16));
+                v4 = round(v4, read64(p + 24));
+            }
+            h = rotl(v1, 1) + rotl(v2, 7) + rotl(v3, 12) + rotl(v4, 18);
+            h = merge(merge(merge(merge(h, v1), v2), v3), v4);
+        } else {
+            h = seed + kPrime5;
+        }
+        h += len;
+        for (; p + 8 <= end; p += 8) {
+            h = rotl(h ^ round(0, read64(p)), 27) * kPrime1 + kPrime4;
+        }
+        for (; p < end; ++p) {
+            h = rotl(h ^ (*p * kPrime5), 11) * kPrime1;
+        }
+        return avalanche(h);
+    }
+
+public:
+    static uint64_t compute(const cv::Mat& image) {
+        ProfileStage stage("fingerprint");
+        size_t row_bytes = static_cast<size_t>(image.cols) * image.elemSize();
+        std::vector<uint64_t> rows(image.rows);
+        cv::parallel_for_(cv::Range(0, image.rows), [&](const cv::Range& range) {
+            for (int y = range.start; y < range.end; ++y) {
+                rows[y] = hashBytes(image.ptr<uchar>(y), row_bytes, static_cast<uint64_t>(y));
+            }
+        });
+        uint64_t h = hashBytes(reinterpret_cast<const uchar*>(rows.data()), rows.size() * sizeof(uint64_t),
+                               static_cast<uint64_t>(image.type()));
+        return merge(merge(h, static_cast<uint64_t>(image.rows)), static_cast<uint64_t>(image.cols));
+    }
+
+    // Key fragment identifying an image by content and shape, e.g. "3f9c...:1080x1920x3"
+    static std::string describe(const cv::Mat& image) {
+        uint64_t h;
+        {
+            py::gil_scoped_release release;
+            h = compute(image);
+        }
+        char buf[64];
+        std::snprintf(buf, sizeof(buf), "%016llx:%dx%dx%d", static_cast<unsigned long long>(h),
+                      image.rows, image.cols, image.channels());
+        return buf;
+    }
+};
+
+struct ResultCacheStats {
+    uint64_t hits = 0;
+    uint64_t misses = 0;
+    uint64_t insertions = 0;
+    uint64_t evictions = 0;
+    uint64_t rejected = 0;  // results larger than the whole budget
+};
+
+// Holds py::object fields, so it gets the hidden visibility of pybind11's own types (an anonymous namespace;
+// the backend is a single translation unit)
+namespace {
+
+// LRU of backend results keyed by (op, input fingerprints, parameters), bounded by a byte budget.
+// Values are the Python objects handed out (read-only arrays, Spectrum instances), so a hit returns the
+// very same object without copying. All calls happen with the GIL held. Disabled while the budget is 0.
+class ResultCache {
+private:
+    struct Entry {
+        std::string key;
+        py::object value;
+        size_t bytes;
+    };
+
+    struct State {
+        std::mutex mutex;
+        std::list<Entry> lru;  // most recently used first
+        std::unordered_map<std::string, std::list<Entry>::iterator> index;
+        size_t bytes = 0;
+        ResultCacheStats stats;
+    };
+
+    static State& state() {
+        static auto* s = new State();  // leaked: Python objects must not be released after interpreter shutdown
+        return *s;
+    }
+
+    static std::atomic<size_t>& budgetBytes() {
+        static std::atomic<size_t> budget{0};
+        return budget;
+    }
+
+    // Drop least recently used entries until the budget holds; the caller holds the mutex
+    static void evictToBudget(State& s, size_t budget, std::vector<py::object>& released) {
+        while (s.bytes > budget && !s.lru.empty()) {
+            Entry& victim = s.lru.back();
+            s.bytes -= victim.bytes;
+            s.index.erase(victim.key);
+            released.push_back(std::move(victim.value));
+            s.lru.pop_back();
+            s.stats.evictions++;
+        }
+    }
+
+public:
+    static bool enabled() {
+        return budgetBytes().load(std::memory_order_relaxed) > 0;
+    }
+
+    static size_t budget() {
+        return budgetBytes().load();
+    }
+
+    static void setBudget(size_t bytes) {
+        std::vector<py::object> released;  // destroyed after the lock is dropped
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        budgetBytes() = bytes;
+        evictToBudget(s, bytes, released);
+    }
+
+    // Cached value for `key` (marked most recently used), or None
+    static py::object lookup(const std::string& key) {
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        auto it = s.index.find(key);
+        if (it == s.index.end()) {
+            s.stats.misses++;
+            return py::none();
+        }
+        s.stats.hits++;
+        s.lru.splice(s.lru.begin(), s.lru, it->second);
+        return it->second->value;
+    }
+
+    // Stores `value` unless it alone exceeds the budget; returns whether it was stored
+    static bool insert(const std::string& key, py::object value, size_t bytes) {
+        std::vector<py::object> released;
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        size_t budget = budgetBytes().load();
+        if (bytes > budget) {
+            s.stats.rejected++;
+            return false;
+        }
+        auto it = s.index.find(key);
+        if (it != s.index.end()) {
+            // Computed concurrently by another thread; keep the newer value
+            s.bytes -= it->second->bytes;
+            released.push_back(std::move(it->second->value));
+            s.lru.erase(it->second);
+            s.index.erase(it);
+        }
+        s.lru.push_front({ key, std::move(value), bytes });
+        s.index[key] = s.lru.begin();
+        s.bytes += bytes;
+        s.stats.insertions++;
+        evictToBudget(s, budget, released);
+        return true;
+    }
+
+    // Store a result array. Stored arrays are made read-only so callers cannot change what later hits
+    // return; rejected ones stay writable. The GIL is held throughout, so no hit sees the array before that.
+    static void insertArray(const std::string& key, const py::array& result) {
+        if (insert(key, result, static_cast<size_t>(result.nbytes()))) {
+            py::detail::array_proxy(result.ptr())->flags &= ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+        }
+    }
+
+    static void clear(bool reset_stats) {
+        std::list<Entry> released;
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        released.swap(s.lru);
+        s.index.clear();
+        s.bytes = 0;
+        if (reset_stats) s.stats = ResultCacheStats();
+    }
+
+    static void snapshot(ResultCacheStats& stats, size_t& entries, size_t& bytes) {
+        State& s = state();
+        std::lock_guard<std::mutex> lock(s.mutex);
+        stats = s.stats;
+        entries = s.lru.size();
+        bytes = s.bytes;
+    }
+};
+
+}  // namespace
+
+// Builds a cache key from the arguments of a bound function, in order.
+// Images contribute their content fingerprint; an `out=` array makes the call uncacheable.
+class ResultKey {
+public:
+    explicit ResultKey(const char* op) : key_(op) {}
+
+    void add(py::array_t<unsigned char>& img) { addImage(ImageFingerprint::describe(numpy_to_mat(img))); }
+    void addImage(const std::string& description) { append(description); }
+    void add(const std::string& value) { append("'" + value + "'"); }
+    void add(bool value) { append(value ? "True" : "False"); }
+    void add(int value) { append(std::to_string(value)); }
+    void add(double value) { append(py::repr(py::float_(value)).cast<std::string>()); }
+    void add(const std::pair<int, int>& value) {
+        append("(" + std::to_string(value.first) + "," + std::to_string(value.second) + ")");
+    }
+    void add(const py::object& value) {
+        if (value.is_none()) {
+            append("None");
+        } else if (py::isinstance<py::array>(value)) {
+            cacheable_ = false;  // writes into a caller buffer
+        } else {
+            append(py::repr(value).cast<std::string>());
+        }
+    }
+
+    bool cacheable() const { return cacheable_; }
+
+    // Arguments left as None follow the module-wide single_channel default, so it is part of every key
+    std::string str() const { return key_ + "|sc=" + (single_channel_default().load() ? "1" : "0"); }
+
+private:
+    void append(const std::string& part) {
+        key_ += "|";
+        key_ += part;
+    }
+
+    std::string key_;
+    bool cacheable_ = true;
+};
+
+template <typename F, typename R, typename... Args>
+auto memoized_impl(const char* name, F fn, R (*)(Args...)) {
+    return [name, fn](Args... args) -> R {
+        if (!ResultCache::enabled()) {
+            return fn(std::forward<Args>(args)...);
+        }
+        ResultKey key(name);
+        (key.add(args), ...);
+        if (!key.cacheable()) {
+            return fn(std::forward<Args>(args)...);
+        }
+        std::string k = key.str();
+        py::object hit = ResultCache::lookup(k);
+        if (!hit.is_none()) {
+            return py::reinterpret_borrow<R>(hit);
+        }
+        R result = fn(std::forward<Args>(args)...);
+        ResultCache::insertArray(k, result);
+        return result;
+    };
+}
+
+// Wraps a bound function returning an array so that repeated calls with the same image content and
+// parameters return the cached result (while the result cache is enabled)
+template <typename F>
+auto memoized(const char* name, F fn) {
+    using Signature = py::detail::function_signature_t<F>;
+    return memoized_impl(name, fn, static_cast<std::add_pointer_t<Signature>>(nullptr));
+}
+
+py::dict result_cache_stats_wrapper() {
+    ResultCacheStats stats;
+    size_t entries, bytes;
+    ResultCache::snapshot(stats, entries, bytes);
+    uint64_t lookups = stats.hits + stats.misses;
+    py::dict d;
+    d["enabled"] = ResultCache::enabled();
+    d["budget_bytes"] = ResultCache::budget();
+    d["bytes"] = bytes;
+    d["entries"] = entries;
+    d["hits"] = stats.hits;
+    d["misses"] = stats.misses;
+    d["hit_rate"] = lookups ? static_cast<double>(stats.hits) / lookups : 0.0;
+    d["insertions"] = stats.insertions;
+    d["evictions"] = stats.evictions;
+    d["rejected"] = stats.rejected;
+    return d;
+}
+
+// Registers the result cache controls on the given module
+inline void bind_result_cache(py::module_& m) {
+    m.def("set_result_cache_budget", &ResultCache::setBudget,
+          "Enable the result cache with the given byte budget (0 disables it, the initial state)",
+          py::arg("budget_bytes"));
+    m.def("result_cache_stats", &result_cache_stats_wrapper,
+          "Result cache budget, size, entries and hit/miss/insertion/eviction counts");
+    m.def("clear_result_cache", &ResultCache::clear, "Drop every cached result (and optionally the statistics)",
+          py::arg("reset_stats") = false);
+}
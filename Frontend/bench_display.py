@@ -0,0 +1,159 @@
+"""Micro-benchmark of the image display path of the frontend.
+
+Times, on synthetic BGR and grayscale images of a few sizes, the steps between a NumPy result and
+what a label paints:
+
+    to_pixmap        array -> QPixmap (numpy_to_qpixmap), against the former cvtColor + copy path
+    scale_smooth     fitting the pixmap into a label with smooth filtering (an uncached rescale)
+    scale_fast       the same with nearest filtering, as done while a resize is in progress
+    label_drag       one resize step of an ImageLabel while its size keeps changing
+    label_cached     a resize of an ImageLabel back to a size it has already shown
+
+    python bench_display.py
+    python bench_display.py --sizes 1,12,48 --label 1280x720 --json display.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = (1, 12, 48)
+QUICK_SIZES = (1,)
+PERCENTILES = (50, 90)
+
+front = None  # imported in main() so --backend-path can pick the build the frontend loads
+
+
+def synthetic_image(megapixels, channels, seed=0):
+    """Smooth gradients plus noise at 4:3, so scaling filters see realistic content."""
+    h = max(1, int(round((megapixels * 1e6 * 3 / 4) ** 0.5)))
+    w = max(1, int(round(megapixels * 1e6 / h)))
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = (x / max(w - 1, 1) * 160 + y / max(h - 1, 1) * 60).astype(np.uint8)
+    if channels == 1:
+        return cv2.add(base, rng.integers(0, 32, (h, w), dtype=np.uint8))
+    planes = [cv2.add(base, rng.integers(0, 32, (h, w), dtype=np.uint8)) for _ in range(channels)]
+    return cv2.merge(planes)
+
+
+def legacy_to_pixmap(img_array):
+    """The display conversion used before numpy_to_qpixmap wrapped BGR data directly (two copies)."""
+    if len(img_array.shape) == 3:
+        h, w, c = img_array.shape
+        img_rgb = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
+        qimg = front.QImage(img_rgb.data, w, h, c * w, front.QImage.Format.Format_RGB888).copy()
+    else:
+        h, w = img_array.shape
+        img_gray = np.ascontiguousarray(img_array)
+        qimg = front.QImage(img_gray.data, w, h, w, front.QImage.Format.Format_Grayscale8).copy()
+    return front.QPixmap.fromImage(qimg)
+
+
+def percentile(sorted_values, q):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure(fn, warmup, repeat):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1e3)
+    times.sort()
+    return {"p%d_ms" % q: percentile(times, q) for q in PERCENTILES}
+
+
+def build_cases(image, label_size):
+    """(name, callable) pairs for one input image; callables share the pixmap/label they need."""
+    Qt = front.Qt
+    pixmap = front.numpy_to_qpixmap(image)
+    target = front.QSize(*label_size)
+
+    label = front.ImageLabel()
+    label.resize(target)
+    label.show()
+    label.set_pixmap_data(pixmap)
+    # Alternate between sizes a few pixels apart, as a splitter drag does
+    drag_sizes = [front.QSize(label_size[0] - d, label_size[1]) for d in (1, 2, 3, 4)]
+    drag_step = iter(range(1 << 30))
+    cached_sizes = [target, front.QSize(label_size[0] // 2, label_size[1] // 2)]
+    for size in cached_sizes:
+        label.resize(size)
+        label.update_image()
+    cached_step = iter(range(1 << 30))
+
+    return [
+        ("to_pixmap[legacy]", lambda: legacy_to_pixmap(image)),
+        ("to_pixmap", lambda: front.numpy_to_qpixmap(image)),
+        ("scale_smooth", lambda: pixmap.scaled(target, Qt.AspectRatioMode.KeepAspectRatio,
+                                               Qt.TransformationMode.SmoothTransformation)),
+        ("scale_fast", lambda: pixmap.scaled(target, Qt.AspectRatioMode.KeepAspectRatio,
+                                             Qt.TransformationMode.FastTransformation)),
+        ("label_drag", lambda: label.resize(drag_sizes[next(drag_step) % len(drag_sizes)])),
+        ("label_cached", lambda: label.resize(cached_sizes[next(cached_step) % len(cached_sizes)])),
+    ], label
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the array -> QPixmap -> label display path.")
+    parser.add_argument("--quick", action="store_true", help="only 1 MP images and fewer repetitions")
+    parser.add_argument("--sizes", type=lambda s: [float(v) for v in s.split(",") if v],
+                        help="comma-separated image sizes in megapixels (default: 1,12,48)")
+    parser.add_argument("--label", default="960x720", help="label size WxH the images are fitted into")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--backend-path", metavar="DIR", help="directory holding the backend module front.py loads")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global front
+    args = parse_args(argv)
+    if args.backend_path:
+        sys.path.insert(0, os.path.abspath(args.backend_path))
+    sys.path.insert(0, HERE)
+    import front as front_module
+    front = front_module
+
+    app = front.QApplication.instance() or front.QApplication(sys.argv[:1])
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    repeat = min(args.repeat, 5) if args.quick else args.repeat
+    label_size = tuple(int(v) for v in args.label.lower().split("x"))
+
+    results = []
+    print("%-18s %-14s %10s %10s" % ("case", "input", "p50 ms", "p90 ms"))
+    for megapixels in sizes:
+        for channels, kind in ((3, "bgr"), (1, "gray")):
+            image = synthetic_image(megapixels, channels)
+            name = "%s_%gmp" % (kind, megapixels)
+            cases, label = build_cases(image, label_size)
+            for case_name, fn in cases:
+                stats = measure(lambda: (fn(), app.processEvents()), args.warmup, repeat)
+                print("%-18s %-14s %10.2f %10.2f" % (case_name, name, stats["p50_ms"], stats["p90_ms"]))
+                results.append(dict(case=case_name, input=name, shape=list(image.shape), **stats))
+            label.deleteLater()
+            app.processEvents()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"label": list(label_size), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
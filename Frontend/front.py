@@ -3,13 +3,20 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QComboBox,
                              QSlider, QSpinBox, QTabWidget, QGroupBox, QFileDialog,
                              QScrollArea, QSplitter, QFrame, QSizePolicy, QMessageBox)
-from PyQt6.QtCore import Qt, QSize, QTimer, QEvent, pyqtSignal
-from PyQt6.QtGui import QAction, QIcon, QFont, QColor, QPalette, QPixmap, QImage, QShortcut, QKeySequence
+from PyQt6.QtCore import Qt, QSize, QTimer, QEvent, QObject, QStandardPaths, pyqtSignal
+from PyQt6.QtGui import (QAction, QIcon, QFont, QColor, QPalette, QPixmap, QImage, QImageReader, QShortcut,
+                         QKeySequence)
+from PyQt6 import sip
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import numpy as np
 import cv2
 import os
+import zlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     os.add_dll_directory("C:/msys64/mingw64/bin")
@@ -17,23 +24,368 @@ except Exception:
     pass
 import backend
 
-def numpy_to_qpixmap(img_array):
-    if img_array is None:
-        return QPixmap()
-    
-    # Needs to be a contiguous unmanaged array copied into Qt context to avoid GC crashes.
-    if len(img_array.shape) == 3:
+def numpy_to_qimage(img_array):
+    """QImage viewing the pixels of a BGR or grayscale uint8 array in place (Format_BGR888 / Grayscale8).
+
+    Nothing is copied or converted: the image is only valid while `img_array` is alive and unchanged,
+    so detach it with .copy() or QPixmap.fromImage() before the array goes away. Rows may be padded
+    (e.g. a column crop); only the pixels within a row have to be packed.
+    """
+    if img_array.ndim == 3 and img_array.shape[2] == 1:
+        img_array = img_array[:, :, 0]
+    if img_array.ndim == 3:
         h, w, c = img_array.shape
-        bytes_per_line = c * w
-        img_rgb = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
-        qimg = QImage(img_rgb.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        return QPixmap.fromImage(qimg.copy())
+        if c != 3:
+            raise ValueError("Expected a BGR image, got %d channels" % c)
+        fmt = QImage.Format.Format_BGR888
+        packed = img_array.strides[1:] == (3, 1)
     else:
         h, w = img_array.shape
-        bytes_per_line = w
-        img_gray = np.ascontiguousarray(img_array)
-        qimg = QImage(img_gray.data, w, h, bytes_per_line, QImage.Format.Format_Grayscale8)
-        return QPixmap.fromImage(qimg.copy())
+        fmt = QImage.Format.Format_Grayscale8
+        packed = img_array.strides[1] == 1
+    if img_array.dtype != np.uint8 or not packed or img_array.strides[0] <= 0:
+        # Not viewable as is; the packed copy is temporary, so the image has to own its pixels
+        packed_array = np.ascontiguousarray(img_array, dtype=np.uint8)
+        return QImage(sip.voidptr(packed_array.ctypes.data), w, h, packed_array.strides[0], fmt).copy()
+    return QImage(sip.voidptr(img_array.ctypes.data), w, h, img_array.strides[0], fmt)
+
+
+def numpy_to_qpixmap(img_array):
+    """QPixmap of a BGR or grayscale array; the conversion into the pixmap is the only copy made."""
+    if img_array is None:
+        return QPixmap()
+    return QPixmap.fromImage(numpy_to_qimage(img_array))
+
+
+# ==========================================
+# --- EDIT HISTORY ---
+# ==========================================
+
+class HistoryState:
+    """One undo/redo state, held as the live array or as a zlib-compressed block of its bytes."""
+
+    def __init__(self, image):
+        self.image = image
+        self.shape = image.shape
+        self.dtype = image.dtype
+        self.blob = None
+        self.pending = None  # Future of the background compression, if one was scheduled
+
+    @property
+    def nbytes(self):
+        image = self.image
+        return image.nbytes if image is not None else len(self.blob)
+
+    def compress(self, level):
+        self.blob = zlib.compress(np.ascontiguousarray(self.image).data, level)
+        self.image = None  # Only dropped once the blob is in place, so load() always finds one of them
+
+    def load(self):
+        image = self.image
+        if image is not None:
+            return image
+        return np.frombuffer(zlib.decompress(self.blob), dtype=self.dtype).reshape(self.shape)
+
+
+class ImageHistory:
+    """Undo/redo stacks bounded by a byte budget.
+
+    States are stored by reference (results are never modified in place, so no copy is needed).
+    The `hot_states` most recent entries of each stack stay uncompressed so undo/redo is instant;
+    older ones are zlib-compressed on a background thread. When the total size exceeds
+    `budget_bytes`, the least recently visited states (the oldest undo steps first, then the
+    furthest redo steps) are evicted, always keeping at least one step in each direction.
+    """
+
+    def __init__(self, budget_bytes=1 << 30, hot_states=2, compress_level=1):
+        self.budget_bytes = budget_bytes
+        self.hot_states = hot_states
+        self.compress_level = compress_level
+        self.undo_states = []
+        self.redo_states = []
+        self._compressor = ThreadPoolExecutor(max_workers=1)
+
+    def push(self, image):
+        """Record `image` as the state to return to on the next undo; clears the redo branch."""
+        self._discard(self.redo_states)
+        self.undo_states.append(HistoryState(image))
+        self._rebalance()
+
+    def undo(self, current):
+        """Return the previous state (or None), moving `current` onto the redo stack."""
+        return self._step(self.undo_states, self.redo_states, current)
+
+    def redo(self, current):
+        """Return the next state (or None), moving `current` onto the undo stack."""
+        return self._step(self.redo_states, self.undo_states, current)
+
+    def clear(self):
+        self._discard(self.undo_states)
+        self._discard(self.redo_states)
+
+    @property
+    def nbytes(self):
+        return sum(state.nbytes for state in self.undo_states + self.redo_states)
+
+    def _step(self, source, target, current):
+        if not source:
+            return None
+        state = source.pop()
+        if current is not None:
+            target.append(HistoryState(current))
+        image = state.load()
+        self._rebalance()
+        return image
+
+    def _rebalance(self):
+        for stack in (self.undo_states, self.redo_states):
+            for state in stack[:-self.hot_states] if self.hot_states else stack:
+                if state.image is not None and state.pending is None:
+                    state.pending = self._compressor.submit(state.compress, self.compress_level)
+
+        total = self.nbytes
+        if total > self.budget_bytes:
+            # Compressions still in flight may bring the total under budget, so let them finish first
+            for state in self.undo_states + self.redo_states:
+                if state.pending is not None:
+                    state.pending.result()
+            total = self.nbytes
+        for stack in (self.undo_states, self.redo_states):
+            while total > self.budget_bytes and len(stack) > 1:
+                evicted = stack.pop(0)
+                if evicted.pending is not None:
+                    evicted.pending.cancel()
+                total -= evicted.nbytes
+
+    @staticmethod
+    def _discard(stack):
+        for state in stack:
+            if state.pending is not None:
+                state.pending.cancel()
+        stack.clear()
+
+
+# ==========================================
+# --- PREVIEW PYRAMID ---
+# ==========================================
+
+def scale_kernel_size(ksize, scale, minimum=1):
+    """Odd kernel size covering the same footprint on an image resized by `scale`."""
+    return max(minimum, int(round((ksize - 1) / 2 * scale)) * 2 + 1)
+
+
+class ImagePyramid:
+    """Lazily built pyrDown levels of one image (level 0 is the image itself), plus per-level spectra
+    and Canny gradient states.
+
+    Live previews run on the smallest level that still covers the on-screen size; levels are
+    built on first use and kept for as long as the image stays current.
+    """
+
+    MAX_LEVEL = 6
+
+    def __init__(self, image):
+        self.image = image
+        self._levels = [image]
+        self._spectra = {}
+        self._canny_states = {}
+        self._lock = threading.Lock()
+
+    def level_for(self, width, height):
+        """Index of the smallest level that is still at least `width` x `height` pixels."""
+        h, w = self.image.shape[:2]
+        index = 0
+        while index < self.MAX_LEVEL and w / 2 ** (index + 1) >= width and h / 2 ** (index + 1) >= height:
+            index += 1
+        return index
+
+    def level(self, index):
+        with self._lock:
+            while len(self._levels) <= index:
+                self._levels.append(cv2.pyrDown(self._levels[-1]))
+            return self._levels[index]
+
+    def spectrum(self, index):
+        """Cached backend.Spectrum of a level."""
+        with self._lock:
+            spectrum = self._spectra.get(index)
+        if spectrum is None:
+            spectrum = backend.Spectrum(self.level(index))
+            with self._lock:
+                spectrum = self._spectra.setdefault(index, spectrum)
+        return spectrum
+
+    def canny_state(self, index):
+        """Cached backend.CannyState of a level: threshold changes only re-run the hysteresis."""
+        with self._lock:
+            state = self._canny_states.get(index)
+        if state is None:
+            state = backend.CannyState(self.level(index))
+            with self._lock:
+                state = self._canny_states.setdefault(index, state)
+        return state
+
+
+# ==========================================
+# --- BACKGROUND EXECUTION ---
+# ==========================================
+
+class OpRunner(QObject):
+    """Runs backend calls on a worker pool and hands the results back to the UI thread.
+
+    Requests are grouped by channel ("main", "hybrid", ...) and the latest request on a channel wins:
+    a superseded request is cancelled if it has not started yet, otherwise its result is dropped on
+    arrival. The backend releases the GIL while it works, so the UI thread stays responsive.
+    When backend profiling is on, the latency breakdown of the last backend op of each delivered
+    request is reported through `profiled`.
+    """
+
+    failed = pyqtSignal(str, str)  # channel, error message
+    profiled = pyqtSignal(str, object)  # channel, backend.last_profile() breakdown
+
+    # Emitted from the worker thread; Qt queues it to the thread that owns the runner
+    _done = pyqtSignal(str, int, object, object)  # channel, ticket, result, error
+
+    def __init__(self, parent=None, max_workers=None):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1))
+        self._tickets = {}
+        self._pending = {}  # channel -> (future, callback)
+        self._done.connect(self._on_done)
+
+    def submit(self, channel, callback, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) in the background and call `callback(result)` on the UI thread."""
+        self.cancel(channel)
+        ticket = self._tickets[channel]
+        future = self._pool.submit(self._run, fn, args, kwargs)
+        self._pending[channel] = (future, callback)
+        future.add_done_callback(lambda f, c=channel, t=ticket: self._report(c, t, f))
+
+    def cancel(self, channel):
+        """Forget the request pending on `channel`, if any; its result will never be delivered."""
+        self._tickets[channel] = self._tickets.get(channel, 0) + 1
+        pending = self._pending.pop(channel, None)
+        if pending is not None:
+            pending[0].cancel()
+
+    @staticmethod
+    def _run(fn, args, kwargs):
+        # Runs on the worker thread, where the backend keeps the breakdown of its last op
+        result = fn(*args, **kwargs)
+        return result, backend.last_profile(clear=True)
+
+    def is_busy(self, channel):
+        return channel in self._pending
+
+    def _report(self, channel, ticket, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        self._done.emit(channel, ticket, None if error is not None else future.result(), error)
+
+    def _on_done(self, channel, ticket, result, error):
+        if ticket != self._tickets.get(channel):
+            return  # Superseded by a newer request on the same channel
+        _, callback = self._pending.pop(channel)
+        if error is not None:
+            self.failed.emit(channel, str(error))
+        else:
+            result, profile = result
+            if profile is not None:
+                self.profiled.emit(channel, profile)
+            callback(result)
+
+
+class ImageLoader(QObject):
+    """Decodes image files on a background thread, one file read and one full decode per load.
+
+    Large JPEGs are first decoded at 1/2, 1/4 or 1/8 scale (libjpeg DCT scaling, a fraction of the
+    full cost) so a preview can be shown while the full-resolution decode runs. The display image is
+    derived from the decoded array, downscaled to at most DISPLAY_MAX_SIDE pixels (labels only ever
+    fit the image to the window), so the UI thread never converts or rescales a huge bitmap. Loads are keyed by
+    slot (the target label); a newer load on the same slot supersedes the older one, whose results
+    are dropped. Callbacks run on the UI thread.
+    """
+
+    PREVIEW_MIN_PIXELS = 4_000_000  # smaller images decode fast enough to skip the preview
+    DISPLAY_MAX_SIDE = 4096
+    REDUCED_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+    # Emitted from the worker thread; Qt queues it to the thread that owns the loader
+    _deliver = pyqtSignal(object, object, int, object)  # callback, slot, ticket, payload
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._tickets = {}
+        self._deliver.connect(self._on_deliver)
+
+    def load(self, slot, file_path, preview_size, on_preview, on_loaded, on_failed):
+        """Decode `file_path` in the background.
+
+        on_preview(preview) may be called first with a reduced decode covering `preview_size` (w, h);
+        then on_loaded((image, display, info)) with the full BGR array, its display array and the
+        read/preview/decode times in ms, or on_failed(message).
+        """
+        ticket = self._tickets[slot] = self._tickets.get(slot, 0) + 1
+        self._pool.submit(self._decode, slot, ticket, file_path, preview_size, on_preview, on_loaded, on_failed)
+
+    def _current(self, slot, ticket):
+        return self._tickets.get(slot) == ticket
+
+    @classmethod
+    def preview_reduction(cls, file_path, preview_size):
+        """Largest JPEG scale-down (2, 4 or 8) that still covers `preview_size`, or 1 for no preview."""
+        reader = QImageReader(file_path)
+        size = reader.size()
+        if bytes(reader.format()).lower() not in (b"jpeg", b"jpg") or not size.isValid():
+            return 1
+        w, h = size.width(), size.height()
+        if w * h < cls.PREVIEW_MIN_PIXELS:
+            return 1
+        for factor in (8, 4, 2):
+            if w / factor >= preview_size[0] and h / factor >= preview_size[1]:
+                return factor
+        return 2
+
+    @classmethod
+    def display_image(cls, image):
+        """`image` area-downscaled for showing if its longer side exceeds DISPLAY_MAX_SIDE, else itself."""
+        h, w = image.shape[:2]
+        scale = cls.DISPLAY_MAX_SIDE / max(h, w)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        return image
+
+    def _decode(self, slot, ticket, file_path, preview_size, on_preview, on_loaded, on_failed):
+        try:
+            start = time.perf_counter()
+            data = np.fromfile(file_path, dtype=np.uint8)  # also handles non-ASCII paths on Windows
+            info = {"read_ms": (time.perf_counter() - start) * 1e3}
+
+            factor = self.preview_reduction(file_path, preview_size)
+            if factor > 1:
+                start = time.perf_counter()
+                preview = cv2.imdecode(data, self.REDUCED_FLAGS[factor])
+                info["preview_ms"] = (time.perf_counter() - start) * 1e3
+                info["preview_reduction"] = factor
+                if preview is not None and self._current(slot, ticket):
+                    self._deliver.emit(on_preview, slot, ticket, preview)
+
+            if not self._current(slot, ticket):
+                return
+            start = time.perf_counter()
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            info["decode_ms"] = (time.perf_counter() - start) * 1e3
+            if image is None:
+                raise ValueError("Unsupported or corrupt image file: %s" % os.path.basename(file_path))
+            self._deliver.emit(on_loaded, slot, ticket, (image, self.display_image(image), info))
+        except Exception as e:
+            self._deliver.emit(on_failed, slot, ticket, str(e))
+
+    def _on_deliver(self, callback, slot, ticket, payload):
+        if self._current(slot, ticket):
+            callback(payload)
 
 
 # ==========================================
@@ -41,56 +393,199 @@ def numpy_to_qpixmap(img_array):
 # ==========================================
 
 class ImageLabel(QLabel):
-    """A custom QLabel that automatically scales its pixmap to fit its size while preserving aspect ratio."""
+    """A custom QLabel that automatically scales its pixmap to fit its size while preserving aspect ratio.
+
+    Smoothly scaled pixmaps are kept for the last few label sizes, so toggling between layouts (e.g. a
+    splitter or maximize) reuses them. While a resize is in progress the pixmap is rescaled with the
+    fast (nearest) filter; the smooth rescale runs once the size has settled for RESIZE_SETTLE_MS.
+    """
+
+    SCALED_CACHE_SIZE = 4
+    RESIZE_SETTLE_MS = 150
 
     double_clicked = pyqtSignal()
 
     def __init__(self, text=""):
         super().__init__(text)
+        self._scaled = OrderedDict()  # (width, height) -> smoothly scaled pixmap, most recent last
         self.original_pixmap = None
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(self.RESIZE_SETTLE_MS)
+        self._settle_timer.timeout.connect(self.update_image)
+
         # --- THE FIX ---
         # This stops the infinite growth loop by telling the layout to ignore the image's inherent size
         self.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
         self.setMinimumSize(100, 100)  # Prevents the label from completely collapsing
 
-    def set_image(self, file_path):
-        pixmap = QPixmap(file_path)
-        if not pixmap.isNull():
-            self.original_pixmap = pixmap
-            self.update_image()
-        else:
-            self.setText("❌ Failed to load image.")
-            self.original_pixmap = None
-            
+    @property
+    def original_pixmap(self):
+        return self._original_pixmap
+
+    @original_pixmap.setter
+    def original_pixmap(self, pixmap):
+        self._original_pixmap = pixmap
+        self._scaled.clear()  # Scaled copies of the previous pixmap are stale
+
     def set_pixmap_data(self, pixmap):
         if not pixmap.isNull():
             self.original_pixmap = pixmap
             self.update_image()
 
+    def _smooth_scaled(self, size):
+        key = (size.width(), size.height())
+        pixmap = self._scaled.get(key)
+        if pixmap is None:
+            pixmap = self.original_pixmap.scaled(size, Qt.AspectRatioMode.KeepAspectRatio,
+                                                 Qt.TransformationMode.SmoothTransformation)
+            self._scaled[key] = pixmap
+            if len(self._scaled) > self.SCALED_CACHE_SIZE:
+                self._scaled.popitem(last=False)
+        else:
+            self._scaled.move_to_end(key)
+        return pixmap
+
     def update_image(self):
+        self._settle_timer.stop()
         if self.original_pixmap and not self.original_pixmap.isNull():
             # Scale the image to fit the label's current boundaries
-            scaled_pixmap = self.original_pixmap.scaled(
-                self.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            super().setPixmap(scaled_pixmap)
+            super().setPixmap(self._smooth_scaled(self.size()))
 
     def resizeEvent(self, event):
         """Re-scale the image whenever the window or splitter is resized."""
-        if self.original_pixmap:
-            self.update_image()
+        pixmap = self.original_pixmap
+        if pixmap and not pixmap.isNull():
+            size = event.size()
+            if (size.width(), size.height()) in self._scaled:
+                self.update_image()
+            else:
+                # Cheap nearest-neighbour rescale while dragging; smooth once the size settles
+                super().setPixmap(pixmap.scaled(size, Qt.AspectRatioMode.KeepAspectRatio,
+                                                Qt.TransformationMode.FastTransformation))
+                self._settle_timer.start()
         super().resizeEvent(event)
-        
+
     def mouseDoubleClickEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self.double_clicked.emit()
         super().mouseDoubleClickEvent(event)
 
 
+class HistogramCanvas(FigureCanvas):
+    """Histogram / CDF plot that keeps one axes and one line per channel and only updates their data.
+
+    The static parts (axes, ticks, labels) are rendered into a cached background on every full draw;
+    data updates restore that background and blit the animated lines. Several updates within one
+    frame are coalesced into a single redraw, and nothing is computed while the widget is hidden.
+    """
+
+    CHANNEL_COLORS = ('b', 'g', 'r')  # OpenCV (BGR) channel order
+
+    def __init__(self, figure):
+        super().__init__(figure)
+        self.ax = figure.add_subplot(111)
+        self.ax.set_xlim(0, 255)
+        self.ax.set_xlabel("Pixel Intensity")
+
+        levels = np.arange(256)
+        self.color_lines = [self.ax.plot(levels, np.zeros(256), color=color, animated=True)[0]
+                            for color in self.CHANNEL_COLORS]
+        self.gray_line = self.ax.plot(levels, np.zeros(256), color='gray', animated=True)[0]
+
+        self.image = None
+        self.mode = None
+        self.dirty = False
+        self._background = None
+        self._needs_full_draw = True
+        self.mpl_connect('draw_event', self._on_draw)
+
+        # One redraw per frame at most, however many updates arrive in between
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(16)
+        self._redraw_timer.timeout.connect(self._refresh)
+
+        self.set_mode('hist')
+
+    def set_image(self, image):
+        self.image = image
+        self._schedule()
+
+    def set_mode(self, mode):
+        if mode == self.mode:
+            return
+        self.mode = mode
+        if mode == 'hist':
+            self.ax.title.set_text("Histogram")
+            self.ax.yaxis.label.set_text("Frequency")
+            linestyle, alpha = '-', 0.7
+        else:
+            self.ax.title.set_text("Cumulative Distribution Function (CDF)")
+            self.ax.yaxis.label.set_text("CDF")
+            self.ax.set_ylim(0, 1.05)
+            linestyle, alpha = '--', 1.0
+        for line in self.color_lines + [self.gray_line]:
+            line.set_linestyle(linestyle)
+            line.set_alpha(alpha)
+        self._needs_full_draw = True
+        self._schedule()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.dirty:
+            self._schedule()
+
+    def _schedule(self):
+        self.dirty = True
+        if self.isVisible() and not self._redraw_timer.isActive():
+            self._redraw_timer.start()
+
+    def _refresh(self):
+        if not self.isVisible() or self.image is None:
+            return  # Stays dirty; picked up again by showEvent
+        self.dirty = False
+
+        # Cached per image array, so switching between Histogram and CDF does not recount pixels
+        stats = backend.image_stats(self.image)
+        data = stats["histogram"] if self.mode == 'hist' else stats["cdf"]
+        channels = data.shape[0]
+        lines = self.color_lines if channels == 3 else [self.gray_line]
+        for line in self.color_lines + [self.gray_line]:
+            line.set_visible(line in lines)
+        for line, values in zip(lines, data):
+            if self.mode == 'cdf':
+                values = values / values[-1] if values[-1] > 0 else values
+            line.set_ydata(values)
+
+        if self.mode == 'hist':
+            # Only rescale (and re-render the static background) when the peak moves a lot
+            peak = max(1, int(data.max()))
+            top = self.ax.get_ylim()[1]
+            if peak > top or peak < top / 2:
+                self.ax.set_ylim(0, peak * 1.05)
+                self._needs_full_draw = True
+
+        if self._needs_full_draw or self._background is None:
+            self.draw()
+        else:
+            self.restore_region(self._background)
+            self._draw_lines()
+            self.blit(self.figure.bbox)
+
+    def _on_draw(self, event):
+        self._needs_full_draw = False
+        self._background = self.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self.color_lines + [self.gray_line]:
+            if line.get_visible():
+                self.ax.draw_artist(line)
+
+
 # ==========================================
 # --- STYLING CONSTANTS ---
 # ==========================================
@@ -178,8 +673,25 @@ class ComputerVisionApp(QMainWindow):
         self.current_image_np = None
         self.hybrid_img_a_np = None
         self.hybrid_img_b_np = None
-        self.undo_stack_np = []
-        self.redo_stack_np = []
+        # Cached forward spectra of the hybrid inputs, and the engine built from them on first mix
+        self.hybrid_spectrum_a = None
+        self.hybrid_spectrum_b = None
+        # Pyramids for proxy-resolution previews while sliders are dragged
+        self.preview_pyramid = None
+        self.hybrid_pyramid_a = None
+        self.hybrid_pyramid_b = None
+        # Full-resolution result computed on slider release: (input image, op, args, result)
+        self.preview_result = None
+        self.hybrid_engine = None
+        self.history = ImageHistory()
+        self.runner = OpRunner(self)
+        self.loader = ImageLoader(self)
+        self.runner.failed.connect(self.show_op_error)
+        self.runner.profiled.connect(self.show_op_profile)
+        backend.set_profiling(True)
+        # Flipping between slider positions (thresholds, radii) or reloading an image hits memoized results
+        backend.set_result_cache_budget(512 << 20)
+        self.load_filter_planner()
         
         self.current_plot_mode = 'hist'
 
@@ -190,6 +702,15 @@ class ComputerVisionApp(QMainWindow):
         # Install event filter to prevent scroll wheel changing input values
         self.installEventFilter(self)
 
+    def load_filter_planner(self):
+        # The backend picks spatial vs. FFT filtering from a cost model that is calibrated once per machine
+        # (about a second of benchmarks in the background) and reused on later runs.
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        path = os.path.join(data_dir, "filter_planner.json")
+        if not backend.load_filter_planner(path):
+            os.makedirs(data_dir, exist_ok=True)
+            self.runner.submit("calibrate", lambda model: None, backend.calibrate_filter_planner, path)
+
     def eventFilter(self, obj, event):
         if event.type() == QEvent.Type.Wheel:
             # Ignore wheel events on these types unless they explicitly have focus
@@ -389,6 +910,13 @@ class ComputerVisionApp(QMainWindow):
         freq_group.setLayout(l)
         controls_layout.addWidget(freq_group)
 
+        # Live preview: proxy resolution while dragging, one full-resolution run on release
+        for slider, op_builder in ((self.slider_noise, self._noise_op), (self.slider_kernel, self._filter_op),
+                                   (self.slider_canny_t1, self._edge_op), (self.slider_canny_t2, self._edge_op),
+                                   (self.slider_sobel_ksize, self._edge_op), (self.slider_freq_radius, self._freq_op)):
+            slider.sliderMoved.connect(lambda _, b=op_builder: self.preview_op(b))
+            slider.sliderReleased.connect(lambda b=op_builder: self.preview_op(b, full_resolution=True))
+
         # 6. Global Ops
         ops_group = self.create_group_box("Enhancement")
         l = QVBoxLayout()
@@ -398,9 +926,25 @@ class ComputerVisionApp(QMainWindow):
         self.btn_equalize.clicked.connect(self.apply_equalize)
         self.btn_normalize = QPushButton("Normalize Image")
         self.btn_normalize.clicked.connect(self.apply_normalize)
+        self.combo_clahe = QComboBox()
+        self.combo_clahe.addItems(["Color (Luminance Only)", "Grayscale"])
+        self.combo_clahe.installEventFilter(self)
+        self.combo_clahe.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        clahe_layout, self.slider_clahe_clip, self.lbl_clahe_clip = self.create_slider_widget(
+            "Clip Limit:", 1, 40, 4, step=1, value_formatter=lambda v: f"{v / 2:.1f}"
+        )
+        self.btn_clahe = QPushButton("Adaptive Equalize (CLAHE)")
+        self.btn_clahe.clicked.connect(self.apply_clahe)
+        self.slider_clahe_clip.sliderMoved.connect(lambda _: self.preview_op(self._clahe_op))
+        self.slider_clahe_clip.sliderReleased.connect(lambda: self.preview_op(self._clahe_op, full_resolution=True))
         l.addWidget(self.btn_grayscale)
         l.addWidget(self.btn_equalize)
         l.addWidget(self.btn_normalize)
+        l.addWidget(QLabel("Adaptive Equalization:"))
+        l.addWidget(self.combo_clahe)
+        l.addLayout(clahe_layout)
+        l.addWidget(self.slider_clahe_clip)
+        l.addWidget(self.btn_clahe)
         ops_group.setLayout(l)
         controls_layout.addWidget(ops_group)
 
@@ -452,7 +996,7 @@ class ComputerVisionApp(QMainWindow):
 
         # Canvas
         self.figure = Figure(figsize=(5, 3), dpi=100)
-        self.canvas = FigureCanvas(self.figure)
+        self.canvas = HistogramCanvas(self.figure)
         self.canvas.setMinimumHeight(250)
 
         hist_area_layout.addLayout(plot_tabs_layout)
@@ -491,6 +1035,8 @@ class ComputerVisionApp(QMainWindow):
 
         l_a.addLayout(cutoff_a_layout)
         l_a.addWidget(self.slider_cutoff_a)
+        self.slider_cutoff_a.sliderMoved.connect(lambda _: self.preview_hybrid_input("a"))
+        self.slider_cutoff_a.sliderReleased.connect(lambda: self.preview_hybrid_input("a", full_resolution=True))
         grp_a.setLayout(l_a)
 
         grp_b = self.create_group_box("Image B (High Pass)")
@@ -505,6 +1051,8 @@ class ComputerVisionApp(QMainWindow):
 
         l_b.addLayout(cutoff_b_layout)
         l_b.addWidget(self.slider_cutoff_b)
+        self.slider_cutoff_b.sliderMoved.connect(lambda _: self.preview_hybrid_input("b"))
+        self.slider_cutoff_b.sliderReleased.connect(lambda: self.preview_hybrid_input("b", full_resolution=True))
         grp_b.setLayout(l_b)
 
         btn_mix = QPushButton("✨ Make Hybrid")
@@ -610,10 +1158,72 @@ class ComputerVisionApp(QMainWindow):
         return container, lbl, btn_download
 
     def _execute_image_op(self, operation, *args, **kwargs):
+        """Run a backend op on the current image off the UI thread; only the latest request is applied."""
+        if self.current_image_np is None:
+            return
+        self.runner.cancel("preview")
+        preview = self.preview_result
+        self.preview_result = None
+        if (not kwargs and preview is not None and preview[0] is self.current_image_np
+                and preview[1:3] == (operation, args)):
+            # Already computed at full resolution when the slider was released
+            self.set_processed_image(preview[3])
+            return
+        self.runner.submit("main", self.set_processed_image, operation, self.current_image_np, *args, **kwargs)
+
+    def _preview_pyramid(self):
+        if self.preview_pyramid is None or self.preview_pyramid.image is not self.current_image_np:
+            self.preview_pyramid = ImagePyramid(self.current_image_np)
+        return self.preview_pyramid
+
+    @staticmethod
+    def _display_level(pyramid, label):
+        """Pyramid level closest to (and not smaller than) what `label` actually displays."""
+        ratio = label.devicePixelRatioF()
+        return pyramid.level_for(label.width() * ratio, label.height() * ratio)
+
+    def preview_op(self, op_builder, full_resolution=False):
+        """Show the op's result in the processed view without committing it to the history."""
         if self.current_image_np is None:
             return
-        res = operation(self.current_image_np, *args, **kwargs)
-        self.set_processed_image(res)
+        pyramid = self._preview_pyramid()
+        level = 0 if full_resolution else self._display_level(pyramid, self.lbl_proc)
+        operation, args = op_builder(0.5 ** level)
+        if level == 0:
+            callback = lambda res, key=(pyramid.image, operation, args): self.show_preview(res, key)
+        else:
+            callback = self.show_preview
+        self.runner.submit("preview", callback, self._run_on_level, pyramid, level, operation, args)
+
+    @staticmethod
+    def _run_on_level(pyramid, level, operation, args):
+        if operation is backend.canny:
+            # Same edges as backend.canny; the gradients and non-maximum suppression are kept per level
+            return pyramid.canny_state(level).apply(*args)
+        return operation(pyramid.level(level), *args)
+
+    def show_preview(self, result_np, key=None):
+        if key is not None:
+            self.preview_result = key + (result_np,)
+        self.lbl_proc.set_pixmap_data(numpy_to_qpixmap(result_np))
+
+    def preview_hybrid_input(self, which, full_resolution=False):
+        """Live low-pass (A) / high-pass (B) preview of a hybrid input while its cutoff slider moves."""
+        if which == "a":
+            pyramid, label, slider, filter_type = self.hybrid_pyramid_a, self.lbl_hybrid_a, self.slider_cutoff_a, "low_pass"
+        else:
+            pyramid, label, slider, filter_type = self.hybrid_pyramid_b, self.lbl_hybrid_b, self.slider_cutoff_b, "high_pass"
+        if pyramid is None:
+            return
+        if full_resolution:
+            callback = self.set_hybrid_preview_a if which == "a" else self.set_hybrid_preview_b
+            level = 0
+        else:
+            callback = lambda res, l=label: l.set_pixmap_data(numpy_to_qpixmap(res[1]))
+            level = self._display_level(pyramid, label)
+        # The cutoff is a distance in the (padded) spectrum, which shrinks with the image
+        radius = max(1, int(round(slider.value() * 0.5 ** level)))
+        self.runner.submit("hybrid_" + which, callback, self._spectrum_preview, pyramid, level, filter_type, radius)
 
     def toggle_edge_sliders(self, text):
         if text == "Canny":
@@ -647,59 +1257,82 @@ class ComputerVisionApp(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open Image", "", "Images (*.png *.jpg *.jpeg *.bmp)")
 
         if file_path:
-            # Show the waiting cursor globally
-            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            self.load_image(target_label, file_path)
+
+    def load_image(self, target_label, file_path):
+        """Decode `file_path` in the background; a reduced preview may show before the full image."""
+        # Clear previous image and show loading text
+        target_label.clear()
+        target_label.original_pixmap = None
+        target_label.setText("⏳ Loading...\nPlease wait")
+
+        size = target_label.size()
+        self.loader.load(
+            target_label, file_path, (size.width(), size.height()),
+            lambda preview, label=target_label: label.set_pixmap_data(numpy_to_qpixmap(preview)),
+            lambda loaded, label=target_label, path=file_path: self.finalize_image_load(label, path, *loaded),
+            lambda message, label=target_label: self.image_load_failed(label, message))
+
+    def image_load_failed(self, target_label, message):
+        target_label.original_pixmap = None
+        target_label.setText("❌ Failed to load image.")
+        self.statusBar().showMessage(message)
+
+    def finalize_image_load(self, target_label, file_path, img_np, display_np, info):
+        """Show a decoded image on its label and make it the input of the matching tab."""
+        target_label.set_pixmap_data(numpy_to_qpixmap(display_np))
+        timing = "read %.0f ms" % info["read_ms"]
+        if "preview_ms" in info:
+            timing += ", 1/%d preview %.0f ms" % (info["preview_reduction"], info["preview_ms"])
+        timing += ", decode %.0f ms" % info["decode_ms"]
+        self.statusBar().showMessage("Loaded %s (%d x %d): %s" % (os.path.basename(file_path), img_np.shape[1],
+                                                                  img_np.shape[0], timing))
 
-            # Clear previous image and show loading text
-            target_label.clear()
-            target_label.original_pixmap = None
-            target_label.setText("⏳ Loading...\nPlease wait")
-
-            # Force the UI to process the text update immediately
-            QApplication.processEvents()
-
-            # Simulate a brief delay to show the loader, then load the image
-            QTimer.singleShot(600, lambda: self.finalize_image_load(target_label, file_path))
-
-    def finalize_image_load(self, target_label, file_path):
-        """Sets the image on the label and removes the loading cursor."""
-        target_label.set_image(file_path)
-        QApplication.restoreOverrideCursor()
-        
-        # Load backing numpy array using OpenCV
-        img_np = cv2.imread(file_path)
-        if img_np is None:
-            return
-            
         if target_label == self.lbl_orig:
+            self.runner.cancel("main")
+            self.runner.cancel("preview")
             self.current_image_np = img_np
             # Clear undo stack on new image load
-            self.undo_stack_np.clear()
-            self.redo_stack_np.clear()
+            self.history.clear()
             self.update_histograms()
             self.lbl_proc.clear()
             self.lbl_proc.setText("Processed\nResult")
             self.btn_download_main.setVisible(True)
         elif target_label == self.lbl_hybrid_a:
             self.hybrid_img_a_np = img_np
-            # Show immediate feedback
-            radius_a = self.slider_cutoff_a.value()
-            self.hybrid_img_a_filtered_np = backend.apply_fft(self.hybrid_img_a_np, "low_pass", radius_a)
-            qpixmap_a = numpy_to_qpixmap(self.hybrid_img_a_filtered_np)
-            self.lbl_hybrid_a.set_pixmap_data(qpixmap_a)
+            self.hybrid_pyramid_a = ImagePyramid(img_np)
+            self.hybrid_spectrum_a = None
+            self.hybrid_engine = None
+            self.runner.cancel("hybrid")
+            # Show immediate feedback (the spectrum is computed in the background)
+            self.preview_hybrid_input("a", full_resolution=True)
         elif target_label == self.lbl_hybrid_b:
             self.hybrid_img_b_np = img_np
-            # Show immediate feedback
-            radius_b = self.slider_cutoff_b.value()
-            self.hybrid_img_b_filtered_np = backend.apply_fft(self.hybrid_img_b_np, "high_pass", radius_b)
-            qpixmap_b = numpy_to_qpixmap(self.hybrid_img_b_filtered_np)
-            self.lbl_hybrid_b.set_pixmap_data(qpixmap_b)
+            self.hybrid_pyramid_b = ImagePyramid(img_np)
+            self.hybrid_spectrum_b = None
+            self.hybrid_engine = None
+            self.runner.cancel("hybrid")
+            # Show immediate feedback (the spectrum is computed in the background)
+            self.preview_hybrid_input("b", full_resolution=True)
+
+    @staticmethod
+    def _spectrum_preview(pyramid, level, filter_type, radius):
+        """Worker side of a hybrid input preview: forward DFT of the level once, then filter at `radius`."""
+        spectrum = pyramid.spectrum(level)
+        return spectrum, spectrum.apply(filter_type, radius)
+
+    def set_hybrid_preview_a(self, result):
+        self.hybrid_spectrum_a, self.hybrid_img_a_filtered_np = result
+        self.lbl_hybrid_a.set_pixmap_data(numpy_to_qpixmap(self.hybrid_img_a_filtered_np))
+
+    def set_hybrid_preview_b(self, result):
+        self.hybrid_spectrum_b, self.hybrid_img_b_filtered_np = result
+        self.lbl_hybrid_b.set_pixmap_data(numpy_to_qpixmap(self.hybrid_img_b_filtered_np))
 
     def set_processed_image(self, result_np):
         """Helper to save history and display result on the screen."""
         if self.current_image_np is not None:
-            self.undo_stack_np.append(self.current_image_np.copy())
-            self.redo_stack_np.clear()
+            self.history.push(self.current_image_np)
             
         self.current_image_np = result_np
         
@@ -709,11 +1342,26 @@ class ComputerVisionApp(QMainWindow):
         
         self.update_histograms()
         
+    def show_op_error(self, channel, message):
+        QMessageBox.warning(self, "Processing Failed", message)
+
+    def show_op_profile(self, channel, profile):
+        # Status bar line: "canny (preview): 12.4 ms = to_gray 0.6 + compute 10.9 + to_bgr 0.8 + ..."
+        if channel == "calibrate":
+            return
+        stages = " + ".join("%s %.1f" % (name, ms) for name, ms in profile["stages"] if ms >= 0.05)
+        text = "%s%s: %.1f ms = %s ms" % (profile["op"], " (preview)" if channel == "preview" else "",
+                                          profile["total_ms"], stages or "compute 0.0")
+        text += "  |  %.1f MB allocated, %.1f MB copied" % (profile["bytes_allocated"] / 2**20,
+                                                         profile["bytes_copied"] / 2**20)
+        self.statusBar().showMessage(text)
+
     def undo_action(self):
-        if self.undo_stack_np:
-            if self.current_image_np is not None:
-                self.redo_stack_np.append(self.current_image_np.copy())
-            self.current_image_np = self.undo_stack_np.pop()
+        self.runner.cancel("main")
+        self.runner.cancel("preview")
+        previous = self.history.undo(self.current_image_np)
+        if previous is not None:
+            self.current_image_np = previous
             
             # Show on processed label (even if it's the original, just for visual feedback)
             qpixmap = numpy_to_qpixmap(self.current_image_np)
@@ -721,10 +1369,11 @@ class ComputerVisionApp(QMainWindow):
             self.update_histograms()
 
     def redo_action(self):
-        if self.redo_stack_np:
-            if self.current_image_np is not None:
-                self.undo_stack_np.append(self.current_image_np.copy())
-            self.current_image_np = self.redo_stack_np.pop()
+        self.runner.cancel("main")
+        self.runner.cancel("preview")
+        following = self.history.redo(self.current_image_np)
+        if following is not None:
+            self.current_image_np = following
 
             qpixmap = numpy_to_qpixmap(self.current_image_np)
             self.lbl_proc.set_pixmap_data(qpixmap)
@@ -738,75 +1387,67 @@ class ComputerVisionApp(QMainWindow):
         else:
             self.btn_show_hist.setChecked(False)
             self.btn_show_cdf.setChecked(True)
-        self.update_histograms()
+        self.canvas.set_mode(mode)
 
     def update_histograms(self):
         if self.current_image_np is None:
             return
-            
-        # Draw on canvas
-        self.figure.clear()
-        
-        ax = self.figure.add_subplot(111)
-        
-        is_color = len(self.current_image_np.shape) == 3
-        colors = ('r', 'g', 'b') if is_color else ('gray',)
-        
-        if self.current_plot_mode == 'hist':
-            hist_data = backend.calculate_histogram(self.current_image_np)
-            ax.set_title("Histogram")
-            ax.set_ylabel("Frequency")
-            for i, color in enumerate(colors):
-                ax.plot(hist_data[i] if is_color else hist_data[0], color=color, alpha=0.7)
-        else:
-            cdf_data = backend.calculate_cdf(self.current_image_np)
-            ax.set_title("Cumulative Distribution Function (CDF)")
-            ax.set_ylabel("CDF")
-            for i, color in enumerate(colors):
-                data = cdf_data[i] if is_color else cdf_data[0]
-                normalized_cdf = data / data[-1] if data[-1] > 0 else data
-                ax.plot(normalized_cdf, color=color, linestyle='--')
-        
-        ax.set_xlabel("Pixel Intensity")
-            
-        # Refresh colors based on theme
-        ax.set_facecolor('#252526')
-        ax.tick_params(colors='white')
-        ax.xaxis.label.set_color('white')
-        ax.yaxis.label.set_color('white')
-        ax.title.set_color('white')
-        self.figure.patch.set_facecolor('#1e1e1e')
-        
-        self.canvas.draw()
+        self.canvas.set_image(self.current_image_np)
 
-    def apply_noise(self):
+    # Op builders: (backend function, args) for the current controls. `scale` is the resolution of the
+    # image the op will run on relative to the full image, so size-like parameters shrink with it.
+
+    def _noise_op(self, scale=1.0):
         noise_type = self.combo_noise.currentText()
         intensity = self.slider_noise.value()
-        self._execute_image_op(backend.add_noise, noise_type, intensity)
+        return backend.add_noise, (noise_type, intensity)
 
-    def apply_filter(self):
+    def _filter_op(self, scale=1.0):
         filter_type = self.combo_filter.currentText()
-        kernel_size = self.slider_kernel.value() * 2 + 3
-        self._execute_image_op(backend.apply_filter, filter_type, kernel_size)
+        kernel_size = scale_kernel_size(self.slider_kernel.value() * 2 + 3, scale)
+        return backend.apply_filter, (filter_type, kernel_size)
 
-    def apply_edge(self):
+    def _edge_op(self, scale=1.0):
         method = self.combo_edge.currentText()
         if method == "Sobel":
-            ksize = self.slider_sobel_ksize.value() * 2 + 1
-            self._execute_image_op(backend.sobel, ksize)
+            ksize = scale_kernel_size(self.slider_sobel_ksize.value() * 2 + 1, scale)
+            return backend.sobel, (ksize,)
         elif method == "Roberts":
-            self._execute_image_op(backend.roberts)
+            return backend.roberts, ()
         elif method == "Prewitt":
-            self._execute_image_op(backend.prewitt)
+            return backend.prewitt, ()
         else:
             t1 = float(self.slider_canny_t1.value())
             t2 = float(self.slider_canny_t2.value())
-            self._execute_image_op(backend.canny, t1, t2)
+            return backend.canny, (t1, t2)
 
-    def apply_freq(self):
+    def _freq_op(self, scale=1.0):
         filter_type = "low_pass" if "Low" in self.combo_freq.currentText() else "high_pass"
-        radius = self.slider_freq_radius.value()
-        self._execute_image_op(backend.apply_fft, filter_type, radius)
+        # The cutoff is a distance in the (padded) spectrum, which shrinks with the image
+        radius = max(1, int(round(self.slider_freq_radius.value() * scale)))
+        return backend.apply_fft, (filter_type, radius)
+
+    def _clahe_op(self, scale=1.0):
+        # The tile grid is fixed, so tiles shrink with the image and the proxy preview stays faithful
+        clip_limit = self.slider_clahe_clip.value() / 2
+        preserve_color = self.combo_clahe.currentIndex() == 0
+        return backend.clahe, (clip_limit, (8, 8), preserve_color)
+
+    def apply_noise(self):
+        operation, args = self._noise_op()
+        self._execute_image_op(operation, *args)
+
+    def apply_filter(self):
+        operation, args = self._filter_op()
+        self._execute_image_op(operation, *args)
+
+    def apply_edge(self):
+        operation, args = self._edge_op()
+        self._execute_image_op(operation, *args)
+
+    def apply_freq(self):
+        operation, args = self._freq_op()
+        self._execute_image_op(operation, *args)
 
     def apply_grayscale(self):
         self._execute_image_op(backend.to_grayscale)
@@ -814,6 +1455,10 @@ class ComputerVisionApp(QMainWindow):
     def apply_equalize(self):
         self._execute_image_op(backend.equalize)
 
+    def apply_clahe(self):
+        operation, args = self._clahe_op()
+        self._execute_image_op(operation, *args)
+
     def apply_normalize(self):
         self._execute_image_op(backend.normalize)
 
@@ -823,10 +1468,25 @@ class ComputerVisionApp(QMainWindow):
             
         radius_a = self.slider_cutoff_a.value()
         radius_b = self.slider_cutoff_b.value()
-        
-        res = backend.create_hybrid(self.hybrid_img_a_np, self.hybrid_img_b_np, radius_a, radius_b)
-        self.hybrid_res_np = res
-        qpixmap = numpy_to_qpixmap(res)
+
+        self.runner.submit("hybrid", self.set_hybrid_result, self._render_hybrid, self.hybrid_engine,
+                           self.hybrid_img_a_np, self.hybrid_img_b_np,
+                           self.hybrid_spectrum_a, self.hybrid_spectrum_b, radius_a, radius_b)
+
+    @staticmethod
+    def _render_hybrid(engine, img_a, img_b, spectrum_a, spectrum_b, radius_a, radius_b):
+        """Worker side of apply_hybrid: builds the engine on first use, then renders."""
+        if engine is None:
+            # Reuse the spectra computed at load time when they are ready and no resize of B is needed
+            if spectrum_a is not None and spectrum_b is not None and img_a.shape[:2] == img_b.shape[:2]:
+                engine = backend.HybridEngine(spectrum_a, spectrum_b)
+            else:
+                engine = backend.HybridEngine(img_a, img_b)
+        return engine, engine.render(radius_a, radius_b)
+
+    def set_hybrid_result(self, result):
+        self.hybrid_engine, self.hybrid_res_np = result
+        qpixmap = numpy_to_qpixmap(self.hybrid_res_np)
         self.lbl_hybrid_res.set_pixmap_data(qpixmap)
 
     def download_image(self, img_np, image_name):